@@ -1,14 +1,19 @@
 # app/__init__.py
 import os
 from flask import Flask
-from flask_migrate import Migrate
 from flask_session import Session
 from dotenv import load_dotenv
 from config import Config
-from .models import  User
 from app.routes import register_routes
 from flask_login import LoginManager
-from app.database import db
+from app.database import db, init_database, init_migrations
+from app.conversation_store import create_conversation_store
+from app.export_jobs import create_export_jobs
+from app.log_writer import create_log_writer
+from app.user_cache import create_user_cache, load_user
+from app.therapists import create_therapist_directory
+from app.scheduler import jobs_cli
+from app.response_cache import create_response_cache
 
 
 
@@ -40,6 +45,10 @@ def create_app(test_config=None):
     app.config.setdefault("SESSION_TYPE", "filesystem")
     app.config.setdefault("SESSION_FILE_DIR", os.path.join(os.getcwd(), "flask_session"))
     app.config.setdefault("SESSION_PERMANENT", False)
+    app.config.setdefault("CONVERSATION_STORE_PATH", ":memory:" if app.config.get("TESTING")
+                          else os.path.join(os.getcwd(), "instance", "conversations.db"))
+    app.config.setdefault("EXPORT_DIR", os.path.join(app.instance_path, "exports"))
+    app.config.setdefault("LOG_SPOOL_DIR", os.path.join(app.instance_path, "log_spool"))
 
     if app.config.get("TESTING"):
         app.config["WTF_CSRF_ENABLED"] = False
@@ -52,14 +61,21 @@ def create_app(test_config=None):
             return {"error": "Unauthorized"}, 401
     # ------------------------------------------------
 
-    db.init_app(app)
-    Migrate(app, db)
+    init_database(app)
+    init_migrations(app)
     Session(app)
+    app.config["conversation_store"] = create_conversation_store(app)
+    app.config["export_jobs"] = create_export_jobs(app)
+    app.config["log_writer"] = create_log_writer(app)
+    app.config["user_cache"] = create_user_cache(app)
+    app.config["therapist_directory"] = create_therapist_directory(app)
+    app.config["response_cache"] = create_response_cache(app)
 
     with app.app_context():
         db.create_all()
         register_routes(app)
         register_error_handlers(app)
+    app.cli.add_command(jobs_cli)
 
     if app.config.get("TESTING"):
         @app.route('/trigger500')
@@ -80,9 +96,9 @@ def register_error_handlers(app):
     @app.errorhandler(500)
     def internal_error(error):
         return "<h1>500 Internal Server Error</h1><p>An unexpected error occurred.</p>", 500
-    
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+
+
+# Resolves to a cached UserSnapshot; see app/user_cache.py
+login_manager.user_loader(load_user)
 
 
@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from app.generation import generate_replies
+
+_STOP = object()
+
+
+# ---------------------------------------------
+# Generic micro-batcher
+# ---------------------------------------------
+class MicroBatcher:
+    """Collect concurrent requests for a short window and process them together.
+
+    Callers block on :meth:`run` (or wait on the future from :meth:`submit`)
+    while a single background thread drains the queue. A batch is dispatched
+    as soon as it is full or ``max_wait_ms`` after its first item arrived.
+    The worker thread is started lazily so the batcher can be created before
+    gunicorn forks its workers.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=10, name="micro-batcher"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._batches = 0
+        self._busy_seconds = 0.0
+
+    def submit(self, item):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def run(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def shutdown(self, timeout=None):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        with self._stats_lock:
+            batches = self._batches
+            requests = self._requests
+            mean_size = requests / batches if batches else 0.0
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": batches,
+                "requests": requests,
+                "mean_batch_size": round(mean_size, 3),
+                "mean_occupancy": round(mean_size / self.max_batch_size, 3),
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "busy_seconds": round(self._busy_seconds, 3),
+                "queue_depth": self._queue.qsize(),
+            }
+
+    # ---------------------------------------------
+    # Worker loop
+    # ---------------------------------------------
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _worker(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            self._dispatch(self._collect(first))
+
+    def _dispatch(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            results = self.process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: expected {len(batch)} results, got {len(results)}")
+        except BaseException as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._busy_seconds += time.perf_counter() - started
+
+
+# ---------------------------------------------
+# DialoGPT generation batcher
+# ---------------------------------------------
+class GenerationBatcher(MicroBatcher):
+    """Batch concurrent chat prompts into one left-padded ``generate()`` call."""
+
+    def __init__(self, model, tokenizer, device="cpu", max_batch_size=8, max_wait_ms=10):
+        super().__init__(self._generate, max_batch_size=max_batch_size,
+                         max_wait_ms=max_wait_ms, name="generation-batcher")
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+
+    def _generate(self, prompts):
+        return generate_replies(self.model, self.tokenizer, prompts, self.device)
+
+
+def create_generation_batcher(app, model, tokenizer, device):
+    if not app.config.get("GENERATION_BATCHING"):
+        return None
+    return GenerationBatcher(
+        model,
+        tokenizer,
+        device=device,
+        max_batch_size=app.config.get("GENERATION_MAX_BATCH_SIZE", 8),
+        max_wait_ms=app.config.get("GENERATION_MAX_WAIT_MS", 10),
+    )
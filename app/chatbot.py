@@ -1,25 +1,28 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer, AutoModelForSequenceClassification
-import torch
-import torch.nn.functional as F
 from flask import session
 
-# === Load Fine-tuned Chatbot Model ===
-chatbot_model_path = r"C:\\Users\\Pasul\\OneDrive\\Documents\\Desktop\\mental_health_chatbot\\chatbot_model_small"
-chatbot_tokenizer = AutoTokenizer.from_pretrained(chatbot_model_path)
-chatbot_tokenizer.pad_token = chatbot_tokenizer.eos_token
-chatbot_tokenizer.padding_side = "left"
-chatbot_tokenizer.truncation_side = "left"  # optional but good for long inputs
-print("Padding side:", chatbot_tokenizer.padding_side)
-chatbot_model = AutoModelForCausalLM.from_pretrained(chatbot_model_path, trust_remote_code=True, local_files_only=True)
+# ---------------------------------------------
+# Models come from the current app's model registry (one copy per process,
+# on the registry's device), so importing this module stays cheap
+# ---------------------------------------------
+_LAZY = ("chatbot_tokenizer", "chatbot_model", "emotion_tokenizer", "emotion_model", "mood_classifier")
 
-device = torch.device("cpu")  # Use "cuda" if available
-chatbot_model.to(device)
-chatbot_model.eval()
 
-# === Load Emotion Classifier ===
-emotion_model_name = "j-hartmann/emotion-english-distilroberta-base"
-emotion_tokenizer = AutoTokenizer.from_pretrained(emotion_model_name)
-emotion_model = AutoModelForSequenceClassification.from_pretrained(emotion_model_name)
+def _get(name):
+    if name in globals():
+        return globals()[name]  # patched in by tests
+    from app.model_registry import get_model
+
+    if name in ("emotion_tokenizer", "emotion_model"):
+        classifier = get_model("emotion_classifier")
+        return classifier.tokenizer if name == "emotion_tokenizer" else classifier.model
+    return get_model(name)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return _get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 emotion_labels = ['admiration', 'amusement', 'anger', 'annoyance', 'approval', 'caring',
                   'confusion', 'curiosity', 'desire', 'disappointment', 'disapproval', 'disgust',
@@ -38,14 +41,11 @@ mood_support = {
 }
 
 def detect_mood(user_input):
-    inputs = emotion_tokenizer(user_input, return_tensors="pt", truncation=True)
-    with torch.no_grad():
-        logits = emotion_model(**inputs).logits
-    probs = F.softmax(logits, dim=1)
-    top_idx = torch.argmax(probs, dim=1).item()
-    return emotion_labels[top_idx]
+    return _get("mood_classifier").classify(user_input).label
 
 def get_bot_response(user_input, user_id=None):
+    chatbot_tokenizer = _get("chatbot_tokenizer")
+    chatbot_model = _get("chatbot_model")
     chat_history = session.get("chat_history", [])
 
     # Only include the last 3–5 pairs to keep prompt short and coherent
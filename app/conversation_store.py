@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation TEXT NOT NULL,
+    user_message TEXT,
+    bot_message TEXT,
+    reset INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_turns_conversation_id ON turns (conversation, id);
+CREATE INDEX IF NOT EXISTS ix_turns_created_at ON turns (created_at);
+"""
+
+
+class _Window:
+    __slots__ = ("last_id", "turns")
+
+    def __init__(self, last_id, turns):
+        self.last_id = last_id
+        self.turns = turns  # [(user_message, bot_message, created_at)], oldest first
+
+
+# ---------------------------------------------
+# Append-only conversation store
+# ---------------------------------------------
+class ConversationStore:
+    """Recent chat turns per conversation, kept outside the Flask session.
+
+    Every turn is one ``INSERT`` into an append-only SQLite table (WAL mode,
+    so gunicorn workers can read while another writes). Resetting a
+    conversation appends a marker row instead of deleting, and reads only
+    look at the last ``window`` messages after the latest marker, ignoring
+    turns older than ``ttl_seconds``. Old rows are removed by :meth:`compact`,
+    which runs every ``compact_every`` appends.
+
+    An in-process LRU holds recent windows. Because another worker may have
+    appended in the meantime, a cached window is refreshed with the rows
+    newer than its last id, which is a single index seek.
+    """
+
+    def __init__(self, path, window=10, ttl_seconds=7 * 24 * 3600, cache_size=1024, compact_every=1000):
+        self.path = path
+        self.window = window
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._cache = OrderedDict()
+        self._appends_since_compact = 0
+        self._counters = {"appends": 0, "reads": 0, "cache_hits": 0, "compactions": 0}
+
+    @property
+    def _max_turns(self):
+        return max(1, self.window // 2)
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+    def history(self, key, now=None):
+        """Return the recent window as alternating user/bot messages, oldest first."""
+        return [message for user, bot, _ in self.turns(key, now) for message in (user, bot)]
+
+    def turns(self, key, now=None):
+        """Return the recent window as ``(user_message, bot_message, created_at)`` tuples."""
+        key = str(key)
+        cutoff = (now or time.time()) - self.ttl_seconds
+        with self._lock:
+            self._counters["reads"] += 1
+            cached = self._cache.get(key)
+            if cached is None:
+                cached = self._load(key)
+            else:
+                self._counters["cache_hits"] += 1
+                self._refresh(key, cached)
+            self._remember(key, cached)
+            return [turn for turn in cached.turns if turn[2] >= cutoff]
+
+    def append(self, key, user_message, bot_message, now=None):
+        self._insert(str(key), user_message, bot_message, reset=0, now=now)
+
+    def clear(self, key, now=None):
+        self._insert(str(key), None, None, reset=1, now=now)
+
+    def compact(self, now=None):
+        """Delete expired turns, turns before a reset and turns outside the window."""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM turns WHERE created_at < ?", (cutoff,))
+                conn.execute("""
+                    DELETE FROM turns WHERE id < (
+                        SELECT MAX(r.id) FROM turns r
+                        WHERE r.conversation = turns.conversation AND r.reset = 1
+                    )
+                """)
+                conn.execute("""
+                    DELETE FROM turns WHERE id IN (
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (PARTITION BY conversation ORDER BY id DESC) AS rn
+                            FROM turns
+                        ) WHERE rn > ?
+                    )
+                """, (self._max_turns,))
+            self._appends_since_compact = 0
+            self._counters["compactions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, cached_conversations=len(self._cache), cache_size=self.cache_size)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---------------------------------------------
+    # Internals (callers hold self._lock)
+    # ---------------------------------------------
+    def _connection(self):
+        # Reopen after fork: a SQLite connection must not cross processes
+        if self._conn is None or self._pid != os.getpid():
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+            self._cache.clear()
+        return self._conn
+
+    def _insert(self, key, user_message, bot_message, reset, now):
+        created_at = now or time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                # Cached windows pick this row up on their next refresh
+                conn.execute(
+                    "INSERT INTO turns (conversation, user_message, bot_message, reset, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, user_message, bot_message, reset, created_at)
+                )
+            self._counters["appends"] += 1
+            self._appends_since_compact += 1
+            should_compact = self.compact_every and self._appends_since_compact >= self.compact_every
+        if should_compact:
+            self.compact()
+
+    def _load(self, key):
+        rows = self._connection().execute(
+            "SELECT id, user_message, bot_message, reset, created_at FROM turns "
+            "WHERE conversation = ? ORDER BY id DESC LIMIT ?",
+            (key, self._max_turns)
+        ).fetchall()
+        window = _Window(rows[0][0] if rows else 0, [])
+        self._apply(window, reversed(rows))
+        return window
+
+    def _refresh(self, key, window):
+        rows = self._connection().execute(
+            "SELECT id, user_message, bot_message, reset, created_at FROM turns "
+            "WHERE conversation = ? AND id > ? ORDER BY id",
+            (key, window.last_id)
+        ).fetchall()
+        self._apply(window, rows)
+
+    def _apply(self, window, rows):
+        for row_id, user_message, bot_message, reset, created_at in rows:
+            if reset:
+                window.turns = []
+            else:
+                window.turns.append((user_message, bot_message, created_at))
+            window.last_id = row_id
+        del window.turns[:-self._max_turns]
+
+    def _remember(self, key, window):
+        self._cache[key] = window
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+def create_conversation_store(app):
+    return ConversationStore(
+        app.config["CONVERSATION_STORE_PATH"],
+        window=app.config.get("CONVERSATION_WINDOW", 10),
+        ttl_seconds=int(app.config.get("CONVERSATION_TTL_HOURS", 168)) * 3600,
+        cache_size=app.config.get("CONVERSATION_CACHE_SIZE", 1024),
+    )
@@ -1,3 +1,106 @@
+import os
+import weakref
+
+import click
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 
 db = SQLAlchemy()
+
+
+def cli_command():
+    """Return the running ``flask`` command path (e.g. ``"flask db upgrade"``), or None."""
+    ctx = click.get_current_context(silent=True)
+    return ctx.command_path if ctx is not None else None
+
+
+def init_migrations(app):
+    # Flask-Migrate pulls in alembic, which is only needed by ``flask db``;
+    # skip it when the app is created to serve requests
+    if cli_command() is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+
+# ---------------------------------------------
+# Engine tuning
+# ---------------------------------------------
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def sqlite_pragmas(config):
+    """``(pragma, value)`` pairs applied to every new SQLite connection; empty settings are skipped."""
+    pragmas = [
+        ("journal_mode", config.get("SQLITE_JOURNAL_MODE", "WAL")),
+        ("synchronous", config.get("SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("busy_timeout", config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        # Negative cache_size is in KiB rather than pages
+        ("cache_size", -int(config.get("SQLITE_CACHE_SIZE_KIB", 65536) or 0) or None),
+        ("mmap_size", int(config.get("SQLITE_MMAP_SIZE_MB", 256) or 0) * 1024 * 1024 or None),
+    ]
+    return [(name, value) for name, value in pragmas if value not in (None, "")]
+
+
+def engine_options(config):
+    """Default ``SQLALCHEMY_ENGINE_OPTIONS`` for the configured database.
+
+    One pool per worker process, sized for its request threads plus the
+    background writers. In-memory SQLite keeps Flask-SQLAlchemy's single
+    shared connection, since every new connection would be a new database.
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if _is_memory_sqlite(url):
+        return {}
+    options = {
+        "pool_size": config.get("DB_POOL_SIZE", 8),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 8),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+    }
+    if url.get_backend_name() == "sqlite":
+        # Connections move between request threads via the pool; busy_timeout does the waiting
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = True
+    return options
+
+
+# A connection opened before gunicorn forks (create_all, warm-up) must not be shared by
+# workers. One hook for the process; app factories only add their engine to the set
+_forked_engines = weakref.WeakSet()
+
+
+def _dispose_after_fork():
+    for engine in list(_forked_engines):
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):  # not on Windows
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def init_database(app):
+    """``db.init_app`` with the pool defaults and per-connection SQLite pragmas from the config."""
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    for key, value in engine_options(app.config).items():
+        options.setdefault(key, value)
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+    url = engine.url
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        event.listen(engine, "connect", _apply_pragmas(sqlite_pragmas(app.config)))
+    _forked_engines.add(engine)
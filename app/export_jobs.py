@@ -0,0 +1,241 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+KINDS = ("chat", "mood")
+FORMATS = ("pdf",)
+TITLES = {"chat": "Chat Logs", "mood": "Mood Logs"}
+
+_JOB_ID = re.compile(r"^(chat|mood)-(pdf)-[0-9a-f]{16}$")
+
+
+# ---------------------------------------------
+# PDF rendering (runs in the worker pool)
+# ---------------------------------------------
+def _latin1(text):
+    # FPDF 1.7 core fonts are latin-1 only; replace emoji etc. instead of failing
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+
+def build_pdf(kind, rows, title=None):
+    """Lay out ``rows`` from ``exports.chat_rows``/``mood_rows`` as an FPDF document."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=_latin1(title or TITLES[kind]), ln=True, align='C')
+
+    if kind == "chat":
+        for timestamp, user_input, bot_response, _ in rows:
+            pdf.multi_cell(0, 10, _latin1(
+                f"{timestamp.strftime('%Y-%m-%d %H:%M:%S')}\nUser: {user_input}\nBot: {bot_response}\n"
+            ))
+    else:
+        for timestamp, mood in rows:
+            pdf.cell(0, 10, txt=_latin1(f"{timestamp.strftime('%Y-%m-%d %H:%M:%S')} - Mood: {mood}"), ln=True)
+    return pdf
+
+
+def render_export(source, user_id, kind, until_id, path):
+    """Render one export to ``path`` (atomically). ``source`` is a database URI or an Engine."""
+    from sqlalchemy import create_engine
+    from app.exports import chat_rows, mood_rows
+
+    engine = create_engine(source) if isinstance(source, str) else source
+    rows_for = chat_rows if kind == "chat" else mood_rows
+    try:
+        with engine.connect() as connection:
+            pdf = build_pdf(kind, rows_for(user_id, connection=connection, until_id=until_id))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pdf.output(tmp_path, 'F')
+        os.replace(tmp_path, path)
+    finally:
+        if isinstance(source, str):
+            engine.dispose()
+    return path
+
+
+# ---------------------------------------------
+# Job queue with content-addressed artifacts
+# ---------------------------------------------
+class ExportJobQueue:
+    """Render exports in a local worker pool and cache the results on disk.
+
+    A job id is ``<kind>-<format>-<hash>``, where the hash covers the user,
+    the id of their newest log row and the format. Repeat requests therefore
+    map to the same artifact until new logs arrive, and are served from disk
+    without rendering. All job state lives in the user's artifact directory,
+    so any gunicorn worker can answer a status poll:
+
+    * ``<job>.pdf``      finished artifact
+    * ``<job>.pending``  queued or rendering (stale after ``stale_after`` s)
+    * ``<job>.error``    last failure message
+
+    Rendering uses a ``ProcessPoolExecutor`` (no broker needed). With an
+    in-memory database, which another process cannot open, a thread pool
+    sharing the app's engine is used instead.
+    """
+
+    def __init__(self, directory, database, max_workers=2, use_processes=True, stale_after=600):
+        self.directory = directory
+        self.database = database
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.stale_after = stale_after
+
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._running = {}  # (user_id, job) -> Event set once the job is finalized
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+    def job_id(self, user_id, kind, fmt, last_log_id):
+        digest = hashlib.sha256(f"{user_id}:{kind}:{last_log_id}:{fmt}".encode()).hexdigest()[:16]
+        return f"{kind}-{fmt}-{digest}"
+
+    def submit(self, user_id, kind, last_log_id, fmt="pdf"):
+        """Queue an export unless its artifact exists or it is already running; return its status."""
+        if kind not in KINDS or fmt not in FORMATS:
+            raise ValueError(f"Unsupported export {kind!r}/{fmt!r}")
+        job = self.job_id(user_id, kind, fmt, last_log_id)
+        status = self.status(user_id, job)
+        if status["state"] in ("done", "pending"):
+            return status
+
+        os.makedirs(self._user_dir(user_id), exist_ok=True)
+        self._write(self._path(user_id, job, "pending"), "")
+        self._remove(self._path(user_id, job, "error"))
+
+        with self._lock:
+            self._running[(user_id, job)] = threading.Event()
+            future = self._executor().submit(
+                render_export, self._source(), user_id, kind, last_log_id, self._path(user_id, job, fmt)
+            )
+        future.add_done_callback(lambda f: self._finished(user_id, job, kind, fmt, f))
+        return self.status(user_id, job)
+
+    def status(self, user_id, job):
+        if not _JOB_ID.match(job):
+            return {"job_id": job, "state": "unknown"}
+        fmt = job.split("-")[1]
+        status = {"job_id": job, "state": "unknown"}
+        pending = self._path(user_id, job, "pending")
+        if os.path.exists(self._path(user_id, job, fmt)):
+            status["state"] = "done"
+        elif os.path.exists(pending) and time.time() - os.path.getmtime(pending) < self.stale_after:
+            status["state"] = "pending"
+        elif os.path.exists(self._path(user_id, job, "error")):
+            with open(self._path(user_id, job, "error"), encoding="utf-8") as f:
+                status.update(state="failed", error=f.read())
+        return status
+
+    def artifact(self, user_id, job):
+        """Return the artifact path if the job has finished, else None."""
+        if self.status(user_id, job)["state"] != "done":
+            return None
+        return self._path(user_id, job, job.split("-")[1])
+
+    def wait(self, user_id, job, timeout=None):
+        """Block until a job started by this process finishes (or ``timeout``); return its status."""
+        with self._lock:
+            finished = self._running.get((user_id, job))
+        if finished is not None:
+            finished.wait(timeout)
+        return self.status(user_id, job)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+    # ---------------------------------------------
+    # Internals
+    # ---------------------------------------------
+    def _executor(self):
+        # Created lazily (and re-created after fork) so preloaded masters never own a pool
+        if self._pool is None or self._pool_pid != os.getpid():
+            if self.use_processes:
+                import multiprocessing
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="export-job")
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _source(self):
+        if self.use_processes:
+            return self.database
+        from app.database import db
+        return db.engine
+
+    def _finished(self, user_id, job, kind, fmt, future):
+        error = future.exception()
+        if error is not None:
+            self._write(self._path(user_id, job, "error"), f"{type(error).__name__}: {error}")
+        else:
+            self._prune(user_id, kind, fmt, keep=job)
+        self._remove(self._path(user_id, job, "pending"))
+        with self._lock:
+            finished = self._running.pop((user_id, job), None)
+        if finished is not None:
+            finished.set()
+
+    def _prune(self, user_id, kind, fmt, keep):
+        # Older artifacts of the same export are superseded by the new one
+        prefix = f"{kind}-{fmt}-"
+        for name in os.listdir(self._user_dir(user_id)):
+            if name.startswith(prefix) and name.endswith(f".{fmt}") and name != f"{keep}.{fmt}":
+                self._remove(os.path.join(self._user_dir(user_id), name))
+
+    def _user_dir(self, user_id):
+        return os.path.join(self.directory, str(int(user_id)))
+
+    def _path(self, user_id, job, suffix):
+        return os.path.join(self._user_dir(user_id), f"{job}.{suffix}")
+
+    @staticmethod
+    def _write(path, text):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def last_log_id(kind, user_id):
+    from sqlalchemy import func
+    from app.database import db
+    from app.models import ChatLog, MoodEntry
+
+    if kind != "chat":
+        return MoodEntry.newest(user_id)
+    return db.session.query(func.max(ChatLog.id)).filter(ChatLog.user_id == user_id).scalar() or 0
+
+
+def create_export_jobs(app):
+    from app.database import _is_memory_sqlite, db
+
+    # Flask-SQLAlchemy resolves relative SQLite paths against the instance folder;
+    # spawned workers get the engine's resolved URL so they open the same file
+    with app.app_context():
+        url = db.engine.url
+    return ExportJobQueue(
+        app.config["EXPORT_DIR"],
+        url.render_as_string(hide_password=False),
+        max_workers=app.config.get("EXPORT_WORKERS", 2),
+        use_processes=not _is_memory_sqlite(url),
+        stale_after=app.config.get("EXPORT_JOB_TIMEOUT", 600),
+    )
@@ -0,0 +1,156 @@
+import base64
+import csv
+import json
+from datetime import datetime
+
+from flask import Response, stream_with_context
+from sqlalchemy import select, tuple_
+
+from app.database import db
+
+# Rows fetched per keyset page, and rows per chunk written to the socket
+PAGE_SIZE = 2000
+CHUNK_ROWS = 500
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+# Rows per page of the browsable (newest first) history
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+# ---------------------------------------------
+# Keyset-paginated reads
+# ---------------------------------------------
+def iter_user_rows(model, user_id, columns, page_size=PAGE_SIZE, connection=None, until_id=None, where=None):
+    """Yield ``columns`` of a user's ``model`` rows in (timestamp, id) order.
+
+    Each page is one indexed range query starting after the last row of the
+    previous page, so memory stays flat and late pages are as cheap as early
+    ones (no ``OFFSET``). Rows are plain tuples rather than ORM objects.
+    ``connection`` defaults to the Flask-SQLAlchemy session; ``until_id``
+    pins the export to the rows that existed when it was requested (models
+    spanning several tables, like MoodEntry, interpret it via ``pinned``).
+    ``where`` adds criteria (e.g. a query's filters); with it ``user_id``
+    may be None.
+    """
+    execute = (connection or db.session).execute
+    key = tuple_(model.timestamp, model.id)
+    base = select(model.timestamp, model.id, *columns).order_by(model.timestamp, model.id).limit(page_size)
+    if user_id is not None:
+        base = base.where(model.user_id == user_id)
+    if where is not None:
+        base = base.where(where)
+    if until_id is not None:
+        pinned = getattr(model, "pinned", None)
+        base = base.where(pinned(until_id) if pinned else model.id <= until_id)
+    last = None
+    while True:
+        query = base if last is None else base.where(key > tuple_(*last))
+        rows = execute(query).all()
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        last = (rows[-1][0], rows[-1][1])
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor for the (timestamp, id) keyset position of a row."""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+
+
+def user_rows_page(model, user_id, columns, before=None, limit=HISTORY_PAGE_SIZE):
+    """One page of a user's rows, newest first, strictly older than ``before``.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last
+    page. Like :func:`iter_user_rows` this is a single range query on the
+    (user_id, timestamp) index however deep the page is.
+    """
+    query = (
+        select(model.timestamp, model.id, *columns)
+        .where(model.user_id == user_id)
+        .order_by(model.timestamp.desc(), model.id.desc())
+        .limit(limit + 1)
+    )
+    if before is not None:
+        query = query.where(tuple_(model.timestamp, model.id) < tuple_(*before))
+    rows = db.session.execute(query).all()
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_cursor(rows[limit - 1][0], rows[limit - 1][1])
+
+
+def chat_rows(user_id, **options):
+    from app.models import ChatLog
+
+    for timestamp, _, user_input, bot_response, mood in iter_user_rows(
+        ChatLog, user_id, (ChatLog.user_input, ChatLog.bot_response, ChatLog.mood), **options
+    ):
+        yield timestamp, user_input, bot_response, mood
+
+
+def mood_rows(user_id, **options):
+    from app.models import MoodEntry
+
+    for timestamp, _, mood in iter_user_rows(MoodEntry, user_id, (MoodEntry.mood,), **options):
+        yield timestamp, mood
+
+
+# ---------------------------------------------
+# Incremental encoders
+# ---------------------------------------------
+class _Echo:
+    """File-like object that hands ``csv.writer`` output straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(pieces, size=CHUNK_ROWS):
+    chunk = []
+    for piece in pieces:
+        chunk.append(piece)
+        if len(chunk) >= size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def csv_chunks(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    yield from _chunked(writer.writerow(row) for row in rows)
+
+
+def ndjson_chunks(records):
+    yield from _chunked(json.dumps(record) + "\n" for record in records)
+
+
+def json_array_chunks(records):
+    """Encode ``records`` as one JSON array without holding it in memory."""
+    def pieces():
+        for i, record in enumerate(records):
+            yield ("," if i else "") + json.dumps(record)
+
+    yield "["
+    yield from _chunked(pieces())
+    yield "]"
+
+
+def streamed_download(chunks, mimetype, filename=None):
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    if filename:
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
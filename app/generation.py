@@ -0,0 +1,149 @@
+import threading
+
+# ---------------------------------------------
+# Generation settings shared by every chat path
+# ---------------------------------------------
+MAX_PROMPT_TOKENS = 1000
+MAX_NEW_TOKENS = 80
+MODEL_MAX_LENGTH = 1024
+
+GENERATION_KWARGS = {
+    "do_sample": True,
+    "top_k": 50,
+    "top_p": 0.92,
+    "temperature": 0.7,
+    "repetition_penalty": 1.3,
+    "no_repeat_ngram_size": 3,
+}
+
+FALLBACK_RESPONSE = "Thanks for sharing that. I'm here to listen—want to talk more about it?"
+
+
+def prepare_tokenizer(tokenizer):
+    # 🔐 Enforce correct tokenizer settings for decoder-only batching
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    tokenizer.truncation_side = "left"
+    return tokenizer
+
+
+def build_prompt(tokenizer, chat_history, user_input, mood=None):
+    """Build a DialoGPT prompt from alternating user/bot history messages.
+
+    If ``mood`` is given, the current user turn is tagged with it so the
+    reply can be conditioned on the detected emotion.
+    """
+    full_convo = ""
+    for i, msg in enumerate(chat_history):
+        speaker = "User" if i % 2 == 0 else "Bot"
+        full_convo += f"{speaker}: {msg.strip()} {tokenizer.eos_token} "
+    mood_tag = f"[{mood}] " if mood else ""
+    full_convo += f"User: {mood_tag}{user_input.strip()} {tokenizer.eos_token}"
+    return full_convo
+
+
+def tokenize_prompts(tokenizer, prompts, device):
+    inputs = tokenizer(
+        prompts,
+        return_tensors='pt',
+        padding=True,
+        truncation=True,
+        max_length=MAX_PROMPT_TOKENS
+    )
+    return inputs['input_ids'].to(device), inputs['attention_mask'].to(device)
+
+
+def _generate(model, tokenizer, input_ids, attention_mask, draft_model=None, **extra):
+    # Speculative decoding: the draft proposes tokens, the model verifies them in
+    # one forward pass and rejection-samples, so replies keep the same
+    # distribution (processors and top-k/top-p included). Single sequences only.
+    if draft_model is not None and input_ids.shape[0] == 1:
+        extra["assistant_model"] = draft_model
+    return model.generate(
+        input_ids=input_ids,
+        attention_mask=attention_mask,
+        max_length=min(MODEL_MAX_LENGTH, input_ids.shape[1] + MAX_NEW_TOKENS),
+        pad_token_id=tokenizer.eos_token_id,
+        **GENERATION_KWARGS,
+        **extra
+    )
+
+
+def generate_replies(model, tokenizer, prompts, device="cpu", draft_model=None):
+    """Run one left-padded ``generate()`` call and decode each continuation."""
+    prepare_tokenizer(tokenizer)
+    input_ids, attention_mask = tokenize_prompts(tokenizer, prompts, device)
+
+    output_ids = _generate(model, tokenizer, input_ids, attention_mask, draft_model=draft_model)
+
+    continuations = output_ids[:, input_ids.shape[-1]:]
+    return [tokenizer.decode(row, skip_special_tokens=True) for row in continuations]
+
+
+def generate_reply_cached(model, tokenizer, prompt, kv_cache, key, device="cpu", streamer=None, draft_model=None):
+    """Generate one reply, reusing the conversation's KV cache for the shared prefix."""
+    prepare_tokenizer(tokenizer)
+    input_ids, attention_mask = tokenize_prompts(tokenizer, [prompt], device)
+
+    past_key_values = kv_cache.take(key, input_ids[0].tolist())
+    output = _generate(
+        model, tokenizer, input_ids, attention_mask,
+        draft_model=draft_model,
+        past_key_values=past_key_values,
+        return_dict_in_generate=True,
+        streamer=streamer,
+    )
+    kv_cache.put(key, output.sequences[0].tolist(), output.past_key_values)
+
+    return tokenizer.decode(output.sequences[0, input_ids.shape[-1]:], skip_special_tokens=True)
+
+
+def stream_reply(model, tokenizer, prompt, device="cpu", timeout=60.0, kv_cache=None, key=None, draft_model=None):
+    """Yield decoded text fragments of one reply while ``generate()`` is running.
+
+    ``TextIteratorStreamer`` detokenizes incrementally and only emits text
+    once it is stable, so multi-byte characters are never split.
+    """
+    from transformers import TextIteratorStreamer
+
+    prepare_tokenizer(tokenizer)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, timeout=timeout, skip_special_tokens=True)
+    errors = []
+
+    def run():
+        try:
+            if kv_cache is not None:
+                generate_reply_cached(model, tokenizer, prompt, kv_cache, key, device, streamer=streamer,
+                                      draft_model=draft_model)
+            else:
+                input_ids, attention_mask = tokenize_prompts(tokenizer, [prompt], device)
+                _generate(model, tokenizer, input_ids, attention_mask, draft_model=draft_model, streamer=streamer)
+        except Exception as exc:
+            errors.append(exc)
+            streamer.end()
+
+    thread = threading.Thread(target=run, name="generation-stream", daemon=True)
+    thread.start()
+    for fragment in streamer:
+        if fragment:
+            yield fragment
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def clean_response(raw_output, user_input):
+    bot_output = raw_output.strip()
+
+    # 🔁 Avoid echoing user input
+    if bot_output.lower().startswith(user_input.lower()):
+        bot_output = bot_output[len(user_input):].strip()
+
+    # ❌ Remove repeated words
+    bot_output = ' '.join(dict.fromkeys(bot_output.split()))
+
+    # 📏 Enforce minimum response
+    if not bot_output or len(bot_output.split()) < 3:
+        bot_output = FALLBACK_RESPONSE
+    return bot_output
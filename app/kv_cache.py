@@ -0,0 +1,166 @@
+import threading
+from collections import OrderedDict
+
+
+# ---------------------------------------------
+# Helpers for legacy tuple caches and Cache objects
+# ---------------------------------------------
+def _layers(past_key_values):
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+
+def cache_length(past_key_values):
+    if hasattr(past_key_values, "get_seq_length"):
+        return past_key_values.get_seq_length()
+    return past_key_values[0][0].shape[-2]
+
+
+def cache_nbytes(past_key_values):
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for layer in _layers(past_key_values)
+        for tensor in layer
+    )
+
+
+def crop_cache(past_key_values, length):
+    """Keep only the first ``length`` positions of a KV cache."""
+    if hasattr(past_key_values, "crop"):
+        past_key_values.crop(length)
+        return past_key_values
+    return tuple(
+        tuple(tensor[..., :length, :] for tensor in layer)
+        for layer in past_key_values
+    )
+
+
+def common_prefix_length(a, b):
+    limit = min(len(a), len(b))
+    for i in range(limit):
+        if a[i] != b[i]:
+            return i
+    return limit
+
+
+class _Entry:
+    __slots__ = ("token_ids", "past_key_values", "nbytes")
+
+    def __init__(self, token_ids, past_key_values):
+        self.token_ids = token_ids
+        self.past_key_values = past_key_values
+        self.nbytes = cache_nbytes(past_key_values)
+
+
+# ---------------------------------------------
+# Per-conversation KV-cache store
+# ---------------------------------------------
+class ConversationKVCache:
+    """Keep each conversation's ``past_key_values`` between chat turns.
+
+    Entries are keyed by conversation (the user id) and hold the token ids the
+    cache was computed for. On the next turn the longest common token prefix
+    with the new prompt is reused and only the remainder is prefilled. When
+    the history window slides, the prefix no longer lines up and the prompt is
+    re-encoded in full. Entries are evicted least-recently-used once the total
+    size exceeds ``max_bytes``.
+
+    :meth:`take` removes the entry while a turn is generating, so two
+    concurrent requests for the same conversation never share a cache.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, min_reuse_tokens=16):
+        self.max_bytes = max_bytes
+        self.min_reuse_tokens = min_reuse_tokens
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "reused_tokens": 0,
+            "prefilled_tokens": 0,
+        }
+
+    def take(self, key, input_ids):
+        """Pop the entry for ``key`` and return a cache covering a prefix of ``input_ids``.
+
+        Returns ``None`` if there is nothing worth reusing, in which case the
+        caller re-encodes the whole prompt.
+        """
+        input_ids = [int(t) for t in input_ids]
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+        reuse = 0
+        if entry is not None:
+            # At least one prompt token must be fed to the model to get logits
+            reuse = min(common_prefix_length(entry.token_ids, input_ids), len(input_ids) - 1)
+
+        with self._lock:
+            if reuse < self.min_reuse_tokens:
+                self._counters["misses"] += 1
+                self._counters["prefilled_tokens"] += len(input_ids)
+                return None
+            self._counters["hits"] += 1
+            self._counters["reused_tokens"] += reuse
+            self._counters["prefilled_tokens"] += len(input_ids) - reuse
+        return crop_cache(entry.past_key_values, reuse)
+
+    def put(self, key, sequence_ids, past_key_values):
+        """Store the cache produced by ``generate()`` for ``key``.
+
+        The last sampled token is never fed back through the model, so the
+        cache covers one position less than the returned sequence.
+        """
+        length = cache_length(past_key_values)
+        entry = _Entry([int(t) for t in sequence_ids[:length]], past_key_values)
+        if entry.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._counters["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._counters,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
+
+
+def create_kv_cache(app):
+    if not app.config.get("KV_CACHE_ENABLED"):
+        return None
+    return ConversationKVCache(
+        max_bytes=int(app.config.get("KV_CACHE_MAX_MB", 256)) * 1024 * 1024,
+        min_reuse_tokens=app.config.get("KV_CACHE_MIN_REUSE_TOKENS", 16),
+    )
@@ -0,0 +1,372 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from app.database import db
+from app.scheduler import LeaderLock
+
+logger = logging.getLogger(__name__)
+
+
+def _fsync_dir(path):
+    if os.name == "nt":
+        return  # directories can't be opened for fsync on Windows
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ---------------------------------------------
+# Write-behind log persistence
+# ---------------------------------------------
+class LogWriter:
+    """Buffer chat turns in memory and persist them as ChatLog rows in batches.
+
+    :meth:`record` appends the turn to a local spool file and returns; a
+    background thread inserts everything buffered in one transaction every
+    ``flush_interval_ms`` or as soon as ``max_records`` are waiting. Rows go
+    through the ORM, so the mood rollups stay current.
+
+    Crash safety: each process appends to its own spool segment
+    (``<owner>-<n>.jsonl``), which is deleted only after its records are
+    committed. ``<owner>`` is the pid plus a random suffix, and the process
+    holds an OS lock on ``owners/<owner>.lock`` for as long as it runs, so a
+    reused pid (e.g. after a container restart) never makes a dead owner
+    look alive. A process that finds segments of a dead owner claims them
+    (atomic rename) and replays them, skipping turns that already made it
+    into the database. By default the spool only survives a crash of the
+    process. With ``fsync`` every turn is also on disk before :meth:`record`
+    returns and survives a host crash; concurrent turns share one fsync
+    (group commit), issued outside the writer lock. Clean shutdown flushes
+    via :meth:`close` (atexit).
+
+    Read-your-writes: while a user has buffered turns, a marker file
+    ``pending/<user_id>.<owner>`` exists. :meth:`wait_visible` flushes this
+    process's buffer, or waits for other live owners' markers to clear.
+    """
+
+    def __init__(self, app, spool_dir, flush_interval_ms=200, max_records=256, read_wait=5.0, fsync=False):
+        self.app = app
+        self.spool_dir = spool_dir
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_records = max_records
+        self.read_wait = read_wait
+        self.fsync = fsync
+
+        self._lock = threading.Lock()        # buffer, segment and markers
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._sync_lock = threading.Lock()   # one fsync at a time; waiters piggyback on it
+        self._wake = threading.Event()
+        self._pid = None
+        self._owner = None
+        self._owner_lock = None
+        self._thread = None
+        self._closed = False
+        self._reset()
+        self._counters = {"records": 0, "flushes": 0, "flushed_records": 0, "failed_flushes": 0,
+                          "recovered_records": 0}
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+    def record(self, user_id, user_input, bot_response, mood, mood_score=None):
+        record = {
+            "user_id": user_id,
+            "user_input": user_input,
+            "bot_response": bot_response,
+            "mood": mood,
+            "mood_score": mood_score,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._check_pid()
+            if self._segment is None:
+                self._open_segment()
+            self._segment.write(line)
+            self._segment.flush()  # in the OS page cache: survives a crash of this process
+            self._written += 1
+            written = self._written
+            self._pending.append(record)
+            if user_id not in self._pending_users:
+                self._pending_users.add(user_id)
+                open(self._marker(user_id), "a").close()
+            self._counters["records"] += 1
+            full = len(self._pending) >= self.max_records
+        if self.fsync:
+            self._sync(written)  # on disk: survives a host crash
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Commit everything buffered in this process; return the number of turns written."""
+        with self._flush_lock:
+            with self._lock:
+                self._check_pid()
+                if not self._pending:
+                    return 0
+                batch, users = self._pending, self._pending_users
+                self._pending, self._pending_users = [], set()
+                segments = self._sealed + ([self._seal()] if self._segment is not None else [])
+                self._sealed = []
+
+            try:
+                self._insert(batch)
+            except Exception:
+                logger.exception("Write-behind flush of %d turns failed; will retry", len(batch))
+                with self._lock:
+                    self._pending[:0] = batch
+                    self._pending_users |= users
+                    self._sealed[:0] = segments
+                    self._counters["failed_flushes"] += 1
+                return 0
+
+            for path in segments:
+                _remove(path)
+            with self._lock:
+                for user_id in users - self._pending_users:
+                    _remove(self._marker(user_id))
+                self._counters["flushes"] += 1
+                self._counters["flushed_records"] += len(batch)
+            return len(batch)
+
+    def wait_visible(self, user_id, timeout=None):
+        """Block until every buffered turn of ``user_id`` is in the database (or ``timeout``)."""
+        # The marker outlives the buffer entry until the commit, so this also covers an in-flight flush
+        if self._pid == os.getpid() and os.path.exists(self._marker(user_id)):
+            self.flush()
+
+        deadline = time.monotonic() + (self.read_wait if timeout is None else timeout)
+        while self._foreign_markers(user_id):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def recover(self):
+        """Replay spool segments left behind by processes that are no longer running."""
+        with self._lock:
+            self._check_pid()
+        recovered = 0
+        dead = set()
+        for name in sorted(os.listdir(self.spool_dir)):
+            if ".jsonl" not in name:
+                continue
+            owner = name.rsplit(".claim-", 1)[1] if ".claim-" in name else name.split("-", 1)[0]
+            if self._alive(owner):
+                continue
+            dead.add(owner)
+            path = os.path.join(self.spool_dir, name)
+            claimed = f"{path.split('.jsonl')[0]}.jsonl.claim-{self._owner}"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # another worker claimed it first
+            records = []
+            with open(claimed, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass  # torn final line from the crash
+            recovered += self._insert(records, dedupe=True)
+            _remove(claimed)
+
+        pending_dir = os.path.join(self.spool_dir, "pending")
+        for name in os.listdir(pending_dir):
+            owner = name.rsplit(".", 1)[1]
+            if not self._alive(owner):
+                dead.add(owner)
+                _remove(os.path.join(pending_dir, name))
+        for owner in dead:
+            _remove(self._owner_lock_path(owner))
+        with self._lock:
+            self._counters["recovered_records"] += recovered
+        return recovered
+
+    def close(self, timeout=None):
+        """Stop the flusher and write out everything still buffered."""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+        with self._lock:
+            if self._segment is not None and not self._pending:
+                _remove(self._seal())
+                self._sealed.clear()
+            if self._owner_lock is not None and self._pid == os.getpid() and not self._pending:
+                self._owner_lock.release()
+                _remove(self._owner_lock.path)
+                self._owner_lock, self._owner = None, None
+                self._pid = None  # registers a new owner if the writer is used again
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, pending=len(self._pending), pending_users=len(self._pending_users))
+
+    # ---------------------------------------------
+    # Internals
+    # ---------------------------------------------
+    def _reset(self):
+        self._pending = []         # turns not yet committed, oldest first
+        self._pending_users = set()
+        self._segment = None       # open spool file receiving new turns
+        self._segment_path = None
+        self._sealed = []          # closed segments whose turns are still pending
+        self._seq = 0
+        self._written = 0          # turns appended to the spool by this process
+        self._synced = 0           # turns known to be on disk
+
+    def _check_pid(self):
+        # After fork the parent's buffer, segment, flusher and owner lock belong to the parent
+        if self._pid != os.getpid():
+            if self._owner_lock is not None:
+                self._owner_lock.forget()
+            self._reset()
+            self._thread = None
+            self._pid = os.getpid()
+            os.makedirs(os.path.join(self.spool_dir, "pending"), exist_ok=True)
+            os.makedirs(os.path.join(self.spool_dir, "owners"), exist_ok=True)
+            self._owner = f"{self._pid}_{uuid.uuid4().hex[:12]}"
+            self._owner_lock = LeaderLock(self._owner_lock_path(self._owner))
+            if not self._owner_lock.acquire():
+                raise RuntimeError(f"Spool owner lock {self._owner_lock.path} is already held")
+
+    def _owner_lock_path(self, owner):
+        return os.path.join(self.spool_dir, "owners", f"{owner}.lock")
+
+    def _alive(self, owner):
+        """True for this process and for owners still holding their lock."""
+        if owner == self._owner and self._pid == os.getpid():
+            return True
+        path = self._owner_lock_path(owner)
+        if not os.path.exists(path):
+            return False  # never registered, or cleaned up after recovery
+        lock = LeaderLock(path)
+        if lock.acquire():
+            lock.release()
+            return False
+        return True
+
+    def _sync(self, written):
+        """Return once turn number ``written`` is on disk, fsyncing everything written so far if needed."""
+        with self._sync_lock:
+            if self._synced >= written:
+                return  # a concurrent fsync already covered this turn
+            with self._lock:
+                upto = self._written
+                # Sealed segments were closed by a flush; their turns are committed or will be
+                fd = os.dup(self._segment.fileno()) if self._segment is not None else None
+            if fd is not None:
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            self._synced = upto
+
+    def _open_segment(self):
+        self._seq += 1
+        self._segment_path = os.path.join(self.spool_dir, f"{self._owner}-{self._seq}.jsonl")
+        self._segment = open(self._segment_path, "a", encoding="utf-8")
+        if self.fsync:
+            _fsync_dir(self.spool_dir)  # make the new file's directory entry durable too
+
+    def _seal(self):
+        path = self._segment_path
+        if self.fsync and self._synced < self._written:
+            os.fsync(self._segment.fileno())  # its turns aren't committed yet; _sync won't see it again
+        self._segment.close()
+        self._segment, self._segment_path = None, None
+        return path
+
+    def _marker(self, user_id):
+        return os.path.join(self.spool_dir, "pending", f"{user_id}.{self._owner}")
+
+    def _foreign_markers(self, user_id):
+        prefix = f"{user_id}."
+        own = self._owner if self._pid == os.getpid() else None  # a forked child owns nothing yet
+        markers = []
+        for name in os.listdir(os.path.join(self.spool_dir, "pending")):
+            if name.startswith(prefix):
+                owner = name[len(prefix):]
+                if owner != own and self._alive(owner):
+                    markers.append(name)
+        return markers
+
+    def _ensure_started(self):
+        if self._closed or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            self.recover()
+        except Exception:
+            logger.exception("Write-behind spool recovery failed")
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _insert(self, records, dedupe=False):
+        from app.models import ChatLog
+
+        written = 0
+        with self.app.app_context():
+            try:
+                for record in records:
+                    timestamp = datetime.fromisoformat(record["timestamp"])
+                    if dedupe and db.session.query(ChatLog.id).filter_by(
+                        user_id=record["user_id"], timestamp=timestamp, user_input=record["user_input"]
+                    ).first():
+                        continue
+                    chat = ChatLog(user_id=record["user_id"], user_input=record["user_input"],
+                                   bot_response=record["bot_response"], mood=record["mood"],
+                                   mood_score=record["mood_score"])
+                    chat.timestamp = timestamp
+                    db.session.add(chat)
+                    written += 1
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        return written
+
+
+def create_log_writer(app):
+    """Return a LogWriter when ``LOG_WRITE_BEHIND`` is enabled, else None (synchronous commits)."""
+    if not app.config.get("LOG_WRITE_BEHIND", False):
+        return None
+    spool_dir = app.config["LOG_SPOOL_DIR"]
+    os.makedirs(os.path.join(spool_dir, "pending"), exist_ok=True)
+    os.makedirs(os.path.join(spool_dir, "owners"), exist_ok=True)
+    writer = LogWriter(
+        app,
+        spool_dir,
+        flush_interval_ms=app.config.get("LOG_FLUSH_INTERVAL_MS", 200),
+        max_records=app.config.get("LOG_FLUSH_MAX_RECORDS", 256),
+        read_wait=app.config.get("LOG_READ_WAIT_S", 5.0),
+        fsync=app.config.get("LOG_SPOOL_FSYNC", False),
+    )
+    atexit.register(writer.close, timeout=5)
+    return writer
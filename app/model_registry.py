@@ -0,0 +1,285 @@
+import threading
+import time
+
+from flask import current_app
+
+
+# ---------------------------------------------
+# Process-wide, load-once model cache
+# ---------------------------------------------
+_shared = {}
+_shared_locks = {}
+_shared_guard = threading.Lock()
+
+
+def load_once(key, loader):
+    """Run ``loader`` at most once per process for ``key`` and return its result.
+
+    Every registry (and ``model_loader.load_models``) goes through here, so two
+    app instances in the same process never hold two copies of the weights.
+    """
+    with _shared_guard:
+        lock = _shared_locks.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _shared:
+            _shared[key] = loader()
+        return _shared[key]
+
+
+def resolve_device(inference_mode="fp32"):
+    import torch
+
+    # Dynamically quantized int8 kernels are CPU-only
+    if inference_mode != "int8" and torch.cuda.is_available():
+        return "cuda"
+    return "cpu"
+
+
+def load_chatbot(model_path, inference_mode="fp32", device="cpu"):
+    """Return ``(tokenizer, model)`` for the fine-tuned DialoGPT checkpoint."""
+    def load():
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        from app.generation import prepare_tokenizer
+        from app.quantization import apply_inference_mode, model_nbytes
+
+        print(f"[INFO] Loading DialoGPT from {model_path} ({inference_mode})...")
+        tokenizer = prepare_tokenizer(AutoTokenizer.from_pretrained(model_path))
+        model = AutoModelForCausalLM.from_pretrained(model_path, low_cpu_mem_usage=True)
+        model = apply_inference_mode(model.to(device), inference_mode)
+        print(f"[INFO] DialoGPT loaded ({model_nbytes(model) / 2**20:.1f} MB).")
+        return tokenizer, model
+
+    return load_once(("chatbot", model_path, inference_mode, device), load)
+
+
+def load_emotion_classifier(model_name, inference_mode="fp32"):
+    """Return the ``text-classification`` pipeline used for mood detection."""
+    def load():
+        from transformers import pipeline
+        from app.quantization import apply_inference_mode, model_nbytes
+
+        print(f"[INFO] Loading emotion classifier {model_name} ({inference_mode})...")
+        classifier = pipeline(
+            "text-classification",
+            model=model_name,
+            top_k=1,
+            truncation=True
+        )
+        classifier.model = apply_inference_mode(classifier.model, inference_mode)
+        print(f"[INFO] Emotion classifier loaded ({model_nbytes(classifier.model) / 2**20:.1f} MB).")
+        return classifier
+
+    return load_once(("emotion_classifier", model_name, inference_mode), load)
+
+
+def load_draft_model(model_path, inference_mode="fp32", device="cpu", num_tokens=5, schedule="heuristic"):
+    """Return the small draft model used for speculative decoding with the chatbot."""
+    def load():
+        from transformers import AutoModelForCausalLM
+        from app.quantization import apply_inference_mode, model_nbytes
+
+        print(f"[INFO] Loading draft model from {model_path} ({inference_mode})...")
+        model = AutoModelForCausalLM.from_pretrained(model_path, low_cpu_mem_usage=True)
+        model = apply_inference_mode(model.to(device), inference_mode).eval()
+        # Tokens proposed per verification step; "heuristic" adapts it to the acceptance rate
+        model.generation_config.num_assistant_tokens = num_tokens
+        model.generation_config.num_assistant_tokens_schedule = schedule
+        print(f"[INFO] Draft model loaded ({model_nbytes(model) / 2**20:.1f} MB).")
+        return model
+
+    return load_once(("draft", model_path, inference_mode, device), load)
+
+
+def load_prompt_encoder(model_name):
+    """Return ``(model, tokenizer)`` of a sentence-embedding encoder for the semantic cache."""
+    def load():
+        from transformers import AutoModel, AutoTokenizer
+
+        print(f"[INFO] Loading prompt encoder {model_name}...")
+        return AutoModel.from_pretrained(model_name).eval(), AutoTokenizer.from_pretrained(model_name)
+
+    return load_once(("prompt_encoder", model_name), load)
+
+
+# ---------------------------------------------
+# Lazy registry with readiness reporting
+# ---------------------------------------------
+class _Slot:
+    __slots__ = ("names", "factory", "lock", "state", "values", "error", "load_seconds")
+
+    def __init__(self, names, factory):
+        self.names = names
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.state = "cold"
+        self.values = {}
+        self.error = None
+        self.load_seconds = None
+
+
+class ModelRegistry:
+    """Load models lazily on first use and report when they are warm.
+
+    Factories are registered by name and run on the first :meth:`get`;
+    concurrent callers wait for the same load instead of starting their own.
+    A factory may provide several names at once (the DialoGPT tokenizer and
+    model load together) by returning a tuple in the same order.
+
+    Under gunicorn with ``preload_app`` the registry is warmed in the master
+    before forking, so every worker shares the weights copy-on-write.
+    """
+
+    def __init__(self):
+        self._slots = {}
+
+    def register(self, names, factory):
+        names = (names,) if isinstance(names, str) else tuple(names)
+        slot = _Slot(names, factory)
+        for name in names:
+            self._slots[name] = slot
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    def get(self, name):
+        slot = self._slots[name]
+        if slot.state != "ready":
+            self._load(slot)
+        return slot.values[name]
+
+    def peek(self, name):
+        """Return ``name`` if it is already loaded, without triggering a load."""
+        slot = self._slots.get(name)
+        if slot is None or slot.state != "ready":
+            return None
+        return slot.values[name]
+
+    def warm(self, names=None):
+        """Load ``names`` (default: everything) now, in the calling thread."""
+        for slot in self._unique_slots(names):
+            self._load(slot)
+        return self
+
+    def warm_in_background(self, names=None):
+        def run():
+            for slot in self._unique_slots(names):
+                try:
+                    self._load(slot)
+                except Exception:
+                    pass  # recorded on the slot and reported by status()
+
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self):
+        return all(slot.state == "ready" for slot in self._unique_slots())
+
+    def status(self):
+        return {
+            name: {"state": slot.state, "load_seconds": slot.load_seconds, "error": slot.error}
+            for name, slot in self._slots.items()
+        }
+
+    def _unique_slots(self, names=None):
+        slots = []
+        for name in names or self._slots:
+            slot = self._slots[name]
+            if slot not in slots:
+                slots.append(slot)
+        return slots
+
+    def _load(self, slot):
+        with slot.lock:
+            if slot.state == "ready":
+                return
+            slot.state = "loading"
+            started = time.perf_counter()
+            try:
+                values = slot.factory()
+                if len(slot.names) == 1:
+                    values = (values,)
+                slot.values = dict(zip(slot.names, values))
+            except Exception as exc:
+                # Left retryable: the next get() tries again
+                slot.state = "failed"
+                slot.error = f"{type(exc).__name__}: {exc}"
+                raise
+            slot.state = "ready"
+            slot.error = None
+            slot.load_seconds = round(time.perf_counter() - started, 3)
+
+
+def create_model_registry(app):
+    config = app.config
+    registry = ModelRegistry()
+
+    def chatbot():
+        return load_chatbot(config["MODEL_PATH"], config["INFERENCE_MODE"], registry.get("device"))
+
+    def emotion_classifier():
+        return load_emotion_classifier(config["EMOTION_MODEL"], config["INFERENCE_MODE"])
+
+    def mood_classifier():
+        from app.mood import create_mood_classifier
+        return create_mood_classifier(app, registry.get("emotion_classifier"))
+
+    def generation_batcher():
+        from app.batching import create_generation_batcher
+        return create_generation_batcher(
+            app, registry.get("chatbot_model"), registry.get("chatbot_tokenizer"), registry.get("device")
+        )
+
+    def draft_model():
+        if not config.get("SPECULATIVE_DECODING"):
+            return None
+        draft = load_draft_model(config["DRAFT_MODEL_PATH"], config["INFERENCE_MODE"], registry.get("device"),
+                                 config.get("SPECULATIVE_NUM_TOKENS", 5),
+                                 config.get("SPECULATIVE_SCHEDULE", "heuristic"))
+        target = registry.get("chatbot_model")
+        if draft.config.vocab_size != target.config.vocab_size:
+            raise ValueError(f"Draft model vocabulary ({draft.config.vocab_size}) does not match "
+                             f"the chatbot's ({target.config.vocab_size})")
+        return draft
+
+    def semantic_cache():
+        from app.semantic_cache import create_semantic_cache
+        return create_semantic_cache(app)
+
+    registry.register("device", lambda: resolve_device(config["INFERENCE_MODE"]))
+    registry.register(("chatbot_tokenizer", "chatbot_model"), chatbot)
+    registry.register("emotion_classifier", emotion_classifier)
+    registry.register("mood_classifier", mood_classifier)
+    registry.register("generation_batcher", generation_batcher)
+    registry.register("draft_model", draft_model)
+    registry.register("semantic_cache", semantic_cache)
+    return registry
+
+
+# ---------------------------------------------
+# Access from request handlers
+# ---------------------------------------------
+def get_model(name, load=True):
+    """Look up a model (or model-derived object) for the current app.
+
+    Objects placed directly in ``app.config`` take precedence, which is how
+    tests inject small models; otherwise the app's registry loads it on
+    first use. With ``load=False`` only already-loaded objects are returned.
+    """
+    config = current_app.config
+    if name in config:
+        return config[name]
+    registry = config.get("model_registry")
+    if registry is None or name not in registry:
+        return None
+    return registry.get(name) if load else registry.peek(name)
+
+
+def model_status(app):
+    """Return ``(ready, details)`` for the readiness probe."""
+    registry = app.config.get("model_registry")
+    if registry is None:
+        ready = app.config.get("chatbot_model") is not None
+        return ready, {}
+    return registry.ready, registry.status()
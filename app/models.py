@@ -1,9 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from datetime import datetime
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.database import db
-from sqlalchemy import func
+from sqlalchemy import and_, event, func, literal_column, or_, select, union_all
+from sqlalchemy.orm import declared_attr
 
 
 # ---------------------------------------------------
@@ -44,13 +47,21 @@ class User(db.Model, UserMixin):
         return check_password_hash(self.password_hash, password)
 
     def get_recent_moods(self, limit=10):
-        return MoodLog.query.filter_by(user_id=self.id).order_by(MoodLog.timestamp.desc()).limit(limit).all()
+        return (
+            MoodEntry.query.filter_by(user_id=self.id)
+            .order_by(MoodEntry.timestamp.desc(), MoodEntry.id.desc())
+            .limit(limit)
+            .all()
+        )
 
     def get_mood_counts(self):
+        # Served from the weekly rollup: a few rows per week instead of every MoodLog
+        total = func.sum(MoodWeekly.mood_count)
         return (
-            db.session.query(MoodLog.mood, func.count(MoodLog.mood))
-            .filter_by(user_id=self.id)
-            .group_by(MoodLog.mood)
+            db.session.query(MoodWeekly.mood, total)
+            .filter(MoodWeekly.user_id == self.id)
+            .group_by(MoodWeekly.mood)
+            .having(total > 0)
             .all()
         )
 
@@ -75,6 +86,10 @@ class User(db.Model, UserMixin):
 # ---------------------------------------------------
 class ChatLog(db.Model):
     __tablename__ = 'chat_logs'
+    __table_args__ = (
+        # Every per-user read filters on user_id and orders by timestamp (id, the rowid, breaks ties)
+        db.Index('ix_chat_logs_user_id_timestamp', 'user_id', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -85,11 +100,12 @@ class ChatLog(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 
-    def __init__(self, user_id, user_input, bot_response, mood):
+    def __init__(self, user_id, user_input, bot_response, mood, mood_score=None):
         self.user_id = user_id
         self.user_input = user_input
         self.bot_response = bot_response
         self.mood = mood
+        self.mood_score = mood_score
 
     def __repr__(self):
         return f"<ChatLog {self.id} | User {self.user_id}>"
@@ -107,10 +123,15 @@ class ChatLog(db.Model):
 
 
 # ---------------------------------------------------
-# MoodLog Model
+# MoodLog Model (manually entered moods only)
 # ---------------------------------------------------
 class MoodLog(db.Model):
+    # Chat turns keep their mood on ChatLog; read moods through MoodEntry, which covers both
     __tablename__ = 'mood_logs'
+    __table_args__ = (
+        # Covering for mood reads (id keeps the keyset order): exports, recent moods and hourly trends
+        db.Index('ix_mood_logs_user_id_timestamp_mood', 'user_id', 'timestamp', 'id', 'mood'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -133,3 +154,254 @@ class MoodLog(db.Model):
             "timestamp": self.timestamp.isoformat(),
             "mood": self.mood
         }
+
+
+# ---------------------------------------------------
+# MoodEntry (read-only: every mood, from chat turns and manual entries)
+# ---------------------------------------------------
+def _mood_entries():
+    chat, manual = ChatLog.__table__, MoodLog.__table__
+    return union_all(
+        select((chat.c.id * 2).label("id"), chat.c.id.label("source_id"),
+               literal_column("'chat'", db.String).label("source"),
+               chat.c.user_id, chat.c.timestamp, chat.c.mood).where(chat.c.mood.isnot(None)),
+        select((manual.c.id * 2 + 1).label("id"), manual.c.id.label("source_id"),
+               literal_column("'manual'", db.String).label("source"),
+               manual.c.user_id, manual.c.timestamp, manual.c.mood),
+    ).subquery("mood_entries")
+
+
+class MoodEntry(db.Model):
+    """A mood as MoodLog used to store it, mapped onto ``chat_logs`` UNION ALL ``mood_logs``.
+
+    ``id`` is unique across both sources (even for chat turns, odd for
+    manual entries) so it still breaks timestamp ties in keyset order;
+    ``source``/``source_id`` point back at the underlying row. SQLite pushes
+    per-user filters into both branches, so reads stay on the per-user
+    indexes. Insert ChatLog or MoodLog rows, never MoodEntry.
+    """
+    __table__ = _mood_entries()
+    __mapper_args__ = {"primary_key": [__table__.c.id]}
+
+    @classmethod
+    def pinned(cls, until):
+        """Rows that existed at ``until``, a ``(chat_id, mood_log_id)`` pair from :meth:`newest`."""
+        chat_id, manual_id = until
+        return or_(and_(cls.source == "chat", cls.source_id <= chat_id),
+                   and_(cls.source == "manual", cls.source_id <= manual_id))
+
+    @staticmethod
+    def newest(user_id):
+        return tuple(
+            db.session.query(func.max(model.id)).filter(model.user_id == user_id).scalar() or 0
+            for model in (ChatLog, MoodLog)
+        )
+
+    def __repr__(self):
+        return f"<MoodEntry {self.source} {self.source_id} | User {self.user_id} | Mood: {self.mood}>"
+
+    def __str__(self):
+        return self.__repr__()
+
+    def to_dict(self):
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "mood": self.mood
+        }
+
+
+# ---------------------------------------------------
+# Mood Rollups (per user, per day / ISO-ish week, per mood)
+# ---------------------------------------------------
+class _MoodRollup:
+    """Shared columns of the rollup tables.
+
+    ``mood_count`` counts MoodEntry rows (chat turns with a mood plus manual
+    MoodLog entries); ``score_sum``/``score_count`` total
+    the ``mood_score`` of ChatLog rows, so a period's average score is
+    ``sum(score_sum) / sum(score_count)`` over its moods. Rows are kept up to
+    date by the listeners below, backfilled by migration ``b7d2c4e9a1f3`` and
+    rebuilt by ``e6c3f9a2b184`` when chat moods stopped being copied to MoodLog.
+    """
+
+    @declared_attr
+    def user_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    mood = db.Column(db.String(50), nullable=False)
+    mood_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "mood": self.mood,
+            "count": self.mood_count,
+            "average_score": self.score_sum / self.score_count if self.score_count else None
+        }
+
+
+class MoodDaily(_MoodRollup, db.Model):
+    __tablename__ = 'mood_daily'
+    __table_args__ = (db.PrimaryKeyConstraint('user_id', 'day', 'mood'),)
+
+    day = db.Column(db.Date, nullable=False)
+
+    def __repr__(self):
+        return f"<MoodDaily User {self.user_id} | {self.day} | {self.mood}: {self.mood_count}>"
+
+
+class MoodWeekly(_MoodRollup, db.Model):
+    __tablename__ = 'mood_weekly'
+    __table_args__ = (db.PrimaryKeyConstraint('user_id', 'week', 'mood'),)
+
+    week = db.Column(db.String(7), nullable=False)  # strftime('%Y-%W'), as the dashboard always grouped by
+
+    def __repr__(self):
+        return f"<MoodWeekly User {self.user_id} | {self.week} | {self.mood}: {self.mood_count}>"
+
+
+UNKNOWN_MOOD = "unknown"
+
+
+def _rollup_delta(target, sign):
+    if isinstance(target, MoodLog):
+        return sign, 0.0, 0
+    mood_count = sign if target.mood is not None else 0
+    if target.mood_score is None:
+        return (mood_count, 0.0, 0) if mood_count else None
+    return mood_count, sign * target.mood_score, sign
+
+
+def _bump(connection, model, key, delta):
+    table = model.__table__
+    mood_count, score_sum, score_count = delta
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**key, mood_count=mood_count, score_sum=score_sum, score_count=score_count)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={
+                "mood_count": table.c.mood_count + stmt.excluded.mood_count,
+                "score_sum": table.c.score_sum + stmt.excluded.score_sum,
+                "score_count": table.c.score_count + stmt.excluded.score_count,
+            }
+        ))
+        return
+
+    # Portable fallback: update, insert if the row did not exist yet
+    match = [table.c[name] == value for name, value in key.items()]
+    result = connection.execute(table.update().where(*match).values(
+        mood_count=table.c.mood_count + mood_count,
+        score_sum=table.c.score_sum + score_sum,
+        score_count=table.c.score_count + score_count,
+    ))
+    if not result.rowcount:
+        connection.execute(table.insert().values(**key, mood_count=mood_count, score_sum=score_sum,
+                                                 score_count=score_count))
+
+
+def _update_rollups(connection, target, sign):
+    delta = _rollup_delta(target, sign)
+    if delta is None:
+        return
+    timestamp = target.timestamp or datetime.utcnow()
+    key = {"user_id": target.user_id, "mood": target.mood or UNKNOWN_MOOD}
+    _bump(connection, MoodDaily, dict(key, day=timestamp.date()), delta)
+    _bump(connection, MoodWeekly, dict(key, week=timestamp.strftime('%Y-%W')), delta)
+
+
+# Runs inside the flush, so the rollups commit (or roll back) with the log rows.
+# Bulk Query.delete()/update() bypass mapper events and leave the rollups stale.
+@event.listens_for(ChatLog, "after_insert")
+@event.listens_for(MoodLog, "after_insert")
+def _log_inserted(mapper, connection, target):
+    _update_rollups(connection, target, 1)
+
+
+@event.listens_for(ChatLog, "after_delete")
+@event.listens_for(MoodLog, "after_delete")
+def _log_deleted(mapper, connection, target):
+    _update_rollups(connection, target, -1)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    for model in (MoodDaily, MoodWeekly):
+        connection.execute(model.__table__.delete().where(model.__table__.c.user_id == target.id))
+
+
+def _daily_totals(start, end):
+    """``{(user_id, day, mood): [mood_count, score_sum, score_count]}`` of the logs in ``[start, end)``."""
+    totals = defaultdict(lambda: [0, 0.0, 0])
+    queries = (
+        select(MoodLog.user_id, func.date(MoodLog.timestamp, type_=db.Date), MoodLog.mood,
+               func.count(), literal_column("0.0"), literal_column("0"))
+        .where(MoodLog.timestamp >= start, MoodLog.timestamp < end),
+        select(ChatLog.user_id, func.date(ChatLog.timestamp, type_=db.Date), ChatLog.mood,
+               func.count(ChatLog.mood), func.coalesce(func.sum(ChatLog.mood_score), 0.0),
+               func.count(ChatLog.mood_score))
+        .where(ChatLog.timestamp >= start, ChatLog.timestamp < end,
+               or_(ChatLog.mood.isnot(None), ChatLog.mood_score.isnot(None))),
+    )
+    for query in queries:
+        grouped = query.group_by(*query.selected_columns[:3])  # user_id, date(timestamp), mood
+        for user_id, day, mood, count, score_sum, score_count in db.session.execute(grouped):
+            row = totals[(user_id, day, mood or UNKNOWN_MOOD)]
+            row[0] += count
+            row[1] += score_sum
+            row[2] += score_count
+    return totals
+
+
+def reconcile_rollups(now=None, weeks=4):
+    """Recount the rollups of the last ``weeks`` finished weeks from the logs and repair rows that drifted.
+
+    Bulk deletes/updates and hand edits skip the listeners above. Only days
+    and weeks before the current ``%W`` week (Monday onwards) are checked:
+    live inserts are stamped with the current time, so they never touch
+    those rows while this runs. The logs are counted per user, day and mood
+    in SQL and only inside the window, so a run costs the same however long
+    the history is. Returns ``{"checked": n, "fixed": n}``.
+    """
+    now = now or datetime.utcnow()
+    end = datetime.combine(now.date() - timedelta(days=now.weekday()), time.min)
+    start = end - timedelta(weeks=weeks)
+    daily = _daily_totals(start, end)
+    weekly = defaultdict(lambda: [0, 0.0, 0])
+    for (user_id, day, mood), row in daily.items():
+        totals = weekly[(user_id, day.strftime('%Y-%W'), mood)]
+        for i, value in enumerate(row):
+            totals[i] += value
+    expected = {MoodDaily: daily, MoodWeekly: weekly}
+
+    fixed = 0
+    # Both windows start on a Monday, so every %W week (even split at New Year) is wholly in or out
+    for model, period, low, high in ((MoodDaily, "day", start.date(), end.date()),
+                                     (MoodWeekly, "week", start.strftime('%Y-%W'), end.strftime('%Y-%W'))):
+        table = model.__table__
+        actual = {
+            (user_id, key, mood): (count, score_sum, score_count)
+            for user_id, key, mood, count, score_sum, score_count in db.session.execute(
+                select(table.c.user_id, table.c[period], table.c.mood, table.c.mood_count,
+                       table.c.score_sum, table.c.score_count).where(table.c[period] >= low, table.c[period] < high))
+        }
+        for key in expected[model].keys() | actual.keys():
+            count, score_sum, score_count = expected[model].get(key, (0, 0.0, 0))
+            found = actual.get(key, (0, 0.0, 0))
+            if found[0] == count and found[2] == score_count and math.isclose(found[1], score_sum, abs_tol=1e-9):
+                continue
+            user_id, period_key, mood = key
+            db.session.execute(table.delete().where(
+                table.c.user_id == user_id, table.c[period] == period_key, table.c.mood == mood))
+            if count or score_count:
+                db.session.execute(table.insert().values(user_id=user_id, mood=mood, mood_count=count,
+                                                         score_sum=score_sum, score_count=score_count,
+                                                         **{period: period_key}))
+            fixed += 1
+    db.session.commit()
+    return {"checked": len(daily) + len(weekly), "fixed": fixed}
@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+import torch
+import torch.nn.functional as F
+
+from app.batching import MicroBatcher
+
+# Valence of each j-hartmann/emotion-english-distilroberta-base label, used to
+# turn the probability vector into a single ChatLog.mood_score in [-1, 1].
+MOOD_VALENCE = {
+    "joy": 1.0,
+    "surprise": 0.25,
+    "neutral": 0.0,
+    "disgust": -0.5,
+    "anger": -0.75,
+    "fear": -0.75,
+    "sadness": -1.0,
+}
+
+
+def normalize_text(text):
+    return " ".join(text.casefold().split())
+
+
+class MoodResult:
+    __slots__ = ("label", "score", "probabilities", "mood_score")
+
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+        self.label, self.score = max(probabilities.items(), key=lambda item: item[1])
+        self.mood_score = sum(p * MOOD_VALENCE.get(label, 0.0) for label, p in probabilities.items())
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "score": self.score,
+            "mood_score": self.mood_score,
+            "probabilities": dict(self.probabilities),
+        }
+
+
+# ---------------------------------------------
+# Batched, cached emotion classification
+# ---------------------------------------------
+class MoodClassifier(MicroBatcher):
+    """Emotion classifier that batches concurrent calls and caches results.
+
+    Cache keys are normalized (case-folded, whitespace collapsed), so
+    repeated messages like "I feel sad" skip inference entirely; the model
+    itself sees the raw text, as with the pipeline. Cache misses are grouped into one padded forward pass by the micro-batcher.
+    Calling the instance returns the same ``[{"label", "score"}]`` shape as
+    the ``text-classification`` pipeline it replaces.
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size=16, max_wait_ms=5, cache_size=4096, max_length=128):
+        super().__init__(self._forward, max_batch_size=max_batch_size,
+                         max_wait_ms=max_wait_ms, name="mood-classifier")
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.labels = [model.config.id2label[i].lower() for i in range(len(model.config.id2label))]
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def peek(self, text):
+        """Return the cached result for ``text`` without running inference."""
+        with self._cache_lock:
+            return self._cache.get(normalize_text(text))
+
+    def classify(self, text):
+        key = normalize_text(text)
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return result
+            self._misses += 1
+
+        result = self.run(text)
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def __call__(self, text):
+        result = self.classify(text)
+        return [{"label": result.label, "score": result.score}]
+
+    def stats(self):
+        stats = super().stats()
+        with self._cache_lock:
+            stats.update(
+                cache_entries=len(self._cache),
+                cache_size=self.cache_size,
+                cache_hits=self._hits,
+                cache_misses=self._misses,
+            )
+        return stats
+
+    def _forward(self, texts):
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_length
+        )
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+        probs = F.softmax(logits.float(), dim=-1).tolist()
+        return [MoodResult(dict(zip(self.labels, row))) for row in probs]
+
+
+def create_mood_classifier(app, emotion_classifier):
+    """Wrap the model and tokenizer of a ``text-classification`` pipeline."""
+    return MoodClassifier(
+        emotion_classifier.model,
+        emotion_classifier.tokenizer,
+        max_batch_size=app.config.get("MOOD_MAX_BATCH_SIZE", 16),
+        max_wait_ms=app.config.get("MOOD_MAX_WAIT_MS", 5),
+        cache_size=app.config.get("MOOD_CACHE_SIZE", 4096),
+    )
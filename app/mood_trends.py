@@ -0,0 +1,166 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func
+
+from app.database import db
+
+BUCKETS = ("hour", "day", "week")
+DEFAULT_MAX_POINTS = 500
+# Hourly buckets read the raw logs, so an open-ended hourly range is clamped to this
+HOURLY_DEFAULT_SPAN = timedelta(days=7)
+
+
+# ---------------------------------------------
+# Request parsing
+# ---------------------------------------------
+def _parse_day(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date (YYYY-MM-DD)") from None
+
+
+def parse_window(args, today=None):
+    """Turn ``from``/``to``/``bucket``/``points`` query args into a window.
+
+    Returns ``(start, end, bucket, max_points)`` where ``start``/``end`` are
+    inclusive dates (``start`` may be None for "all history"). Raises
+    ``ValueError`` with a user-facing message for bad input.
+    """
+    bucket = args.get("bucket", "day")
+    if bucket not in BUCKETS:
+        raise ValueError(f"'bucket' must be one of {', '.join(BUCKETS)}")
+    end = _parse_day(args["to"], "to") if args.get("to") else (today or datetime.utcnow().date())
+    start = _parse_day(args["from"], "from") if args.get("from") else None
+    if start is None and bucket == "hour":
+        start = end - HOURLY_DEFAULT_SPAN
+    if start is not None and start > end:
+        raise ValueError("'from' must not be after 'to'")
+    try:
+        max_points = int(args.get("points", DEFAULT_MAX_POINTS))
+    except ValueError:
+        raise ValueError("'points' must be an integer") from None
+    return start, end, bucket, max(3, min(max_points, DEFAULT_MAX_POINTS))
+
+
+# ---------------------------------------------
+# Aggregation (in SQL, one row per bucket and mood)
+# ---------------------------------------------
+def _week_start(week):
+    # '%Y-%W' -> the Monday that starts it (week 00 may begin in the previous year)
+    year, number = (int(part) for part in week.split("-"))
+    first_monday = date(year, 1, 1) + timedelta(days=(7 - date(year, 1, 1).weekday()) % 7)
+    return first_monday + timedelta(weeks=number - 1)
+
+
+def _rollup_rows(user_id, start, end, bucket):
+    from app.models import MoodDaily, MoodWeekly
+
+    model, period = (MoodDaily, MoodDaily.day) if bucket == "day" else (MoodWeekly, MoodWeekly.week)
+    low = start if bucket == "day" else start and start.strftime('%Y-%W')
+    high = end if bucket == "day" else end.strftime('%Y-%W')
+    query = db.session.query(period, model.mood, model.mood_count, model.score_sum, model.score_count).filter(
+        model.user_id == user_id, period <= high
+    )
+    if low is not None:
+        query = query.filter(period >= low)
+    for key, mood, count, score_sum, score_count in query.order_by(period):
+        label = key if bucket == "day" else _week_start(key)
+        yield label.isoformat(), mood, count, score_sum, score_count
+
+
+def _hourly_rows(user_id, start, end):
+    from app.models import ChatLog, MoodEntry
+
+    low, high = datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+    hour = func.strftime('%Y-%m-%dT%H:00', MoodEntry.timestamp)
+    for label, mood, count in db.session.query(hour, MoodEntry.mood, func.count()).filter(
+        MoodEntry.user_id == user_id, MoodEntry.timestamp >= low, MoodEntry.timestamp < high
+    ).group_by(hour, MoodEntry.mood):
+        yield label, mood or "unknown", count, 0.0, 0
+
+    hour = func.strftime('%Y-%m-%dT%H:00', ChatLog.timestamp)
+    for label, mood, score_sum, score_count in db.session.query(
+        hour, ChatLog.mood, func.sum(ChatLog.mood_score), func.count(ChatLog.mood_score)
+    ).filter(
+        ChatLog.user_id == user_id, ChatLog.timestamp >= low, ChatLog.timestamp < high,
+        ChatLog.mood_score != None  # noqa: E711
+    ).group_by(hour, ChatLog.mood):
+        yield label, mood or "unknown", 0, score_sum, score_count
+
+
+def mood_buckets(user_id, start, end, bucket):
+    """Return one point per bucket, oldest first.
+
+    Each point has the bucket's ``date``, per-mood ``counts``, their total
+    ``count``, the dominant ``mood`` and the ``average_score`` of the chat
+    turns in it (None when no turn was scored).
+    """
+    rows = _hourly_rows(user_id, start, end) if bucket == "hour" else _rollup_rows(user_id, start, end, bucket)
+    buckets = {}
+    for label, mood, count, score_sum, score_count in rows:
+        point = buckets.setdefault(label, {"date": label, "counts": {}, "score_sum": 0.0, "score_count": 0})
+        if count:
+            point["counts"][mood] = point["counts"].get(mood, 0) + count
+        point["score_sum"] += score_sum or 0.0
+        point["score_count"] += score_count or 0
+
+    points = []
+    for label in sorted(buckets):
+        point = buckets[label]
+        score_sum, score_count = point.pop("score_sum"), point.pop("score_count")
+        if not point["counts"] and not score_count:
+            continue  # only deleted rows left in this bucket
+        point["count"] = sum(point["counts"].values())
+        point["mood"] = max(point["counts"], key=point["counts"].get) if point["counts"] else None
+        point["average_score"] = score_sum / score_count if score_count else None
+        points.append(point)
+    return points
+
+
+# ---------------------------------------------
+# Downsampling
+# ---------------------------------------------
+def lttb(points, threshold, x, y):
+    """Largest-Triangle-Three-Buckets: keep ``threshold`` points that preserve the shape.
+
+    Always keeps the first and last point; from each of the ``threshold - 2``
+    buckets in between it keeps the point forming the largest triangle with
+    the previously kept point and the average of the next bucket.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    xs = [x(point) for point in points]
+    ys = [y(point) for point in points]
+    every = (n - 2) / (threshold - 2)
+    kept = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+        next_stop = min(int((i + 2) * every) + 1, n)
+        next_points = range(stop, next_stop) if stop < next_stop else range(n - 1, n)
+        avg_x = sum(xs[j] for j in next_points) / len(next_points)
+        avg_y = sum(ys[j] for j in next_points) / len(next_points)
+
+        best, best_area = start, -1.0
+        for j in range(start, stop):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(points[best])
+        a = best
+    kept.append(points[-1])
+    return kept
+
+
+def downsample(points, max_points):
+    """Reduce ``points`` to at most ``max_points`` with LTTB over the average score."""
+    if len(points) <= max_points:
+        return points
+    return lttb(
+        points, max_points,
+        x=lambda point: datetime.fromisoformat(point["date"]).timestamp(),
+        y=lambda point: point["average_score"] or 0.0,
+    )
@@ -0,0 +1,145 @@
+import time
+
+import torch
+import torch.nn.functional as F
+
+INFERENCE_MODES = ("fp32", "int8", "bf16")
+
+
+# ---------------------------------------------
+# Applying an inference mode
+# ---------------------------------------------
+def _conv1d_to_linear(module):
+    """Swap GPT-2 style ``Conv1D`` layers for ``nn.Linear`` so they can be quantized.
+
+    ``quantize_dynamic`` only knows about ``nn.Linear``; DialoGPT's attention
+    and MLP projections are ``transformers.pytorch_utils.Conv1D`` (the same
+    affine map with a transposed weight).
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+    return module
+
+
+def apply_inference_mode(model, mode="fp32"):
+    """Return ``model`` converted for CPU inference in the given mode.
+
+    * ``fp32`` – unchanged.
+    * ``int8`` – dynamically quantized ``nn.Linear`` weights (activations stay fp32).
+    * ``bf16`` – all weights cast to bfloat16.
+    """
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"Unknown inference mode {mode!r}; expected one of {INFERENCE_MODES}")
+
+    if mode == "int8":
+        model = torch.quantization.quantize_dynamic(
+            _conv1d_to_linear(model), {torch.nn.Linear}, dtype=torch.qint8
+        )
+    elif mode == "bf16":
+        model = model.to(torch.bfloat16)
+    model.eval()
+    return model
+
+
+def _tensors(value):
+    if isinstance(value, torch.Tensor):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _tensors(item)
+
+
+def model_nbytes(model):
+    """Bytes held by the model's weights, including packed int8 params.
+
+    Tied weights (DialoGPT's embedding and LM head) are counted once.
+    """
+    seen, total = set(), 0
+    for value in model.state_dict().values():
+        for tensor in _tensors(value):
+            key = tensor.data_ptr()
+            if key in seen:
+                continue
+            seen.add(key)
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+# ---------------------------------------------
+# Accuracy regression check and throughput
+# ---------------------------------------------
+def compare_causal_lm(reference, candidate, tokenizer, prompts):
+    """Compare next-token logits of ``candidate`` against the fp32 ``reference``.
+
+    Returns the mean cosine similarity of the logits, the top-1 next-token
+    agreement and the mean KL divergence (reference || candidate).
+    """
+    cosine, agreement, kl = [], [], []
+    with torch.no_grad():
+        for prompt in prompts:
+            input_ids = tokenizer(prompt, return_tensors="pt")["input_ids"]
+            ref = reference(input_ids).logits[0, -1].float()
+            cand = candidate(input_ids).logits[0, -1].float()
+            cosine.append(F.cosine_similarity(ref, cand, dim=0).item())
+            agreement.append(float(ref.argmax() == cand.argmax()))
+            kl.append(F.kl_div(F.log_softmax(cand, -1), F.log_softmax(ref, -1),
+                               log_target=True, reduction="sum").item())
+    n = len(prompts)
+    return {
+        "cosine": sum(cosine) / n,
+        "top1_agreement": sum(agreement) / n,
+        "kl_divergence": sum(kl) / n,
+    }
+
+
+def compare_classifier(reference, candidate, tokenizer, texts):
+    """Label agreement and max probability drift of a sequence classifier."""
+    with torch.no_grad():
+        inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+        ref = F.softmax(reference(**inputs).logits.float(), dim=-1)
+        cand = F.softmax(candidate(**inputs).logits.float(), dim=-1)
+    return {
+        "label_agreement": (ref.argmax(-1) == cand.argmax(-1)).float().mean().item(),
+        "max_probability_drift": (ref - cand).abs().max().item(),
+    }
+
+
+def check_regression(metrics, thresholds):
+    """Return a list of human-readable failures; empty when within thresholds.
+
+    ``thresholds`` maps a metric name to ``("min", value)`` or ``("max", value)``.
+    """
+    failures = []
+    for name, (kind, limit) in thresholds.items():
+        value = metrics[name]
+        if (kind == "min" and value < limit) or (kind == "max" and value > limit):
+            failures.append(f"{name}={value:.4f} ({kind} {limit})")
+    return failures
+
+
+def tokens_per_second(model, tokenizer, prompts, max_new_tokens=32):
+    """Greedy-decoding throughput, so every mode generates the same length."""
+    generated, elapsed = 0, 0.0
+    with torch.no_grad():
+        for prompt in prompts:
+            inputs = tokenizer(prompt, return_tensors="pt")
+            started = time.perf_counter()
+            output = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.eos_token_id,
+            )
+            elapsed += time.perf_counter() - started
+            generated += output.shape[1] - inputs["input_ids"].shape[1]
+    return generated / elapsed if elapsed else 0.0
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(text):
+    """Case, whitespace, curly quotes and trailing punctuation don't change the key ("Hi!" == "hi")."""
+    text = text.replace("’", "'").replace("‘", "'")
+    return " ".join(text.casefold().split()).strip(" .!?,;:~")
+
+
+def model_version(config):
+    """Identify the replies a model produces: checkpoint, inference mode and sampling settings."""
+    if config.get("RESPONSE_CACHE_MODEL_VERSION"):
+        return config["RESPONSE_CACHE_MODEL_VERSION"]
+    from app.generation import GENERATION_KWARGS, MAX_NEW_TOKENS
+
+    settings = json.dumps([GENERATION_KWARGS, MAX_NEW_TOKENS], sort_keys=True)
+    digest = hashlib.sha256(settings.encode()).hexdigest()[:12]
+    return f"{config.get('MODEL_PATH')}:{config.get('INFERENCE_MODE', 'fp32')}:{digest}"
+
+
+class _Pool:
+    __slots__ = ("responses", "sampled", "next", "expires_at")
+
+    def __init__(self, expires_at):
+        self.responses = []
+        self.sampled = 0
+        self.next = 0
+        self.expires_at = expires_at
+
+
+# ---------------------------------------------
+# First-turn response cache
+# ---------------------------------------------
+class ResponseCache:
+    """Sampled replies to common opening messages, shared by every user.
+
+    Only turns without history are cached: the reply then depends on
+    nothing but the message (and the mood tag, when conditioning is on), so
+    it is keyed on the normalized message, the mood and ``model_version``.
+    Each key collects ``pool_size`` generated replies; until the pool is
+    full every request still generates (and adds its reply), after that
+    requests are served round-robin from the pool, so users keep seeing
+    varied answers. Pools expire ``ttl_seconds`` after the first reply and
+    are refilled; at most ``max_entries`` keys are kept (LRU). Messages
+    longer than ``max_input_chars`` are never cached.
+    """
+
+    def __init__(self, model_version, pool_size=4, ttl_seconds=3600, max_entries=1024, max_input_chars=64):
+        self.model_version = model_version
+        self.pool_size = pool_size
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_input_chars = max_input_chars
+
+        self._lock = threading.Lock()
+        self._pools = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "fills": 0, "expirations": 0, "evictions": 0}
+
+    def key(self, user_input, mood=None):
+        """Cache key for a first-turn message, or None if it should not be cached."""
+        normalized = normalize_prompt(user_input)
+        if not normalized or len(normalized) > self.max_input_chars:
+            return None
+        return self.model_version, mood, normalized
+
+    def get(self, key):
+        """Next reply from a full pool, or None (the caller generates and calls :meth:`add`)."""
+        now = time.monotonic()
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None and pool.expires_at <= now:
+                del self._pools[key]
+                self._counters["expirations"] += 1
+                pool = None
+            if pool is None or pool.sampled < self.pool_size:
+                self._counters["misses"] += 1
+                return None
+            self._pools.move_to_end(key)
+            self._counters["hits"] += 1
+            response = pool.responses[pool.next % len(pool.responses)]
+            pool.next += 1
+            return response
+
+    def add(self, key, response):
+        """Add a freshly generated reply to ``key``'s pool (identical replies are kept once)."""
+        now = time.monotonic()
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None or pool.expires_at <= now:
+                pool = self._pools[key] = _Pool(now + self.ttl_seconds)
+            if pool.sampled >= self.pool_size:
+                return
+            pool.sampled += 1
+            if response not in pool.responses:
+                pool.responses.append(response)
+            self._counters["fills"] += 1
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_entries:
+                self._pools.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._pools.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return dict(self._counters, entries=len(self._pools), max_entries=self.max_entries,
+                        hit_rate=self._counters["hits"] / lookups if lookups else None)
+
+
+def create_response_cache(app):
+    if not app.config.get("RESPONSE_CACHE_ENABLED"):
+        return None
+    return ResponseCache(
+        model_version(app.config),
+        pool_size=app.config.get("RESPONSE_CACHE_POOL_SIZE", 4),
+        ttl_seconds=app.config.get("RESPONSE_CACHE_TTL_S", 3600),
+        max_entries=app.config.get("RESPONSE_CACHE_SIZE", 1024),
+        max_input_chars=app.config.get("RESPONSE_CACHE_MAX_INPUT_CHARS", 64),
+    )
@@ -1,11 +1,17 @@
-from flask import Blueprint, request, jsonify, session, render_template, current_app
+from flask import Blueprint, request, jsonify, session, render_template, current_app, Response, stream_with_context
 from flask_login import current_user, login_required
-from pathlib import Path
-from ..models import db, MoodLog, ChatLog
+from ..models import db, ChatLog
+from ..generation import build_prompt, clean_response, generate_replies, generate_reply_cached, stream_reply
+from ..model_registry import get_model, model_status
+from ..therapists import search_args
+from concurrent.futures import Future, ThreadPoolExecutor
 import traceback, json
 
 chat_bp = Blueprint('chat_bp', __name__)
 
+# Mood classification runs here so it overlaps with generate()
+_mood_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mood-detect")
+
 # Mood emojis and tips
 mood_emojis = {
     'joy': '😊', 'sadness': '😢', 'anger': '😠', 'fear': '😨',
@@ -21,103 +27,161 @@ tips = {
     'neutral': "How are you feeling really?"
 }
 
+def _validate_message():
+    user_input = (request.get_json(silent=True) or {}).get("message", "").strip()
+    if not user_input:
+        return None, (jsonify({"error": "Empty message"}), 400)
+    if len(user_input) > 300:
+        return None, (jsonify({"error": "Message too long. Please limit to 300 characters."}), 400)
+    return user_input, None
+
+
+def _detect_mood(emotion_classifier, mood_classifier, user_input):
+    """Return ``(mood, mood_score)``; the score is only known via the mood service."""
+    try:
+        if mood_classifier is not None:
+            result = mood_classifier.classify(user_input)
+            return result.label, result.mood_score
+        emotion_result = emotion_classifier(user_input)[0]
+        return emotion_result['label'].lower(), None
+    except Exception:
+        return 'neutral', None
+
+
+def _start_mood_detection(user_input):
+    """Classify the user's mood off the request thread, in parallel with generation.
+
+    Returns a future of ``(mood, mood_score)``. Inputs already in the mood
+    service's cache resolve immediately, so they can condition the prompt.
+    """
+    emotion_classifier = get_model("emotion_classifier")
+    mood_classifier = get_model("mood_classifier")
+    if mood_classifier is not None and mood_classifier.peek(user_input) is not None:
+        future = Future()
+        future.set_result(_detect_mood(emotion_classifier, mood_classifier, user_input))
+        return future
+    return _mood_pool.submit(_detect_mood, emotion_classifier, mood_classifier, user_input)
+
+
+def _conditioning_mood(mood_future):
+    # Never wait for the classifier here: only use a mood that is already known
+    if current_app.config.get("CHAT_MOOD_CONDITIONING") and mood_future.done():
+        return mood_future.result()[0]
+    return None
+
+
+def _first_turn_reply(chat_history, user_input, mood):
+    """Return ``(reply, remember)`` for a turn without history.
+
+    ``reply`` comes from the exact first-turn cache, else from the semantic
+    cache (paraphrases); when it is None, ``remember(bot_output)`` caches the
+    generated reply. Both are None for turns that are never cached.
+    """
+    response_cache = current_app.config.get("response_cache")
+    if response_cache is None or chat_history:
+        return None, None
+    key = response_cache.key(user_input, mood)
+    if key is None:
+        return None, None
+    semantic_cache = get_model("semantic_cache")
+    reply = response_cache.get(key)
+    if reply is None and semantic_cache is not None:
+        reply = semantic_cache.lookup(key, user_id=current_user.id)
+    if reply is not None:
+        return reply, None
+
+    def remember(bot_output):
+        response_cache.add(key, bot_output)
+        if semantic_cache is not None:
+            semantic_cache.add(key, bot_output)
+    return None, remember
+
+
+def _add_mood_tip(bot_output, mood):
+    emoji_icon = mood_emojis.get(mood, '😐')
+    tip = tips.get(mood, '')
+    if tip and tip not in bot_output:
+        bot_output += f" {emoji_icon} {tip}"
+    return bot_output, emoji_icon, tip
+
+
+def _record_turn(user_input, bot_output, mood, mood_score=None):
+    # 💾 Append the turn to the conversation store
+    current_app.config["conversation_store"].append(current_user.id, user_input, bot_output)
+
+    # 🗂 Log to DB (buffered and committed in batches when write-behind is on)
+    user_id = current_user.id
+    log_writer = current_app.config.get("log_writer")
+    if log_writer is not None:
+        log_writer.record(user_id, user_input, bot_output, mood, mood_score)
+        return
+    db.session.add(ChatLog(user_id=user_id, user_input=user_input, bot_response=bot_output,
+                           mood=mood, mood_score=mood_score))  # the mood is read back via MoodEntry
+    db.session.commit()
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
 @chat_bp.route("/api/chat", methods=["POST"])
 @login_required
 def chat():
     try:
-        tokenizer = current_app.config["chatbot_tokenizer"]
-        model = current_app.config["chatbot_model"]
-        emotion_classifier = current_app.config["emotion_classifier"]
-        device = current_app.config["device"]
+        tokenizer = get_model("chatbot_tokenizer")
+        model = get_model("chatbot_model")
+        device = get_model("device")
 
-        user_input = request.json.get("message", "").strip()
-        if not user_input:
-            return jsonify({"error": "Empty message"}), 400
-        if len(user_input) > 300:
-            return jsonify({"error": "Message too long. Please limit to 300 characters."}), 400
+        user_input, error = _validate_message()
+        if error:
+            return error
 
-        # 🔐 Enforce correct tokenizer settings
-        tokenizer.padding_side = "left"
-        tokenizer.truncation_side = "left"
+        # 🧠 Detect mood while the response is being generated
+        mood_future = _start_mood_detection(user_input)
 
-        # 🔄 Load session history
-        chat_history = session.get("chat_history", [])[-10:]
+        # 🔄 Load recent history
+        chat_history = current_app.config["conversation_store"].history(current_user.id)
 
         # 🧠 Build prompt using alternating speaker roles
-        full_convo = ""
-        for i, msg in enumerate(chat_history):
-            speaker = "User" if i % 2 == 0 else "Bot"
-            full_convo += f"{speaker}: {msg.strip()} {tokenizer.eos_token} "
-        full_convo += f"User: {user_input.strip()} {tokenizer.eos_token}"
-
-        # 📦 Tokenize
-        inputs = tokenizer(
-            full_convo,
-            return_tensors='pt',
-            padding=True,
-            truncation=True,
-            max_length=1000
-        )
-        input_ids = inputs['input_ids'].to(device)
-        attention_mask = inputs['attention_mask'].to(device)
-
-        # 🤖 Generate response
-        output_ids = model.generate(
-            input_ids=input_ids,
-            attention_mask=attention_mask,
-            max_length=min(1024, input_ids.shape[1] + 80),
-            pad_token_id=tokenizer.eos_token_id,
-            do_sample=True,
-            top_k=50,
-            top_p=0.92,
-            temperature=0.7,
-            repetition_penalty=1.3,
-            no_repeat_ngram_size=3
-        )
-
-        # 🧹 Clean output
-        raw_output = tokenizer.decode(output_ids[:, input_ids.shape[-1]:][0], skip_special_tokens=True)
-        bot_output = raw_output.strip()
-
-        # 🔁 Avoid echoing user input
-        if bot_output.lower().startswith(user_input.lower()):
-            bot_output = bot_output[len(user_input):].strip()
-
-        # ❌ Remove repeated words
-        bot_output = ' '.join(dict.fromkeys(bot_output.split()))
-
-        # 📏 Enforce minimum response
-        if not bot_output or len(bot_output.split()) < 3:
-            bot_output = "Thanks for sharing that. I'm here to listen—want to talk more about it?"
-
-        # 🧠 Detect mood
-        try:
-            emotion_result = emotion_classifier(user_input)[0]
-            mood = emotion_result['label'].lower()
-        except Exception:
-            mood = 'neutral'
+        conditioning_mood = _conditioning_mood(mood_future)
+        full_convo = build_prompt(tokenizer, chat_history, user_input, mood=conditioning_mood)
+
+        # ♻️ Common opening messages (and their paraphrases) are answered from a pool of earlier replies
+        bot_output, remember = _first_turn_reply(chat_history, user_input, conditioning_mood)
+
+        if bot_output is None:
+            # 🤖 Generate response: reuse this conversation's KV cache, or
+            # micro-batch with concurrent requests when enabled; a draft model
+            # (speculative decoding) works on single sequences, so it skips the batcher
+            kv_cache = current_app.config.get("kv_cache")
+            draft_model = get_model("draft_model")
+            batcher = get_model("generation_batcher") if draft_model is None else None
+            if kv_cache is not None:
+                raw_output = generate_reply_cached(model, tokenizer, full_convo, kv_cache, current_user.id, device,
+                                                   draft_model=draft_model)
+            elif batcher is not None:
+                raw_output = batcher.run(full_convo)
+            else:
+                raw_output = generate_replies(model, tokenizer, [full_convo], device, draft_model=draft_model)[0]
+
+            # 🧹 Clean output
+            bot_output = clean_response(raw_output, user_input)
+            if remember is not None:
+                remember(bot_output)
+
+        # 🧠 Join mood detection
+        mood, mood_score = mood_future.result()
 
         # 😊 Add emoji and tip
-        emoji_icon = mood_emojis.get(mood, '😐')
-        tip = tips.get(mood, '')
-        if tip and tip not in bot_output:
-            bot_output += f" {emoji_icon} {tip}"
-
-        # 💾 Update session
-        session["chat_history"] = (session.get("chat_history", []) + [user_input, bot_output])[-10:]
-        session["last_detected_mood"] = mood
-        session.modified = True
+        bot_output, emoji_icon, tip = _add_mood_tip(bot_output, mood)
 
-        # 🗂 Log to DB
-        user_id = current_user.id
-        db.session.add(ChatLog(user_id=user_id, user_input=user_input, bot_response=bot_output, mood=mood))
-        db.session.add(MoodLog(user_id=user_id, mood=mood))
-        db.session.commit()
+        _record_turn(user_input, bot_output, mood, mood_score)
 
         # ✅ Return JSON response
         return jsonify({
             "response": bot_output,
             "mood": mood,
+            "mood_score": mood_score,
             "emoji": emoji_icon,
             "tip": tip
         })
@@ -127,13 +191,103 @@ def chat():
         return jsonify({"error": "Internal server error."}), 500
 
 
+@chat_bp.route("/api/chat/stream", methods=["POST"])
+@login_required
+def chat_stream():
+    """Streaming variant of /api/chat: tokens are sent as Server-Sent Events.
+
+    ``token`` events carry raw text fragments as they are decoded. The final
+    ``done`` event carries the post-processed message (the same cleanup and
+    mood tip as /api/chat), which the client should display instead of the
+    concatenated fragments. ``error`` is sent if generation fails mid-stream.
+    """
+    user_input, error = _validate_message()
+    if error:
+        return error
+
+    tokenizer = get_model("chatbot_tokenizer")
+    model = get_model("chatbot_model")
+    device = get_model("device")
+
+    kv_cache = current_app.config.get("kv_cache")
+    draft_model = get_model("draft_model")
+    conversation_key = current_user.id
+
+    mood_future = _start_mood_detection(user_input)
+    chat_history = current_app.config["conversation_store"].history(current_user.id)
+    conditioning_mood = _conditioning_mood(mood_future)
+    full_convo = build_prompt(tokenizer, chat_history, user_input, mood=conditioning_mood)
+    cached_output, remember = _first_turn_reply(chat_history, user_input, conditioning_mood)
+
+    def events():
+        try:
+            bot_output = cached_output
+            if bot_output is not None:
+                # A cached reply arrives as one fragment
+                yield _sse("token", {"token": bot_output})
+            else:
+                fragments = []
+                for fragment in stream_reply(model, tokenizer, full_convo, device, kv_cache=kv_cache,
+                                             key=conversation_key, draft_model=draft_model):
+                    fragments.append(fragment)
+                    yield _sse("token", {"token": fragment})
+
+                bot_output = clean_response("".join(fragments), user_input)
+                if remember is not None:
+                    remember(bot_output)
+            mood, mood_score = mood_future.result()
+            bot_output, emoji_icon, tip = _add_mood_tip(bot_output, mood)
+
+            _record_turn(user_input, bot_output, mood, mood_score)
+
+            yield _sse("done", {"response": bot_output, "mood": mood, "mood_score": mood_score,
+                                "emoji": emoji_icon, "tip": tip})
+        except Exception:
+            current_app.logger.error("[CHAT STREAM ERROR] %s", traceback.format_exc())
+            yield _sse("error", {"error": "Internal server error."})
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
+
+@chat_bp.route("/api/chat/metrics", methods=["GET"])
+@login_required
+def chat_metrics():
+    batcher = get_model("generation_batcher", load=False)
+    kv_cache = current_app.config.get("kv_cache")
+    mood_classifier = get_model("mood_classifier", load=False)
+    response_cache = current_app.config.get("response_cache")
+    semantic_cache = get_model("semantic_cache", load=False)
+    return jsonify({
+        "generation_batching": batcher.stats() if batcher is not None else None,
+        "kv_cache": kv_cache.stats() if kv_cache is not None else None,
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "mood_classifier": mood_classifier.stats() if mood_classifier is not None else None
+    })
+
+
+@chat_bp.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once the models are loaded, 503 while warming up."""
+    is_ready, models = model_status(current_app)
+    return jsonify({"ready": is_ready, "models": models}), 200 if is_ready else 503
+
+
 @chat_bp.route("/reset_chat", methods=["POST"])
 @login_required
 def reset_chat():
     try:
+        current_app.config["conversation_store"].clear(current_user.id)
+        # Drop history left in sessions created before the conversation store
         session.pop("chat_history", None)
         session.pop("mood_log", None)
         session.modified = True
+        kv_cache = current_app.config.get("kv_cache")
+        if kv_cache is not None:
+            kv_cache.invalidate(current_user.id)
         return jsonify({"status": "reset", "message": "Chat session cleared."}), 200
     except Exception:
         return jsonify({"error": "Failed to reset chat"}), 500
@@ -142,12 +296,8 @@ def reset_chat():
 @chat_bp.route("/contact_therapist")
 @login_required
 def contact_therapist():
-    therapists = []
-    try:
-        path = Path("data/therapists.json")
-        if path.exists():
-            with path.open("r", encoding="utf-8") as f:
-                therapists = json.load(f)
-    except Exception:
-        therapists = []
-    return render_template("contact_therapist.html", therapists=therapists)
+    # 📇 Served from the in-memory directory, reloaded only when the file changes
+    directory = current_app.config["therapist_directory"]
+    filters = search_args(request.args)
+    return render_template("contact_therapist.html", therapists=directory.search(**filters),
+                           locations=directory.locations(), filters=filters)
@@ -1,20 +1,28 @@
-from flask import Blueprint, render_template, redirect, url_for, jsonify, send_file, make_response, session, current_app
+from flask import Blueprint, render_template, redirect, url_for, jsonify, send_file, session, current_app, request
 from flask_login import current_user, login_required
-from ..models import MoodLog, ChatLog
+from ..models import ChatLog, MoodWeekly
 from app.database import db
-import io
-import csv
-from fpdf import FPDF
-from app.utils import export_logs_as_json
+from app.mood_trends import downsample, mood_buckets, parse_window
+from app.exports import (
+    HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, TIMESTAMP_FORMAT, chat_rows, csv_chunks, decode_cursor,
+    json_array_chunks, mood_rows, ndjson_chunks, streamed_download, user_rows_page
+)
+from app.therapists import search_args
+from config import Config
+from .chat import mood_emojis
 import os
-import requests
 import json
-from pathlib import Path
 from sqlalchemy import func
-import psutil
 
 views_bp = Blueprint("views", __name__)
 
+@views_bp.before_request
+def _read_your_writes():
+    # Every view here reads the user's logs; make their buffered chat turns visible first
+    log_writer = current_app.config.get("log_writer")
+    if log_writer is not None and current_user.is_authenticated:
+        log_writer.wait_visible(current_user.id)
+
 # ---------------------------------------------
 # Home Route
 # ---------------------------------------------
@@ -35,20 +43,18 @@ def dashboard():
     recent_logs = ChatLog.query.filter_by(user_id=user_id).order_by(ChatLog.timestamp.desc()).limit(50).all()
 
     try:
+        # Weekly averages come from the rollup table (a few rows per week, not a scan of every ChatLog)
+        score_count = func.sum(MoodWeekly.score_count)
         weekly_mood = db.session.query(
-            func.strftime('%Y-%W', ChatLog.timestamp),
-            func.avg(ChatLog.mood_score) 
+            MoodWeekly.week,
+            func.sum(MoodWeekly.score_sum) / score_count
         ).filter(
-            ChatLog.user_id == user_id,
-            ChatLog.mood_score != None
-        ).group_by(func.strftime('%Y-%W', ChatLog.timestamp)).all()
+            MoodWeekly.user_id == user_id
+        ).group_by(MoodWeekly.week).having(score_count > 0).order_by(MoodWeekly.week).all()
     except Exception as e:
         print(f"Error in mood trend query: {e}")
         weekly_mood = []
 
-    memory = psutil.virtual_memory()
-    print(f"Memory used: {memory.percent}%")
-
     return render_template("index.html", logs=recent_logs, mood_trend=weekly_mood)
 # ---------------------------------------------
 # Mood Trends Page (Chart)
@@ -62,9 +68,22 @@ def mood_trends():
 @views_bp.route("/mood-trends/data")
 @login_required
 def mood_trends_data():
-    mood_data = MoodLog.query.filter_by(user_id=current_user.id).all()
-    data = [{"date": log.timestamp.strftime('%Y-%m-%d'), "mood": log.mood} for log in mood_data]
-    return jsonify(data)
+    """Mood per hour/day/week bucket between ``from`` and ``to`` (inclusive dates).
+
+    Counts and average scores are aggregated in SQL (day/week from the
+    rollup tables) and long ranges are downsampled to at most ``points``
+    buckets, so the payload is bounded however much history exists.
+    """
+    try:
+        start, end, bucket, max_points = parse_window(request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    points = downsample(mood_buckets(current_user.id, start, end, bucket), max_points)
+    response = jsonify(points)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
 
 # ---------------------------------------------
 # Chat History Viewer
@@ -72,22 +91,55 @@ def mood_trends_data():
 @views_bp.route("/chat-history")
 @login_required
 def chat_history():
-    history = ChatLog.query.filter_by(user_id=current_user.id).order_by(ChatLog.timestamp.desc()).all()
-    return render_template("chat_history.html", history=history, username=current_user.username)
+    # Only the newest page is rendered; the template scrolls further through /chat-history/data
+    items, next_cursor = _history_page()
+    return render_template("chat_history.html", chat_history=items, next_cursor=next_cursor,
+                           mood_emojis=mood_emojis, username=current_user.username)
+
+@views_bp.route("/chat-history/data")
+@login_required
+def chat_history_data():
+    try:
+        before = decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = int(request.args.get("limit", HISTORY_PAGE_SIZE))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    items, next_cursor = _history_page(before, max(1, min(limit, HISTORY_MAX_PAGE_SIZE)))
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+def _history_page(before=None, limit=HISTORY_PAGE_SIZE):
+    rows, next_cursor = user_rows_page(
+        ChatLog, current_user.id, (ChatLog.user_input, ChatLog.bot_response, ChatLog.mood), before, limit
+    )
+    items = [
+        {"id": row_id, "timestamp": timestamp.strftime(TIMESTAMP_FORMAT),
+         "user_input": user_input, "bot_response": bot_response, "mood": mood}
+        for timestamp, row_id, user_input, bot_response, mood in rows
+    ]
+    return items, next_cursor
 
 # ---------------------------------------------
-# Export Chat Logs - JSON
+# Export Chat Logs - JSON / NDJSON
 # ---------------------------------------------
+def _chat_records(user_id):
+    for timestamp, user_input, bot_response, mood in chat_rows(user_id):
+        yield {
+            "timestamp": timestamp.strftime(TIMESTAMP_FORMAT),
+            "user_message": user_input,
+            "bot_response": bot_response,
+            "mood": mood
+        }
+
 @views_bp.route("/export/chat/json")
 @login_required
 def export_chat_json():
-    chats = ChatLog.query.filter_by(user_id=current_user.id).order_by(ChatLog.timestamp).all()
-    data = [{
-        "timestamp": c.timestamp.strftime("%Y-%m-%d %H:%M"),
-        "user_message": c.user_message,
-        "bot_response": c.bot_response
-    } for c in chats]
-    return jsonify(data)
+    return streamed_download(json_array_chunks(_chat_records(current_user.id)), "application/json")
+
+@views_bp.route("/export/chat/ndjson")
+@login_required
+def export_chat_ndjson():
+    return streamed_download(ndjson_chunks(_chat_records(current_user.id)),
+                             "application/x-ndjson", "chat_logs.ndjson")
 
 # ---------------------------------------------
 # Export Chat Logs - CSV
@@ -95,22 +147,12 @@ def export_chat_json():
 @views_bp.route("/export/chat/csv")
 @login_required
 def export_chat_csv():
-    chats = ChatLog.query.filter_by(user_id=current_user.id).order_by(ChatLog.timestamp).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Timestamp", "User Message", "Bot Response"])
-    for chat in chats:
-        writer.writerow([
-            chat.timestamp.strftime("%Y-%m-%d %H:%M"),
-            chat.user_message,
-            chat.bot_response
-        ])
-
-    response = make_response(output.getvalue())
-    response.headers["Content-Disposition"] = "attachment; filename=chat_logs.csv"
-    response.headers["Content-type"] = "text/csv"
-    return response
+    rows = (
+        (timestamp.strftime(TIMESTAMP_FORMAT), user_input, bot_response)
+        for timestamp, user_input, bot_response, _ in chat_rows(current_user.id)
+    )
+    return streamed_download(csv_chunks(["Timestamp", "User Message", "Bot Response"], rows),
+                             "text/csv", "chat_logs.csv")
 
 # ---------------------------------------------
 # Export Chat Logs - PDF
@@ -118,30 +160,25 @@ def export_chat_csv():
 @views_bp.route("/export/chat/pdf")
 @login_required
 def export_chat_pdf():
-    chats = ChatLog.query.filter_by(user_id=current_user.id).order_by(ChatLog.timestamp).all()
-
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="Chat Logs", ln=True, align='C')
-
-    for chat in chats:
-        pdf.multi_cell(0, 10, f"{chat.timestamp.strftime('%Y-%m-%d %H:%M:%S')}\nUser: {chat.user_message}\nBot: {chat.bot_response}\n")
-
-    response = make_response(pdf.output(dest='S').encode('latin1'))
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = "attachment; filename=chat_logs.pdf"
-    return response
+    return _pdf_export("chat")
 
 # ---------------------------------------------
-# Export Mood Logs - JSON
+# Export Mood Logs - JSON / NDJSON
 # ---------------------------------------------
+def _mood_records(user_id):
+    for timestamp, mood in mood_rows(user_id):
+        yield {"timestamp": timestamp.strftime(TIMESTAMP_FORMAT), "mood": mood}
+
 @views_bp.route("/export/mood/json")
 @login_required
 def export_mood_json():
-    moods = MoodLog.query.filter_by(user_id=current_user.id).order_by(MoodLog.timestamp).all()
-    data = [{"timestamp": m.timestamp.strftime("%Y-%m-%d %H:%M"), "mood": m.mood} for m in moods]
-    return jsonify(data)
+    return streamed_download(json_array_chunks(_mood_records(current_user.id)), "application/json")
+
+@views_bp.route("/export/mood/ndjson")
+@login_required
+def export_mood_ndjson():
+    return streamed_download(ndjson_chunks(_mood_records(current_user.id)),
+                             "application/x-ndjson", "mood_logs.ndjson")
 
 # ---------------------------------------------
 # Export Mood Logs - CSV
@@ -149,18 +186,8 @@ def export_mood_json():
 @views_bp.route("/export/mood/csv")
 @login_required
 def export_mood_csv():
-    moods = MoodLog.query.filter_by(user_id=current_user.id).order_by(MoodLog.timestamp).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Timestamp", "Mood"])
-    for mood in moods:
-        writer.writerow([mood.timestamp.strftime("%Y-%m-%d %H:%M"), mood.mood])
-
-    response = make_response(output.getvalue())
-    response.headers["Content-Disposition"] = "attachment; filename=mood_logs.csv"
-    response.headers["Content-type"] = "text/csv"
-    return response
+    rows = ((timestamp.strftime(TIMESTAMP_FORMAT), mood) for timestamp, mood in mood_rows(current_user.id))
+    return streamed_download(csv_chunks(["Timestamp", "Mood"], rows), "text/csv", "mood_logs.csv")
 
 # ---------------------------------------------
 # Export Mood Logs - PDF
@@ -168,20 +195,67 @@ def export_mood_csv():
 @views_bp.route("/export/mood/pdf")
 @login_required
 def export_mood_pdf():
-    moods = MoodLog.query.filter_by(user_id=current_user.id).order_by(MoodLog.timestamp).all()
+    return _pdf_export("mood")
 
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="Mood Logs", ln=True, align='C')
+# ---------------------------------------------
+# Background PDF Export Jobs
+# ---------------------------------------------
+def _job_payload(status):
+    payload = dict(status)
+    payload["status_url"] = url_for("views.export_job_status", job_id=status["job_id"])
+    if status["state"] == "done":
+        payload["download_url"] = url_for("views.export_job_download", job_id=status["job_id"])
+    return payload
+
+def _submit_export(kind, fmt="pdf"):
+    from app.export_jobs import last_log_id
+
+    return current_app.config["export_jobs"].submit(current_user.id, kind, last_log_id(kind, current_user.id), fmt)
+
+def _send_artifact(path, kind):
+    return send_file(path, mimetype="application/pdf", as_attachment=True, download_name=f"{kind}_logs.pdf")
+
+def _pdf_export(kind):
+    # Small histories finish within the wait and download as before; large ones hand back a job to poll
+    jobs = current_app.config["export_jobs"]
+    status = _submit_export(kind)
+    if status["state"] == "pending":
+        status = jobs.wait(current_user.id, status["job_id"], timeout=current_app.config.get("EXPORT_SYNC_WAIT", 5))
+    if status["state"] == "done":
+        return _send_artifact(jobs.artifact(current_user.id, status["job_id"]), kind)
+    if status["state"] == "failed":
+        return jsonify(_job_payload(status)), 500
+    return jsonify(_job_payload(status)), 202
+
+@views_bp.route("/export/jobs", methods=["POST"])
+@login_required
+def create_export_job():
+    data = request.get_json(silent=True) or {}
+    kind, fmt = data.get("kind"), data.get("format", "pdf")
+    try:
+        status = _submit_export(kind, fmt)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(_job_payload(status)), 200 if status["state"] == "done" else 202
 
-    for mood in moods:
-        pdf.cell(0, 10, txt=f"{mood.timestamp.strftime('%Y-%m-%d %H:%M:%S')} - Mood: {mood.mood}", ln=True)
+@views_bp.route("/export/jobs/<job_id>")
+@login_required
+def export_job_status(job_id):
+    status = current_app.config["export_jobs"].status(current_user.id, job_id)
+    if status["state"] == "unknown":
+        return jsonify(status), 404
+    return jsonify(_job_payload(status))
 
-    response = make_response(pdf.output(dest='S').encode('latin1'))
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = "attachment; filename=mood_logs.pdf"
-    return response
+@views_bp.route("/export/jobs/<job_id>/download")
+@login_required
+def export_job_download(job_id):
+    jobs = current_app.config["export_jobs"]
+    status = jobs.status(current_user.id, job_id)
+    if status["state"] == "unknown":
+        return jsonify(status), 404
+    if status["state"] != "done":
+        return jsonify(_job_payload(status)), 409
+    return _send_artifact(jobs.artifact(current_user.id, job_id), job_id.split("-")[0])
 
 # ---------------------------------------------
 # Export All Logs (General JSON)
@@ -189,6 +263,7 @@ def export_mood_pdf():
 @views_bp.route("/export/json")
 @login_required
 def export_json_route():
+    from app.utils import export_logs_as_json
     return export_logs_as_json()
 
 # ---------------------------------------------
@@ -197,53 +272,54 @@ def export_json_route():
 @views_bp.route("/contact_therapist")
 @login_required
 def contact_therapist():
-    therapists = []
-    try:
-        path = Path("data/therapists.json")
-        if path.exists():
-            with path.open("r", encoding="utf-8") as f:
-                therapists = json.load(f)
-    except Exception as e:
-        current_app.logger.error(f"Error reading therapists.json: {e}")
+    directory = current_app.config["therapist_directory"]
+    filters = search_args(request.args)
+    return render_template("contact_therapist.html", therapists=directory.search(**filters),
+                           locations=directory.locations(), filters=filters)
+
 
-    return render_template("contact_therapist.html", therapists=therapists)
+def fetch_therapists(location=None, radius=5000, keyword="therapist", filename=None):
+    """Refresh the directory from Google Places for each location x keyword (strings or lists).
 
+    Queries run concurrently through the pooled, retrying fetcher, and the
+    file is only rewritten when the combined results changed.
+    """
+    from app.therapist_fetcher import create_therapist_fetcher, refresh
 
-def fetch_therapists(location="Hyderabad", radius=5000, keyword="therapist", filename="data/therapists.json"):
     api_key = os.getenv("GOOGLE_PLACES_API_KEY")
     if not api_key:
         raise Exception("Google Places API key not found in environment variables")
 
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    params = {
-        "query": f"{keyword} in {location}",
-        "radius": radius,
-        "key": api_key
-    }
-
-    response = requests.get(url, params=params)
-    data = response.json()
-
-    if response.status_code != 200 or "results" not in data:
-        raise Exception("Failed to fetch data from Google Places API")
-
-    results = []
-    for place in data["results"]:
-        results.append({
-            "name": place.get("name"),
-            "address": place.get("formatted_address"),
-            "rating": place.get("rating"),
-            "user_ratings_total": place.get("user_ratings_total"),
-            "link": f"https://www.google.com/maps/place/?q=place_id:{place.get('place_id')}"
-        })
-
-    # Save to JSON file
-    path = Path(filename)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2)
-
-    print(f"[INFO] Fetched and saved {len(results)} therapists to {filename}")
+    locations = [location] if isinstance(location, str) else list(location or Config.THERAPIST_LOCATIONS)
+    keywords = [keyword] if isinstance(keyword, str) else list(keyword)
+    requests = [
+        (f"places:{place}:{term}", Config.PLACES_API_URL, {"query": f"{term} in {place}", "radius": radius, "key": api_key})
+        for place in locations for term in keywords
+    ]
+
+    def parse(key, body):
+        data = json.loads(body)
+        if "results" not in data:
+            raise Exception("Failed to fetch data from Google Places API")
+        place = key.split(":")[1]
+        return [{
+            "name": result.get("name"),
+            "address": result.get("formatted_address"),
+            "rating": result.get("rating"),
+            "user_ratings_total": result.get("user_ratings_total"),
+            "link": f"https://www.google.com/maps/place/?q=place_id:{result.get('place_id')}",
+            "location": place
+        } for result in data["results"]]
+
+    # Save to JSON file (atomically: the directory reloads it on the next page view)
+    filename = filename or Config.THERAPISTS_PATH
+    with create_therapist_fetcher(Config, filename) as fetcher:
+        summary = refresh(fetcher, requests, parse, filename)
+
+    print(f"[INFO] Therapists from {len(requests)} queries: {summary['fetched']} fetched, "
+          f"{summary['not_modified']} unchanged, {len(summary['failed'])} failed; "
+          f"{'saved to' if summary['written'] else 'no changes for'} {filename}")
+    return summary
 
 # ---------------------------------------------
 # Trigger 500 Error (For Testing)
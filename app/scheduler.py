@@ -1,8 +1,402 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from app.routes.views import fetch_therapists
+import json
+import logging
+import os
+import signal
+import struct
+import threading
+import time
 
+import click
+from flask import current_app
+from flask.cli import with_appcontext
 
-def start_scheduler():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(fetch_therapists, 'interval', days=15)
-    scheduler.start()
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------
+# Leader election
+# ---------------------------------------------
+class LeaderLock:
+    """Non-blocking exclusive lock on ``path``; at most one holder per node.
+
+    The OS releases the lock when the holder exits or crashes, so a standby
+    runner takes over on its next :meth:`acquire`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def forget(self):
+        """Drop a lock inherited across fork without releasing it for the parent."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def holder(self):
+        """PID written by the current (or last) holder, or None."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+
+# ---------------------------------------------
+# Job registry
+# ---------------------------------------------
+class Job:
+    __slots__ = ("name", "func", "interval_s", "runs", "failures", "next_run_at", "last_started_at",
+                 "last_duration_s", "total_duration_s", "max_duration_s", "last_result", "last_error")
+
+    def __init__(self, name, func, interval_s):
+        self.name = name
+        self.func = func
+        self.interval_s = interval_s
+        self.runs = 0
+        self.failures = 0
+        self.next_run_at = 0.0       # wall clock; 0 runs the job as soon as a leader starts
+        self.last_started_at = None
+        self.last_duration_s = None
+        self.total_duration_s = 0.0
+        self.max_duration_s = 0.0
+        self.last_result = None
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            "interval_s": self.interval_s,
+            "runs": self.runs,
+            "failures": self.failures,
+            "next_run_at": self.next_run_at,
+            "last_started_at": self.last_started_at,
+            "last_duration_s": self.last_duration_s,
+            "avg_duration_s": self.total_duration_s / self.runs if self.runs else None,
+            "max_duration_s": self.max_duration_s,
+            "total_duration_s": self.total_duration_s,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+    def restore(self, saved):
+        for name in ("runs", "failures", "next_run_at", "last_started_at", "last_duration_s",
+                     "total_duration_s", "max_duration_s", "last_result", "last_error"):
+            if name in saved:
+                setattr(self, name, saved[name])
+
+
+class JobRegistry:
+    """Named periodic jobs with per-job timing metrics.
+
+    :meth:`run` calls a job inside an app context, times it and records the
+    outcome; a job that raises is logged and counted, and is tried again
+    after its normal interval.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, func, interval_s):
+        if name in self._jobs:
+            raise ValueError(f"Job {name!r} is already registered")
+        self._jobs[name] = Job(name, func, interval_s)
+        return self._jobs[name]
+
+    def __getitem__(self, name):
+        return self._jobs[name]
+
+    def __iter__(self):
+        return iter(self._jobs.values())
+
+    def names(self):
+        return list(self._jobs)
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        return [job for job in self._jobs.values() if job.next_run_at <= now]
+
+    def seconds_until_next(self, now=None):
+        now = time.time() if now is None else now
+        return max(0.0, min((job.next_run_at for job in self._jobs.values()), default=float("inf")) - now)
+
+    def run(self, name, app):
+        """Run ``name`` now; returns True if it succeeded."""
+        job = self._jobs[name]
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                result = job.func()
+            error = None
+        except Exception as exc:
+            result, error = None, f"{type(exc).__name__}: {exc}"
+            logger.exception("Job %s failed", name)
+        duration = time.perf_counter() - started
+
+        with self._lock:
+            job.runs += 1
+            job.failures += error is not None
+            job.last_started_at = started_at
+            job.last_duration_s = duration
+            job.total_duration_s += duration
+            job.max_duration_s = max(job.max_duration_s, duration)
+            job.last_result = result if isinstance(result, (dict, list, str, int, float, bool)) else None
+            job.last_error = error
+            job.next_run_at = started_at + job.interval_s
+        logger.info("Job %s %s in %.3fs", name, "failed" if error else "finished", duration)
+        return error is None
+
+    def stats(self):
+        with self._lock:
+            return {job.name: job.to_dict() for job in self._jobs.values()}
+
+    def restore(self, stats):
+        with self._lock:
+            for name, saved in stats.items():
+                if name in self._jobs:
+                    self._jobs[name].restore(saved)
+
+
+# ---------------------------------------------
+# Runner
+# ---------------------------------------------
+class JobRunner:
+    """Run the registry's jobs in exactly one process per node.
+
+    Every runner started with ``flask jobs start`` competes for
+    :class:`LeaderLock`; the winner runs due jobs one after another, the
+    others retry the lock every ``poll_s`` seconds and take over if the
+    leader dies. Metrics and next run times are saved to ``status_path``
+    after every job, so a restarted leader keeps the schedule instead of
+    rerunning everything, and ``flask jobs status`` can read them from any
+    process.
+    """
+
+    def __init__(self, app, registry, lock_path, status_path, poll_s=30):
+        self.app = app
+        self.registry = registry
+        self.lock = LeaderLock(lock_path)
+        self.status_path = status_path
+        self.poll_s = poll_s
+        self._restored = False
+
+    def serve(self, stop=None):
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                if not self.lock.acquire():
+                    stop.wait(self.poll_s)
+                    continue
+                self.run_pending(stop)
+                stop.wait(min(self.poll_s, self.registry.seconds_until_next()))
+        finally:
+            self.lock.release()
+
+    def run_pending(self, stop=None):
+        """Run every due job (the caller holds the lock); returns the names that ran."""
+        if not self.lock.held:
+            raise RuntimeError("run_pending() needs the leader lock")
+        if not self._restored:
+            self.registry.restore(self.read_status().get("jobs", {}))
+            self._restored = True
+        ran = []
+        for job in self.registry.due():
+            if stop is not None and stop.is_set():
+                break
+            self.registry.run(job.name, self.app)
+            ran.append(job.name)
+            self.save_status()
+        return ran
+
+    def run_now(self, name):
+        """Run one job immediately, under the leader lock."""
+        if not self.lock.acquire():
+            raise RuntimeError(f"Another job runner (pid {self.lock.holder()}) is the leader")
+        try:
+            self.registry.restore(self.read_status().get("jobs", {}))
+            ok = self.registry.run(name, self.app)
+            self.save_status()
+            return ok
+        finally:
+            self.lock.release()
+
+    def read_status(self):
+        try:
+            with open(self.status_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_status(self):
+        status = {"leader_pid": os.getpid(), "updated_at": time.time(), "jobs": self.registry.stats()}
+        os.makedirs(os.path.dirname(os.path.abspath(self.status_path)), exist_ok=True)
+        tmp_path = f"{self.status_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp_path, self.status_path)
+
+
+# ---------------------------------------------
+# Jobs
+# ---------------------------------------------
+def refresh_therapists():
+    """Google Places when an API key is configured, Practo otherwise; both write THERAPISTS_PATH."""
+    if os.getenv("GOOGLE_PLACES_API_KEY"):
+        from app.routes.views import fetch_therapists
+        return fetch_therapists(filename=current_app.config.get("THERAPISTS_PATH"))
+    from app.utils import scrape_therapists
+    return scrape_therapists(filename=current_app.config.get("THERAPISTS_PATH"))
+
+
+def remove_expired_sessions(directory, now=None):
+    """Delete filesystem sessions past their expiry (cachelib's 4-byte header; 0 never expires)."""
+    now = time.time() if now is None else now
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            with open(path, "rb") as f:
+                header = f.read(4)
+            if len(header) < 4:
+                continue
+            expires = struct.unpack("I", header)[0]
+            if expires != 0 and expires < now:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue  # gone already, or not a session file
+    return removed
+
+
+def cleanup_sessions():
+    """Expired filesystem sessions and compacted conversation history."""
+    config = current_app.config
+    result = {"sessions_removed": 0}
+    if config.get("SESSION_TYPE") == "filesystem":
+        result["sessions_removed"] = remove_expired_sessions(config["SESSION_FILE_DIR"])
+    store = config.get("conversation_store")
+    if store is not None:
+        store.compact()
+        result["conversations_compacted"] = True
+    return result
+
+
+def reconcile_mood_rollups():
+    from app.models import reconcile_rollups
+    return reconcile_rollups(weeks=current_app.config.get("ROLLUP_RECONCILE_WEEKS", 4))
+
+
+def create_job_registry(app):
+    config = app.config
+    registry = JobRegistry()
+    registry.register("therapists", refresh_therapists, config.get("THERAPIST_REFRESH_DAYS", 15) * 86400)
+    registry.register("session_cleanup", cleanup_sessions, config.get("SESSION_CLEANUP_MINUTES", 60) * 60)
+    registry.register("mood_rollups", reconcile_mood_rollups, config.get("ROLLUP_RECONCILE_HOURS", 24) * 3600)
+    return registry
+
+
+def create_job_runner(app, registry=None):
+    return JobRunner(
+        app,
+        registry or create_job_registry(app),
+        app.config.get("JOBS_LOCK_PATH") or os.path.join(app.instance_path, "jobs.lock"),
+        app.config.get("JOBS_STATUS_PATH") or os.path.join(app.instance_path, "jobs.json"),
+        poll_s=app.config.get("JOBS_POLL_S", 30),
+    )
+
+
+# ---------------------------------------------
+# CLI: flask jobs start | status | run-once NAME
+# ---------------------------------------------
+@click.group("jobs", help="Periodic background jobs (run outside the web workers).")
+def jobs_cli():
+    pass
+
+
+@jobs_cli.command("start")
+@with_appcontext
+def start_command():
+    """Run jobs as leader, or wait as a standby until the leader exits."""
+    runner = create_job_runner(current_app._get_current_object())
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *args: stop.set())
+    click.echo(f"Job runner {os.getpid()} started ({', '.join(runner.registry.names())})")
+    runner.serve(stop)
+
+
+@jobs_cli.command("run-once")
+@click.argument("name")
+@with_appcontext
+def run_once_command(name):
+    """Run one job now and exit."""
+    runner = create_job_runner(current_app._get_current_object())
+    if name not in runner.registry.names():
+        raise click.BadParameter(f"choose from {', '.join(runner.registry.names())}", param_hint="NAME")
+    try:
+        ok = runner.run_now(name)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc))
+    click.echo(json.dumps(runner.registry[name].to_dict(), indent=2))
+    if not ok:
+        raise SystemExit(1)
+
+
+@jobs_cli.command("status")
+@with_appcontext
+def status_command():
+    """Print per-job metrics saved by the leader, and whether a leader is running."""
+    runner = create_job_runner(current_app._get_current_object())
+    running = not runner.lock.acquire()
+    runner.lock.release()
+    status = dict(runner.read_status(), running_leader_pid=runner.lock.holder() if running else None)
+    click.echo(json.dumps(status, indent=2))
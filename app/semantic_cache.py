@@ -0,0 +1,358 @@
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger("app.semantic_cache.audit")
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# ---------------------------------------------
+# Prompt embeddings
+# ---------------------------------------------
+class PromptEncoder:
+    """Mean-pooled, L2-normalized hidden states of a sentence-embedding encoder.
+
+    Any head on ``model`` is skipped and its backbone is used.
+    """
+
+    def __init__(self, model, tokenizer, max_length=64):
+        self.model = getattr(model, "base_model", model)
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.name = getattr(self.model.config, "_name_or_path", "") or type(self.model).__name__
+        self.dim = self.model.config.hidden_size
+
+    def encode(self, texts):
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True, truncation=True,
+                                max_length=self.max_length)
+        with torch.no_grad():
+            hidden = self.model(input_ids=inputs["input_ids"],
+                                attention_mask=inputs["attention_mask"]).last_hidden_state.float()
+        mask = inputs["attention_mask"].unsqueeze(-1).float()
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+        return F.normalize(pooled, dim=-1).cpu().numpy().astype(np.float32)
+
+
+# ---------------------------------------------
+# Approximate nearest-neighbour index
+# ---------------------------------------------
+class SemanticIndex:
+    """Fixed-capacity cosine-similarity index over unit vectors.
+
+    Every vector also gets an ``n_bits`` sign-of-random-projection code.
+    A query ranks the stored codes by Hamming distance (XOR + popcount over
+    a few bytes per row) and only the ``candidates`` closest are compared
+    exactly, so a lookup reads ``n_bits / 8`` bytes per entry instead of
+    the whole vector.
+    """
+
+    def __init__(self, dim, capacity, n_bits=64, candidates=32, seed=0):
+        self.dim = dim
+        self.capacity = capacity
+        self.candidates = candidates
+        self.planes = np.random.default_rng(seed).standard_normal((dim, n_bits)).astype(np.float32)
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.codes = np.zeros((capacity, (n_bits + 7) // 8), dtype=np.uint8)
+        self.used = np.zeros(capacity, dtype=bool)
+
+    def code(self, vector):
+        return np.packbits(vector @ self.planes > 0, axis=-1)
+
+    def set(self, slot, vector):
+        self.vectors[slot] = vector
+        self.codes[slot] = self.code(vector)
+        self.used[slot] = True
+
+    def remove(self, slot):
+        self.used[slot] = False
+
+    def search(self, vector, k=4, mask=None):
+        """Up to ``k`` ``(slot, similarity)`` pairs, most similar first, among the slots set in ``mask``."""
+        occupied = np.flatnonzero(self.used if mask is None else self.used & mask)
+        if not len(occupied):
+            return []
+        if len(occupied) > self.candidates:
+            distances = _POPCOUNT[self.codes[occupied] ^ self.code(vector)].sum(axis=1, dtype=np.int32)
+            occupied = occupied[np.argpartition(distances, self.candidates)[:self.candidates]]
+        similarities = self.vectors[occupied] @ vector
+        order = np.argsort(-similarities)[:k]
+        return [(int(occupied[i]), float(similarities[i])) for i in order]
+
+
+class _Entry:
+    __slots__ = ("key", "replies", "sampled", "next", "created_at")
+
+    def __init__(self, key, created_at, replies=(), sampled=0):
+        self.key = key              # (model_version, mood, normalized prompt), as in ResponseCache
+        self.replies = list(replies)
+        self.sampled = sampled
+        self.next = 0
+        self.created_at = created_at
+
+
+# ---------------------------------------------
+# Semantic first-turn cache
+# ---------------------------------------------
+class SemanticCache:
+    """Serve paraphrases of earlier first-turn messages from their reply pool.
+
+    Sits behind the exact :class:`~app.response_cache.ResponseCache` and
+    takes the same keys. A lookup embeds the normalized message and finds
+    the most similar cached prompt with the same model version and mood;
+    if the cosine similarity is at least ``threshold`` and that prompt's
+    pool holds ``pool_size`` sampled replies, the next reply is returned
+    (round-robin) and the hit is written to the audit log. The log holds
+    keyed digests (``audit_key``) of the message and the matched prompt,
+    never their text. Generated replies join the pool of their nearest
+    prompt above the threshold, so paraphrases fill a shared pool, or start
+    a new entry.
+
+    At most ``max_entries`` prompts are kept (least recently used evicted);
+    entries expire ``ttl_seconds`` after creation. With ``path`` the index
+    is saved every ``save_every`` additions and at exit, and reloaded on
+    start when the encoder matches.
+    """
+
+    def __init__(self, encoder, model_version, threshold=0.92, pool_size=4, ttl_seconds=3600,
+                 max_entries=2048, candidates=32, path=None, save_every=32, audit_key=None):
+        self.encoder = encoder
+        self.model_version = model_version
+        self.threshold = threshold
+        self.pool_size = pool_size
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+        self.audit_key = audit_key.encode() if isinstance(audit_key, str) else audit_key
+
+        self._lock = threading.Lock()
+        self._index = SemanticIndex(encoder.dim, max_entries, candidates=candidates)
+        self._entries = OrderedDict()   # slot -> _Entry, least recently used first
+        self._slots = {}                # key -> slot
+        self._groups = {}               # (model_version, mood) -> slot mask, so lookups rank only their own
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._vectors = OrderedDict()   # prompt -> embedding, so add() after a miss doesn't re-encode
+        self._adds_since_save = 0
+        self._counters = {"hits": 0, "misses": 0, "below_threshold": 0, "adds": 0,
+                          "evictions": 0, "expirations": 0, "similarity_sum": 0.0}
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def lookup(self, key, user_id=None):
+        """A pooled reply for a paraphrase of ``key``'s prompt, or None."""
+        vector = self._embed(key[2])
+        now = time.time()
+        with self._lock:
+            slot, similarity = self._nearest(key, vector, now)
+            entry = self._entries.get(slot)
+            if entry is None or entry.sampled < self.pool_size:
+                self._counters["misses"] += 1
+                if entry is None and similarity is not None:
+                    self._counters["below_threshold"] += 1
+                return None
+            self._entries.move_to_end(slot)
+            reply = entry.replies[entry.next % len(entry.replies)]
+            entry.next += 1
+            self._counters["hits"] += 1
+            self._counters["similarity_sum"] += similarity
+            matched, age = entry.key[2], now - entry.created_at
+
+        audit_logger.info(json.dumps({
+            "event": "semantic_cache_hit", "user_id": user_id,
+            "query": self.digest(key[2]), "matched": self.digest(matched), "mood": key[1],
+            "similarity": round(similarity, 4), "threshold": self.threshold,
+            "entry_age_s": round(age, 1), "model_version": key[0],
+        }))
+        return reply
+
+    def add(self, key, reply):
+        """Record a generated reply for ``key`` (joins the nearest pool above the threshold)."""
+        vector = self._embed(key[2])
+        now = time.time()
+        with self._lock:
+            slot, _ = self._nearest(key, vector, now)
+            if slot is None:
+                slot = self._allocate()
+                self._entries[slot] = _Entry(key, now)
+                self._slots[key] = slot
+                self._group(key)[slot] = True
+                self._index.set(slot, vector)
+            entry = self._entries[slot]
+            self._entries.move_to_end(slot)
+            if entry.sampled < self.pool_size:
+                entry.sampled += 1
+                if reply not in entry.replies:
+                    entry.replies.append(reply)
+            self._counters["adds"] += 1
+            self._adds_since_save += 1
+            save = self.path and self._adds_since_save >= self.save_every
+        if save:
+            self.save()
+
+    def digest(self, text):
+        """Short fingerprint of a prompt for the audit log (HMAC-SHA256 with ``audit_key`` when set)."""
+        if self.audit_key:
+            return hmac.new(self.audit_key, text.encode(), hashlib.sha256).hexdigest()[:16]
+        return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+        similarity_sum = counters.pop("similarity_sum")
+        return dict(counters, entries=entries, max_entries=self.max_entries, threshold=self.threshold,
+                    avg_hit_similarity=similarity_sum / counters["hits"] if counters["hits"] else None)
+
+    # ---------------------------------------------
+    # Persistence
+    # ---------------------------------------------
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            live = [(slot, entry) for slot, entry in self._entries.items()
+                    if now - entry.created_at < self.ttl_seconds]
+            vectors = self._index.vectors[[slot for slot, _ in live]] if live else np.zeros((0, self._index.dim))
+            meta = {
+                "encoder": self.encoder.name,
+                "dim": self._index.dim,
+                "entries": [{"key": list(entry.key), "replies": entry.replies, "sampled": entry.sampled,
+                             "created_at": entry.created_at} for _, entry in live],
+            }
+            self._adds_since_save = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, vectors=vectors.astype(np.float32), meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                vectors = data["vectors"]
+        except (OSError, ValueError, KeyError) as exc:
+            if not isinstance(exc, FileNotFoundError):
+                logger.warning("Ignoring semantic cache %s: %s", self.path, exc)
+            return 0
+        if meta.get("encoder") != self.encoder.name or meta.get("dim") != self._index.dim:
+            logger.info("Semantic cache %s was built with another encoder; starting empty", self.path)
+            return 0
+
+        now, loaded = time.time(), 0
+        with self._lock:
+            for saved, vector in zip(meta["entries"], vectors):
+                key = tuple(saved["key"])
+                if key[0] != self.model_version or now - saved["created_at"] >= self.ttl_seconds:
+                    continue
+                if key in self._slots or not self._free:
+                    continue
+                slot = self._free.pop()
+                self._entries[slot] = _Entry(key, saved["created_at"], saved["replies"], saved["sampled"])
+                self._slots[key] = slot
+                self._group(key)[slot] = True
+                self._index.set(slot, vector)
+                loaded += 1
+        return loaded
+
+    # ---------------------------------------------
+    # Internals
+    # ---------------------------------------------
+    def _embed(self, text):
+        with self._lock:
+            vector = self._vectors.get(text)
+        if vector is None:
+            vector = self.encoder.encode([text])[0]
+            with self._lock:
+                self._vectors[text] = vector
+                while len(self._vectors) > 256:
+                    self._vectors.popitem(last=False)
+        return vector
+
+    def _nearest(self, key, vector, now):
+        """``(slot, similarity)`` of the best live match above the threshold, else ``(None, best)``."""
+        best = None
+        mask = self._groups.get(key[:2])
+        if mask is None:
+            return None, None  # nothing cached for this model version and mood
+        for slot, similarity in self._index.search(vector, mask=mask):
+            entry = self._entries[slot]
+            if now - entry.created_at >= self.ttl_seconds:
+                self._drop(slot)
+                self._counters["expirations"] += 1
+                continue
+            if similarity >= self.threshold:
+                return slot, similarity
+            best = similarity if best is None else max(best, similarity)
+        return None, best
+
+    def _group(self, key):
+        mask = self._groups.get(key[:2])
+        if mask is None:
+            mask = self._groups[key[:2]] = np.zeros(self.max_entries, dtype=bool)
+        return mask
+
+    def _allocate(self):
+        if not self._free:
+            slot = next(iter(self._entries))
+            self._drop(slot)
+            self._counters["evictions"] += 1
+        return self._free.pop()
+
+    def _drop(self, slot):
+        entry = self._entries.pop(slot)
+        self._slots.pop(entry.key, None)
+        self._groups[entry.key[:2]][slot] = False
+        self._index.remove(slot)
+        self._free.append(slot)
+
+
+def create_semantic_cache(app):
+    config = app.config
+    if not config.get("SEMANTIC_CACHE_ENABLED"):
+        return None
+    response_cache = config.get("response_cache")
+    if response_cache is None:
+        logger.warning("SEMANTIC_CACHE_ENABLED needs RESPONSE_CACHE_ENABLED; semantic cache is off")
+        return None
+    if not config.get("SEMANTIC_CACHE_MODEL"):
+        # Only a paraphrase-trained encoder makes the threshold meaningful: the emotion
+        # classifier's embeddings put unrelated messages with the same mood close together
+        logger.warning("SEMANTIC_CACHE_ENABLED needs SEMANTIC_CACHE_MODEL; semantic cache is off")
+        return None
+
+    from app.model_registry import load_prompt_encoder
+    model, tokenizer = load_prompt_encoder(config["SEMANTIC_CACHE_MODEL"])
+
+    audit_path = config.get("SEMANTIC_CACHE_AUDIT_PATH")
+    if audit_path and not audit_logger.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(audit_path)), exist_ok=True)
+        handler = RotatingFileHandler(audit_path, maxBytes=10 * 1024 * 1024, backupCount=5)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        audit_logger.addHandler(handler)
+        audit_logger.setLevel(logging.INFO)
+
+    return SemanticCache(
+        PromptEncoder(model, tokenizer),
+        response_cache.model_version,
+        threshold=config.get("SEMANTIC_CACHE_THRESHOLD", 0.92),
+        pool_size=config.get("RESPONSE_CACHE_POOL_SIZE", 4),
+        ttl_seconds=config.get("SEMANTIC_CACHE_TTL_S", 3600),
+        max_entries=config.get("SEMANTIC_CACHE_SIZE", 2048),
+        path=config.get("SEMANTIC_CACHE_PATH") or None,
+        audit_key=config.get("SECRET_KEY"),
+    )
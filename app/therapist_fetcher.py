@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class FetchResult:
+    __slots__ = ("key", "status", "body", "not_modified", "error")
+
+    def __init__(self, key, status=None, body=None, not_modified=False, error=None):
+        self.key = key
+        self.status = status
+        self.body = body            # response text on a 200, None otherwise
+        self.not_modified = not_modified
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# ---------------------------------------------
+# Pooled, retrying, conditional HTTP fetcher
+# ---------------------------------------------
+class TherapistFetcher:
+    """HTTP client for the therapist sources, shared by the scheduled jobs.
+
+    One ``requests.Session`` keeps up to ``pool_size`` connections alive per
+    host. Every request has a ``(connect, read)`` timeout, and connection
+    errors and 429/5xx responses are retried ``retries`` times with
+    exponential backoff (honouring ``Retry-After``). Validators from the
+    last 200 (``ETag``/``Last-Modified``) are kept in ``state_path`` together
+    with whatever the caller derived from that body, and sent back as
+    ``If-None-Match``/``If-Modified-Since``; a 304 means the stored value is
+    still current. :meth:`fetch_many` runs requests concurrently on
+    ``max_workers`` threads.
+    """
+
+    def __init__(self, state_path, timeout=(3.05, 10), retries=3, backoff=0.5, pool_size=8, max_workers=4):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.state_path = state_path
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset({"GET"}), respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "Mozilla/5.0"
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+    def fetch(self, key, url, params=None):
+        """GET ``url`` conditionally; ``key`` names the request in the validator state."""
+        headers = {}
+        with self._lock:
+            validators = self._state.get(key, {})
+        if validators.get("value") is None:
+            validators = {}  # nothing to reuse on a 304, so ask for the body
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return FetchResult(key, 304, not_modified=True)
+            response.raise_for_status()
+        except Exception as exc:  # connection errors after retries, or a final 4xx/5xx
+            logger.warning("Fetching %s failed: %s", key, exc)
+            return FetchResult(key, error=exc)
+
+        with self._lock:
+            self._state[key] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "value": validators.get("value"),
+            }
+        return FetchResult(key, response.status_code, body=response.text)
+
+    def fetch_many(self, requests):
+        """Fetch ``[(key, url, params), ...]`` concurrently; results come back in request order."""
+        if len(requests) <= 1:
+            return [self.fetch(*request) for request in requests]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(requests)),
+                                thread_name_prefix="therapist-fetch") as executor:
+            return list(executor.map(lambda request: self.fetch(*request), requests))
+
+    def value(self, key):
+        """What the caller last stored for ``key`` (via :meth:`remember`); reused on a 304."""
+        with self._lock:
+            return self._state.get(key, {}).get("value")
+
+    def remember(self, key, value):
+        with self._lock:
+            self._state.setdefault(key, {})["value"] = value
+
+    def forget_validators(self, key):
+        """Make the next fetch of ``key`` unconditional, keeping its stored value."""
+        with self._lock:
+            entry = self._state.get(key)
+            if entry is not None:
+                entry["etag"] = entry["last_modified"] = None
+
+    def save(self):
+        """Persist validators and values (atomically) for the next run."""
+        with self._lock:
+            text = json.dumps(self._state)
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.state_path)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------
+    # Internals
+    # ---------------------------------------------
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+
+def refresh(fetcher, requests, parse, filename):
+    """Fetch every source, rebuild the combined list and rewrite ``filename`` only if it changed.
+
+    ``requests`` are ``(key, url, params)``; ``parse(key, body)`` turns a 200
+    body into records. A 304, or a failed source that has records from an
+    earlier run, contributes its stored records; records repeated across
+    sources (same ``link``) are kept once. Raises if no source produced
+    anything. Returns a summary dict.
+    """
+    from app.therapists import write_therapists
+
+    results = fetcher.fetch_many(requests)
+    records, links = [], set()
+    summary = {"fetched": 0, "not_modified": 0, "failed": [], "written": False}
+    for result in results:
+        if result.ok and not result.not_modified:
+            try:
+                value = parse(result.key, result.body)
+            except Exception as exc:
+                logger.warning("Parsing %s failed: %s", result.key, exc)
+                fetcher.forget_validators(result.key)  # refetch the body next run instead of a 304
+                result = FetchResult(result.key, error=exc)
+            else:
+                fetcher.remember(result.key, value)
+                summary["fetched"] += 1
+        elif result.not_modified:
+            summary["not_modified"] += 1
+        if not result.ok:
+            summary["failed"].append(result.key)
+        for record in fetcher.value(result.key) or []:
+            link = record.get("link")
+            if link not in links:  # the same place can turn up under several locations/keywords
+                links.add(link)
+                records.append(record)
+
+    if len(summary["failed"]) == len(results) and not records:
+        raise Exception(f"Failed to fetch therapists: {', '.join(summary['failed'])}")
+
+    try:
+        with open(filename, encoding="utf-8") as f:
+            unchanged = json.load(f) == records
+    except (OSError, ValueError):
+        unchanged = False
+    if not unchanged:
+        write_therapists(filename, records)
+        summary["written"] = True
+    fetcher.save()
+    return summary
+
+
+def create_therapist_fetcher(config, filename):
+    """Fetcher whose validator state sits next to ``filename``; ``config`` is a Config class or dict."""
+    get = config.get if isinstance(config, dict) else lambda name, default: getattr(config, name, default)
+    return TherapistFetcher(
+        f"{filename}.http.json",
+        timeout=(get("THERAPIST_FETCH_CONNECT_TIMEOUT_S", 3.05), get("THERAPIST_FETCH_READ_TIMEOUT_S", 10)),
+        retries=get("THERAPIST_FETCH_RETRIES", 3),
+        backoff=get("THERAPIST_FETCH_BACKOFF_S", 0.5),
+        pool_size=get("THERAPIST_FETCH_POOL_SIZE", 8),
+        max_workers=get("THERAPIST_FETCH_WORKERS", 4),
+    )
@@ -0,0 +1,172 @@
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+SORTS = ("rating", "reviews", "name")
+
+
+def write_therapists(path, therapists):
+    """Replace the directory file atomically: readers see the old list or the new one, never half."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".therapists-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(therapists, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def location_of(therapist):
+    """Lookup key for a therapist's city: the explicit ``location``, else the city part of the address."""
+    location = therapist.get("location")
+    if not location:
+        # Google's formatted_address ends "..., <city>, <state> <zip>, <country>"
+        parts = [part.strip() for part in (therapist.get("address") or "").split(",") if part.strip()]
+        location = parts[-3] if len(parts) >= 3 else (parts[0] if parts else "")
+    return location.casefold()
+
+
+def _rating(therapist):
+    try:
+        return float(therapist.get("rating"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Index:
+    """One immutable load of the file; swapped in whole on reload.
+
+    ``by_rating`` and each ``by_location`` value are ``(positions, keys)``:
+    positions best rated first, keys their negated ratings (ascending,
+    unrated as +inf) for bisecting a minimum rating.
+    """
+    __slots__ = ("therapists", "locations", "by_rating", "by_location", "signature")
+
+    def __init__(self, therapists, signature=None):
+        self.therapists = tuple(therapists)
+        self.signature = signature
+
+        def rank(i):
+            therapist, rating = self.therapists[i], _rating(self.therapists[i])
+            return (rating is None, -(rating or 0.0), -(therapist.get("user_ratings_total") or 0),
+                    (therapist.get("name") or "").casefold())
+
+        def keyed(positions):
+            ratings = (_rating(self.therapists[i]) for i in positions)
+            return tuple(positions), tuple(float("inf") if r is None else -r for r in ratings)
+
+        ranked = sorted(range(len(self.therapists)), key=rank)
+        by_location, names = {}, {}
+        for i in ranked:
+            key = location_of(self.therapists[i])
+            if key:
+                by_location.setdefault(key, []).append(i)
+                names.setdefault(key, self.therapists[i].get("location") or key.title())
+        self.by_rating = keyed(ranked)
+        self.by_location = {key: keyed(positions) for key, positions in by_location.items()}
+        self.locations = tuple(names[key] for key in sorted(names))
+
+
+# ---------------------------------------------
+# Therapist directory
+# ---------------------------------------------
+class TherapistDirectory:
+    """The therapist list, loaded once and served from memory.
+
+    Each lookup ``stat``s the file and reloads only when its mtime, size or
+    inode changed (writers replace it atomically, see
+    :func:`write_therapists`). The reload builds a new index off to the side
+    and swaps it in, so concurrent readers keep a consistent view; a file
+    that fails to parse keeps the previous index. Lookups by location and
+    minimum rating use the prebuilt indexes instead of rereading the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = _Index(())
+        self._failed = None  # signature of a file that did not parse; not retried until it changes
+        self._lock = threading.Lock()
+        self._counters = {"loads": 0, "load_errors": 0}
+
+    def index(self):
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            signature = None
+        if signature != self._index.signature and signature != self._failed:
+            self._reload(signature)
+        return self._index
+
+    def all(self):
+        return list(self.index().therapists)
+
+    def locations(self):
+        return list(self.index().locations)
+
+    def search(self, location=None, min_rating=None, sort="rating", limit=None):
+        """Therapists matching ``location`` (case-insensitive) with at least ``min_rating`` stars."""
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort {sort!r}")
+        index = self.index()
+        positions, keys = index.by_location.get(location.casefold(), ((), ())) if location else index.by_rating
+        if min_rating is not None:
+            positions = positions[:bisect.bisect_right(keys, -min_rating)]
+        therapists = [index.therapists[i] for i in positions]
+        if sort == "reviews":
+            therapists.sort(key=lambda t: -(t.get("user_ratings_total") or 0))
+        elif sort == "name":
+            therapists.sort(key=lambda t: (t.get("name") or "").casefold())
+        return therapists[:limit] if limit is not None else therapists
+
+    def stats(self):
+        index = self.index()
+        return dict(self._counters, therapists=len(index.therapists), locations=len(index.locations))
+
+    def _reload(self, signature):
+        with self._lock:
+            if signature == self._index.signature:
+                return  # another thread reloaded it first
+            if signature is None:
+                self._index = _Index((), None)
+                return
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    therapists = json.load(f)
+                if not isinstance(therapists, list):
+                    raise ValueError("expected a JSON list")
+                index = _Index([t for t in therapists if isinstance(t, dict)], signature)
+            except (OSError, ValueError) as exc:
+                self._counters["load_errors"] += 1
+                self._failed = signature
+                logger.error("Error reading %s: %s", self.path, exc)
+                return
+            self._index = index
+            self._counters["loads"] += 1
+
+
+def search_args(args):
+    """Parse the contact page's ``location``/``min_rating``/``sort`` query; bad values are ignored."""
+    try:
+        min_rating = float(args["min_rating"]) if args.get("min_rating") else None
+    except ValueError:
+        min_rating = None
+    sort = args.get("sort") if args.get("sort") in SORTS else "rating"
+    return {"location": args.get("location") or None, "min_rating": min_rating, "sort": sort}
+
+
+def create_therapist_directory(app):
+    return TherapistDirectory(app.config.get("THERAPISTS_PATH", os.path.join("data", "therapists.json")))
@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context, has_request_context, session
+from flask_login import user_logged_in, user_logged_out
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.database import db
+from app.models import User
+
+SESSION_KEY = "_user_snapshot"
+
+
+class UserSnapshot:
+    """Immutable copy of the User fields request handlers read (``current_user``).
+
+    It satisfies Flask-Login's user interface, so ``current_user.id``,
+    ``.username`` and ``.email`` work as before. Handlers that need the ORM
+    object (relationships, password checks) load it explicitly.
+    """
+    __slots__ = ("id", "username", "email")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, email):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "username", username)
+        object.__setattr__(self, "email", email)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __eq__(self, other):
+        return isinstance(other, UserSnapshot) and self.to_tuple() == other.to_tuple()
+
+    def __hash__(self):
+        return hash(self.to_tuple())
+
+    def __repr__(self):
+        return f"<UserSnapshot {self.username}>"
+
+    def get_id(self):
+        return str(self.id)
+
+    def to_tuple(self):
+        return self.id, self.username, self.email
+
+    def to_dict(self):
+        return {"id": self.id, "username": self.username, "email": self.email}
+
+
+# ---------------------------------------------
+# Authenticated-user cache
+# ---------------------------------------------
+class UserCache:
+    """Resolve ``load_user`` without a users-table round trip on most requests.
+
+    Flask-Login already calls the loader at most once per request. Above
+    that, snapshots are kept for ``ttl_seconds`` in an in-process LRU
+    (shared by every session of the user) and in the user's server-side
+    session, which a request reads anyway, so a worker that has not seen
+    the user yet still skips the query. Updating or deleting a User drops
+    the snapshot in this process immediately (session copies taken before
+    the change are ignored from then on); other workers pick the change up
+    within the TTL. ``ttl_seconds=0`` disables caching.
+    """
+
+    def __init__(self, ttl_seconds=60, max_entries=4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (snapshot, expires_at on the monotonic clock)
+        self._invalidated = OrderedDict()  # user_id -> wall-clock time; older session copies are stale
+        self._counters = {"hits": 0, "session_hits": 0, "misses": 0, "invalidations": 0}
+
+    def load(self, user_id):
+        """Return the UserSnapshot for ``user_id``, or None if there is no such user."""
+        snapshot = self.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = self._from_session(user_id)
+        if snapshot is not None:
+            self.put(snapshot, session_copy=False)
+            with self._lock:
+                self._counters["session_hits"] += 1
+            return snapshot
+
+        with self._lock:
+            self._counters["misses"] += 1
+        row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        snapshot = UserSnapshot(*row)
+        self.put(snapshot)
+        return snapshot
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, snapshot, session_copy=True):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if session_copy and has_request_context():
+            session[SESSION_KEY] = [*snapshot.to_tuple(), time.time()]
+
+    def invalidate(self, user_id):
+        now = time.time()
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._invalidated.pop(user_id, None)
+            self._invalidated[user_id] = now
+            # Session copies expire on their own after the TTL; forget older invalidations
+            while self._invalidated and next(iter(self._invalidated.values())) <= now - self.ttl_seconds:
+                self._invalidated.popitem(last=False)
+            self._counters["invalidations"] += 1
+        if has_request_context():
+            cached = session.get(SESSION_KEY)
+            if cached and cached[0] == user_id:
+                session.pop(SESSION_KEY)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), max_entries=self.max_entries)
+
+    def _from_session(self, user_id):
+        if self.ttl_seconds <= 0 or not has_request_context():
+            return None
+        cached = session.get(SESSION_KEY)
+        if not cached or cached[0] != user_id or cached[3] <= time.time() - self.ttl_seconds:
+            return None
+        with self._lock:
+            if cached[3] <= self._invalidated.get(user_id, 0):
+                return None
+        return UserSnapshot(*cached[:3])
+
+
+def load_user(user_id):
+    """Flask-Login ``user_loader`` shared by both app factories."""
+    cache = current_app.config.get("user_cache") or UserCache(ttl_seconds=0)
+    return cache.load(int(user_id))
+
+
+def create_user_cache(app):
+    cache = UserCache(
+        ttl_seconds=app.config.get("USER_CACHE_TTL_S", 60),
+        max_entries=app.config.get("USER_CACHE_SIZE", 4096),
+    )
+    user_logged_in.connect(_logged_in, app)
+    user_logged_out.connect(_logged_out, app)
+    return cache
+
+
+# ---------------------------------------------
+# Invalidation
+# ---------------------------------------------
+def _current_cache():
+    return current_app.config.get("user_cache") if has_app_context() else None
+
+
+def _logged_in(app, user):
+    cache = _current_cache()
+    if cache is not None:
+        cache.put(user if isinstance(user, UserSnapshot) else UserSnapshot.from_user(user))
+
+
+def _logged_out(app, user):
+    session.pop(SESSION_KEY, None)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    cache = _current_cache()
+    if cache is not None:
+        cache.invalidate(target.id)
+        # Another request may re-cache the old row before this transaction commits
+        object_session(target).info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _changes_committed(db_session):
+    changed = db_session.info.pop("changed_users", None)
+    cache = _current_cache() if changed else None
+    if cache is not None:
+        for user_id in changed:
+            cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _changes_rolled_back(db_session):
+    db_session.info.pop("changed_users", None)
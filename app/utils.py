@@ -1,55 +1,51 @@
 import io
-import csv
-from fpdf import FPDF
+import itertools
 from flask import send_file, Response
 from datetime import datetime
-# therapist_scraper.py
-import requests
-from bs4 import BeautifulSoup
 import json
-from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
-from flask import jsonify, session
-from app.models import ChatLog
-
-def scrape_therapists():
-    url = "https://www.practo.com/hyderabad/psychologist"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    therapists = []
-    for doc in soup.select(".doctor-card")[:3]:
-        name = doc.select_one(".info-section h2").text.strip()
-        experience = doc.select_one(".uv2-spacer--xs").text.strip()
-        clinic = doc.select_one(".clinic-name").text.strip() if doc.select_one(".clinic-name") else "N/A"
-        link = "https://www.practo.com" + doc.select_one("a")["href"]
-
-        therapists.append({
-            "name": name,
-            "experience": experience,
-            "clinic": clinic,
-            "link": link
-        })
-
-    with open("static/data/therapists.json", "w") as f:
-        json.dump(therapists, f, indent=4)
-    print(f"[{datetime.now()}] Therapist data updated.")
-
-def start_therapist_scheduler():
-    scheduler = BackgroundScheduler()
-    
-    # Update every 30 days (you can change days=15 if needed)
-    scheduler.add_job(scrape_therapists, 'interval', days=30, next_run_time=datetime.now())
-    
-    scheduler.start()
-    print("Therapist update scheduler started.")
-
-# Schedule to run every 15 days
+from types import SimpleNamespace
+from flask import jsonify
+from sqlalchemy.orm import Query
+from flask_login import current_user
+from app.exports import chat_rows, csv_chunks, iter_user_rows, json_array_chunks, streamed_download
+from app.therapist_fetcher import create_therapist_fetcher, refresh
+from config import Config
+
+def scrape_therapists(filename=None, cities=None):
+    """Scrape the top psychologists per city from Practo, fetching the cities concurrently."""
+    cities = [cities] if isinstance(cities, str) else list(cities or Config.THERAPIST_LOCATIONS)
+    requests = [(f"practo:{city}", Config.PRACTO_URL.format(city=city.lower()), None) for city in cities]
+
+    def parse(key, body):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(body, "html.parser")
+        therapists = []
+        for doc in soup.select(".doctor-card")[:3]:
+            name = doc.select_one(".info-section h2").text.strip()
+            experience = doc.select_one(".uv2-spacer--xs").text.strip()
+            clinic = doc.select_one(".clinic-name").text.strip() if doc.select_one(".clinic-name") else "N/A"
+            link = "https://www.practo.com" + doc.select_one("a")["href"]
+
+            therapists.append({
+                "name": name,
+                "experience": experience,
+                "clinic": clinic,
+                "link": link,
+                "location": key.split(":", 1)[1]
+            })
+        return therapists
+
+    # Same file the therapist directory serves, replaced atomically and only when it changed
+    filename = filename or Config.THERAPISTS_PATH
+    with create_therapist_fetcher(Config, filename) as fetcher:
+        summary = refresh(fetcher, requests, parse, filename)
+    print(f"[{datetime.now()}] Therapist data {'updated' if summary['written'] else 'unchanged'}.")
+    return summary
+
+# Periodic refreshes run in the job runner (app/scheduler.py); this scrapes once
 if __name__ == "__main__":
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(scrape_therapists, 'interval', days=15)
-    scheduler.start()
     scrape_therapists()
 
 
@@ -59,49 +55,53 @@ if __name__ == "__main__":
 # app/utils.py
 
 def export_logs_as_json():
-    user_id = session.get('user_id')
-    if not user_id:
+    """Stream the current user's chat logs as a JSON array of ``ChatLog.to_dict()`` records."""
+    if not current_user.is_authenticated:
         return jsonify([]), 401
 
-    logs = ChatLog.query.filter_by(user_id=user_id).all()
-    return jsonify([log.to_dict() for log in logs])
-
-
-
+    logs = (
+        {"timestamp": timestamp.isoformat(), "user_input": user_input, "bot_response": bot_response, "mood": mood}
+        for timestamp, user_input, bot_response, mood in chat_rows(current_user.id)
+    )
+    return streamed_download(json_array_chunks(logs), "application/json")
 
 
 # ---------------------------------------------
 # Export Logs as CSV
 # ---------------------------------------------
-def export_logs_as_csv(logs):
-    output = io.StringIO()
-    writer = csv.writer(output)
+def _query_rows(query):
+    """Read a ChatLog/MoodLog query in keyset pages (its filters kept, (timestamp, id) order)."""
+    model = query.column_descriptions[0]["entity"]
+    columns = [model.user_input, model.bot_response, model.mood] if hasattr(model, "bot_response") else [model.mood]
+    names = ["timestamp", "id"] + [column.key for column in columns]
+    for row in iter_user_rows(model, None, columns, where=query.whereclause):
+        yield SimpleNamespace(**dict(zip(names, row)))
 
-    if not logs:
-        writer.writerow(["No data available"])
-    elif hasattr(logs[0], "bot_response"):  # ChatLog
-        writer.writerow(["Timestamp", "User Input", "Bot Response", "Mood"])
-        for log in logs:
-            writer.writerow([
-                log.timestamp.strftime("%Y-%m-%d %H:%M"),
-                log.user_input,
-                log.bot_response,
-                log.mood
-            ])
+
+def export_logs_as_csv(logs):
+    """Stream ``logs`` (a list, query or any iterable of ChatLog/MoodLog rows) as CSV.
+
+    A query is read in keyset pages of plain rows, so memory stays flat however many logs match.
+    """
+    logs = iter(_query_rows(logs) if isinstance(logs, Query) else logs)
+    first = next(logs, None)
+
+    if first is None:
+        header, rows = ["No data available"], iter(())
+    elif hasattr(first, "bot_response"):  # ChatLog
+        header = ["Timestamp", "User Input", "Bot Response", "Mood"]
+        rows = (
+            [log.timestamp.strftime("%Y-%m-%d %H:%M"), log.user_input, log.bot_response, log.mood]
+            for log in itertools.chain([first], logs)
+        )
     else:  # MoodLog
-        writer.writerow(["Timestamp", "Mood"])
-        for log in logs:
-            writer.writerow([
-                log.timestamp.strftime("%Y-%m-%d %H:%M"),
-                log.mood
-            ])
+        header = ["Timestamp", "Mood"]
+        rows = ([log.timestamp.strftime("%Y-%m-%d %H:%M"), log.mood] for log in itertools.chain([first], logs))
 
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode("utf-8")),
-        mimetype="text/csv",
-        as_attachment=True,
-        download_name=f"logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return streamed_download(
+        csv_chunks(header, rows),
+        "text/csv",
+        f"logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     )
 
 
@@ -109,6 +109,8 @@ def export_logs_as_csv(logs):
 # Export Logs as PDF
 # ---------------------------------------------
 def export_logs_as_pdf(logs, title="Logs"):
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -0,0 +1,95 @@
+"""Per-turn cost of keeping chat history in filesystem sessions vs the conversation store.
+
+The session path mirrors the old /api/chat: load the pickled session, append
+the turn to ``chat_history`` and rewrite the whole file (Flask-Session's
+filesystem backend is a cachelib ``FileSystemCache``). The store path reads
+the window and appends one row.
+
+    python benchmarks/bench_conversation_store.py [--users 200] [--turns 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+from cachelib import FileSystemCache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.conversation_store import ConversationStore  # noqa: E402
+
+WINDOW = 10
+
+
+def _text(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase + " ") for _ in range(length))
+
+
+def _turns(users, turns, seed=0):
+    rng = random.Random(seed)
+    schedule = [(user, turn) for turn in range(turns) for user in range(users)]
+    rng.shuffle(schedule)
+    return [(user, _text(rng, rng.randint(20, 300)), _text(rng, rng.randint(60, 400))) for user, _ in schedule]
+
+
+def _dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def bench_sessions(workload, directory):
+    cache = FileSystemCache(directory, threshold=0)
+    latencies, written = [], 0
+    for user, user_message, bot_message in workload:
+        started = time.perf_counter()
+        key = f"session:{user}"
+        session = cache.get(key) or {"_user_id": str(user), "_fresh": True, "_id": "x" * 128}
+        session["chat_history"] = (session.get("chat_history", []) + [user_message, bot_message])[-WINDOW:]
+        session["last_detected_mood"] = "neutral"
+        cache.set(key, session)
+        latencies.append(time.perf_counter() - started)
+        written += os.path.getsize(cache._get_filename(key))
+    return latencies, written, _dir_bytes(directory)
+
+
+def bench_store(workload, directory):
+    path = os.path.join(directory, "conversations.db")
+    store = ConversationStore(path, window=WINDOW)
+    latencies = []
+    for user, user_message, bot_message in workload:
+        started = time.perf_counter()
+        store.history(user)
+        store.append(user, user_message, bot_message)
+        latencies.append(time.perf_counter() - started)
+    written = _dir_bytes(directory)  # db + WAL growth is the bytes written
+    store.compact()
+    store._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    store.close()
+    return latencies, written, _dir_bytes(directory)
+
+
+def report(name, latencies, written, on_disk, turns):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<20} mean {statistics.mean(latencies) * 1e6:8.0f} us   p95 {p95 * 1e6:8.0f} us   "
+          f"~{written / turns / 1024:6.1f} KiB written/turn   {on_disk / 1024:8.0f} KiB on disk")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    workload = _turns(args.users, args.turns)
+    print(f"{args.users} users x {args.turns} turns, window {WINDOW} messages")
+    with tempfile.TemporaryDirectory() as sessions_dir, tempfile.TemporaryDirectory() as store_dir:
+        report("filesystem session", *bench_sessions(workload, sessions_dir), len(workload))
+        report("conversation store", *bench_store(workload, store_dir), len(workload))
+
+
+if __name__ == "__main__":
+    main()
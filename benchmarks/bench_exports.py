@@ -0,0 +1,134 @@
+"""Peak memory and time of the chat CSV/NDJSON exports on a large history.
+
+Builds a SQLite database with one user owning ``--rows`` synthetic ChatLog
+rows (1M by default), then runs each export in a fresh interpreter and
+reports wall time, bytes sent and peak RSS growth over the already-started
+process (0 means the export never needed more memory than startup did).
+``legacy`` is the old implementation (``.all()`` into ORM objects, the whole
+CSV built in a ``StringIO``) for comparison.
+
+    python benchmarks/bench_exports.py [--rows 1000000] [--db /tmp/exports.db]
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = {
+    "legacy": "/bench/legacy/chat/csv",
+    "csv": "/export/chat/csv",
+    "ndjson": "/export/chat/ndjson",
+}
+
+
+def build_database(path, rows):
+    from app import create_app, db
+    from app.models import User
+
+    app = create_app(test_config={"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench", email="bench@example.com", password="bench-pass"))
+        db.session.commit()
+
+    rng = random.Random(0)
+    moods = ["joy", "sadness", "anger", "fear", "neutral", "surprise", "disgust"]
+    start = datetime(2020, 1, 1)
+    conn = sqlite3.connect(path)
+    batch = []
+    for i in range(rows):
+        batch.append((
+            1,
+            f"user message {i} " + "x" * rng.randint(10, 200),
+            f"bot response {i} " + "y" * rng.randint(20, 300),
+            rng.choice(moods),
+            (start + timedelta(minutes=i)).isoformat(sep=" "),
+        ))
+        if len(batch) == 50_000:
+            conn.executemany("INSERT INTO chat_logs (user_id, user_input, bot_response, mood, timestamp) "
+                             "VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO chat_logs (user_id, user_input, bot_response, mood, timestamp) "
+                         "VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def legacy_export_chat_csv():
+    """The pre-streaming implementation, kept here for comparison."""
+    from flask import make_response
+    from flask_login import current_user
+    from app.models import ChatLog
+
+    chats = ChatLog.query.filter_by(user_id=current_user.id).order_by(ChatLog.timestamp).all()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["Timestamp", "User Message", "Bot Response"])
+    for chat in chats:
+        writer.writerow([chat.timestamp.strftime("%Y-%m-%d %H:%M"), chat.user_input, chat.bot_response])
+    response = make_response(output.getvalue())
+    response.headers["Content-type"] = "text/csv"
+    return response
+
+
+def run_mode(path, mode):
+    """Child process: run one export and print ``seconds bytes peak_rss_growth_kib``."""
+    from flask_login import login_required
+    from app import create_app
+
+    app = create_app(test_config={"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+                                  "SECRET_KEY": "bench"})
+    app.add_url_rule(MODES["legacy"], "bench_legacy", login_required(legacy_export_chat_csv))
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = "1"
+        sess["_fresh"] = True
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    response = client.get(MODES[mode], buffered=False)
+    sent = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed:.3f} {sent} {peak - baseline}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", help="reuse/create this database file instead of a temp one")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--run", nargs=2, metavar=("DB", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return run_mode(*args.run)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "exports.db")
+        if not os.path.exists(path):
+            print(f"building {args.rows:,} rows in {path} ...")
+            build_database(path, args.rows)
+
+        print(f"{'mode':<8} {'seconds':>8} {'MB sent':>9} {'peak RSS growth MB':>19}")
+        for mode in args.modes:
+            out = subprocess.run([sys.executable, __file__, "--run", path, mode], cwd=ROOT,
+                                 capture_output=True, text=True, check=True).stdout.split()
+            seconds, sent, growth_kib = float(out[-3]), int(out[-2]), int(out[-1])
+            print(f"{mode:<8} {seconds:>8.2f} {sent / 2**20:>9.1f} {growth_kib / 1024:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
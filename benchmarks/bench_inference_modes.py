@@ -0,0 +1,98 @@
+"""Compare fp32, int8 and bf16 CPU inference for both models.
+
+For every mode this reports the weight footprint, process RSS after loading,
+DialoGPT greedy tokens/sec, and an accuracy regression check against fp32 on
+a fixed prompt set. Exits non-zero if any mode falls outside the thresholds.
+
+    python benchmarks/bench_inference_modes.py [--modes int8 bf16] [--new-tokens 32]
+"""
+import argparse
+import copy
+import os
+import sys
+
+import psutil
+import torch
+from transformers import AutoModelForCausalLM, AutoModelForSequenceClassification, AutoTokenizer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.generation import build_prompt, prepare_tokenizer  # noqa: E402
+from app.quantization import (  # noqa: E402
+    INFERENCE_MODES, apply_inference_mode, check_regression, compare_causal_lm,
+    compare_classifier, model_nbytes, tokens_per_second
+)
+from config import Config  # noqa: E402
+
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+
+MESSAGES = [
+    "I can't sleep and my thoughts keep racing",
+    "I feel really lonely lately",
+    "Today was actually a good day",
+    "I'm so angry at my boss",
+    "I'm scared about my exam tomorrow",
+    "Nothing feels worth doing anymore",
+    "I finally talked to my sister and it helped",
+    "I don't know what I'm feeling",
+]
+
+CHATBOT_THRESHOLDS = {
+    "cosine": ("min", 0.98),
+    "top1_agreement": ("min", 0.75),
+    "kl_divergence": ("max", 0.1),
+}
+CLASSIFIER_THRESHOLDS = {
+    "label_agreement": ("min", 0.85),
+    "max_probability_drift": ("max", 0.1),
+}
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", default=Config.MODEL_PATH)
+    parser.add_argument("--modes", nargs="+", default=list(INFERENCE_MODES), choices=INFERENCE_MODES)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    tokenizer = prepare_tokenizer(AutoTokenizer.from_pretrained(args.model_path))
+    chatbot = AutoModelForCausalLM.from_pretrained(args.model_path).eval()
+    emotion_tokenizer = AutoTokenizer.from_pretrained(EMOTION_MODEL)
+    emotion_model = AutoModelForSequenceClassification.from_pretrained(EMOTION_MODEL).eval()
+    prompts = [build_prompt(tokenizer, [], message) for message in MESSAGES]
+
+    failed = False
+    print(f"{'mode':<6} {'chatbot MB':>11} {'emotion MB':>11} {'RSS MB':>8} {'tok/s':>8}  accuracy vs fp32")
+    for mode in args.modes:
+        rss_before = rss_mb()
+        candidate = apply_inference_mode(copy.deepcopy(chatbot), mode)
+        emotion_candidate = apply_inference_mode(copy.deepcopy(emotion_model), mode)
+        rss_delta = rss_mb() - rss_before
+
+        speed = tokens_per_second(candidate, tokenizer, prompts, max_new_tokens=args.new_tokens)
+        chat_metrics = compare_causal_lm(chatbot, candidate, tokenizer, prompts)
+        mood_metrics = compare_classifier(emotion_model, emotion_candidate, emotion_tokenizer, MESSAGES)
+        failures = (check_regression(chat_metrics, CHATBOT_THRESHOLDS)
+                    + check_regression(mood_metrics, CLASSIFIER_THRESHOLDS))
+        failed = failed or bool(failures)
+
+        print(f"{mode:<6} {model_nbytes(candidate) / 2**20:>11.1f} "
+              f"{model_nbytes(emotion_candidate) / 2**20:>11.1f} {rss_delta:>8.1f} {speed:>8.1f}  "
+              f"cos={chat_metrics['cosine']:.4f} top1={chat_metrics['top1_agreement']:.2f} "
+              f"kl={chat_metrics['kl_divergence']:.4f} labels={mood_metrics['label_agreement']:.2f} "
+              f"drift={mood_metrics['max_probability_drift']:.3f}"
+              + (f"  FAIL: {', '.join(failures)}" if failures else ""))
+        del candidate, emotion_candidate
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Latency a chat turn spends persisting its ChatLog: synchronous commit vs write-behind.
+
+``--threads`` request threads each record ``--turns`` chat turns. ``sync``
+inserts the ChatLog and commits, the way ``/api/chat`` does with
+``LOG_WRITE_BEHIND`` off; ``spool`` calls ``LogWriter.record`` (the default,
+no fsync); ``spool-fsync`` calls it with ``LOG_SPOOL_FSYNC`` on, where
+concurrent turns share one fsync. Reports the per-turn p50/p95 latency seen
+by the request thread; the background batch commits are not on that path.
+
+    python benchmarks/bench_log_writer.py [--threads 8] [--turns 200] [--dir .]
+
+Run it on the disk the database and spool will live on (``--dir``); on tmpfs
+fsync is free and the modes look closer than they are.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ["sync", "spool", "spool-fsync"]
+
+
+def bench(mode, args):
+    from app import create_app, db
+    from app.models import ChatLog, User
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        app = create_app(test_config=dict(
+            TESTING=True, SECRET_KEY="bench", SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            LOG_WRITE_BEHIND=mode != "sync", LOG_SPOOL_DIR=os.path.join(tmp, "spool"),
+            LOG_SPOOL_FSYNC=mode == "spool-fsync",
+        ))
+        with app.app_context():
+            db.create_all()
+            db.session.add_all(User(username=f"u{i}", email=f"u{i}@example.com", password="bench-pass")
+                               for i in range(args.threads))
+            db.session.commit()
+        writer = app.config["log_writer"]
+        latencies = []
+
+        def run(user_id):
+            with app.app_context():
+                for turn in range(args.turns):
+                    started = time.perf_counter()
+                    if writer is not None:
+                        writer.record(user_id, f"message {turn}", "x" * 200, "neutral", 0.0)
+                    else:
+                        db.session.add(ChatLog(user_id=user_id, user_input=f"message {turn}",
+                                               bot_response="x" * 200, mood="neutral", mood_score=0.0))
+                        db.session.commit()
+                    latencies.append(time.perf_counter() - started)
+                db.session.remove()
+
+        pool = [threading.Thread(target=run, args=(i + 1,)) for i in range(args.threads)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if writer is not None:
+            writer.close()
+        with app.app_context():
+            assert ChatLog.query.count() == args.threads * args.turns
+            db.engine.dispose()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{mode:<12} {len(latencies) / elapsed:>9.0f} {statistics.median(latencies) * 1e3:>9.3f} "
+          f"{p95 * 1e3:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=200, help="turns per thread")
+    parser.add_argument("--dir", help="directory for the database and spool (default: the system temp dir)")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.turns} turns")
+    print(f"{'mode':<12} {'turns/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode in args.modes:
+        bench(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Dashboard, mood-trends and mood-count latency as one user's history grows.
+
+For each history size, builds a SQLite database with that many ChatLog and
+MoodLog rows (one of each every 20 minutes, so ~72 per day), backfills the
+rollups, and times each read path against the rollup tables and against the
+old full scans over the raw logs.
+
+    python benchmarks/bench_mood_rollups.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MOODS = ["happy", "sad", "neutral", "stressed"]
+
+OLD_QUERIES = {
+    "dashboard": "SELECT strftime('%Y-%W', timestamp), avg(mood_score) FROM chat_logs "
+                 "WHERE user_id = 1 AND mood_score IS NOT NULL GROUP BY strftime('%Y-%W', timestamp)",
+    "mood counts": "SELECT mood, count(mood) FROM mood_logs WHERE user_id = 1 GROUP BY mood",
+    "trends data": "SELECT timestamp, mood FROM mood_logs WHERE user_id = 1",
+}
+NEW_QUERIES = {
+    "dashboard": "SELECT week, sum(score_sum) / sum(score_count) FROM mood_weekly WHERE user_id = 1 "
+                 "GROUP BY week HAVING sum(score_count) > 0 ORDER BY week",
+    "mood counts": "SELECT mood, sum(mood_count) FROM mood_weekly WHERE user_id = 1 "
+                   "GROUP BY mood HAVING sum(mood_count) > 0",
+    "trends data": "SELECT day, mood, mood_count FROM mood_daily WHERE user_id = 1 AND mood_count > 0 "
+                   "ORDER BY day, mood",
+}
+
+
+def build_database(path, rows):
+    from app import create_app, db
+    from app.models import User
+
+    app = create_app(test_config={"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench", email="bench@example.com", password="bench-pass"))
+        db.session.commit()
+
+    rng = random.Random(0)
+    start = datetime(2015, 1, 1)
+    days = defaultdict(lambda: [0, 0.0, 0])
+    weeks = defaultdict(lambda: [0, 0.0, 0])
+    chats, moods = [], []
+    for i in range(rows):
+        timestamp = start + timedelta(minutes=20 * i)
+        mood, score = rng.choice(MOODS), rng.uniform(-1, 1)
+        chats.append((1, "hi", "hello", mood, score, timestamp.isoformat(sep=" ")))
+        moods.append((1, mood, timestamp.isoformat(sep=" ")))
+        for totals in (days[(timestamp.date().isoformat(), mood)], weeks[(timestamp.strftime('%Y-%W'), mood)]):
+            totals[0] += 1
+            totals[1] += score
+            totals[2] += 1
+
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO chat_logs (user_id, user_input, bot_response, mood, mood_score, timestamp) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", chats)
+    conn.executemany("INSERT INTO mood_logs (user_id, mood, timestamp) VALUES (?, ?, ?)", moods)
+    conn.executemany("INSERT INTO mood_daily (user_id, day, mood, mood_count, score_sum, score_count) "
+                     "VALUES (1, ?, ?, ?, ?, ?)", [(*key, *totals) for key, totals in days.items()])
+    conn.executemany("INSERT INTO mood_weekly (user_id, week, mood, mood_count, score_sum, score_count) "
+                     "VALUES (1, ?, ?, ?, ?, ?)", [(*key, *totals) for key, totals in weeks.items()])
+    conn.commit()
+    conn.close()
+
+
+def time_query(conn, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'read path':<12} {'full scan ms':>13} {'rollup ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"rollups_{size}.db")
+            build_database(path, size)
+            conn = sqlite3.connect(path)
+            for name in OLD_QUERIES:
+                old = time_query(conn, OLD_QUERIES[name], args.repeat)
+                new = time_query(conn, NEW_QUERIES[name], args.repeat)
+                print(f"{size:>9,} {name:<12} {old * 1e3:>13.2f} {new * 1e3:>10.2f}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Speculative decoding with the distilled draft model vs plain sampling.
+
+Generates a reply to every prompt ``--runs`` times with the chatbot's own
+sampling settings, first without and then with the draft model, and reports
+tokens/sec, mean latency and the speedup, plus the draft's accepted-token rate
+(accepted / proposed draft tokens) and the mean number of tokens produced per
+verification pass of the chatbot.
+
+    python benchmarks/bench_speculative.py [--draft-path ./chatbot_draft_model] [--runs 3] [--num-tokens 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+import transformers.generation.utils as generation_utils
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.generation import _generate, build_prompt, prepare_tokenizer, tokenize_prompts  # noqa: E402
+from config import Config  # noqa: E402
+
+MESSAGES = [
+    "I can't sleep and my thoughts keep racing",
+    "I feel really lonely lately",
+    "Today was actually a good day",
+    "I'm so angry at my boss",
+    "I'm scared about my exam tomorrow",
+    "Nothing feels worth doing anymore",
+    "I finally talked to my sister and it helped",
+    "I don't know what I'm feeling",
+]
+
+
+class AcceptanceCounter:
+    """Count proposed and accepted draft tokens by wrapping transformers' speculative sampling step."""
+
+    def __init__(self):
+        self.proposed = self.accepted = self.steps = 0
+        self._original = generation_utils._speculative_sampling
+
+    def __enter__(self):
+        def counted(candidate_input_ids, candidate_logits, candidate_length, *args, **kwargs):
+            valid_tokens, n_matches = self._original(candidate_input_ids, candidate_logits, candidate_length,
+                                                     *args, **kwargs)
+            self.proposed += int(candidate_length)
+            self.accepted += int(n_matches)
+            self.steps += 1
+            return valid_tokens, n_matches
+
+        generation_utils._speculative_sampling = counted
+        return self
+
+    def __exit__(self, *exc):
+        generation_utils._speculative_sampling = self._original
+
+
+def run(model, tokenizer, prompts, runs, draft_model=None):
+    """Return ``(new_tokens, seconds)`` over every prompt and run; seeds are shared between modes."""
+    tokens, elapsed = 0, 0.0
+    for i, prompt in enumerate(prompts):
+        input_ids, attention_mask = tokenize_prompts(tokenizer, [prompt], "cpu")
+        for seed in range(runs):
+            torch.manual_seed(1000 * i + seed)
+            start = time.perf_counter()
+            with torch.no_grad():
+                output = _generate(model, tokenizer, input_ids, attention_mask, draft_model=draft_model)
+            elapsed += time.perf_counter() - start
+            tokens += output.shape[-1] - input_ids.shape[-1]
+    return tokens, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", default=Config.MODEL_PATH)
+    parser.add_argument("--draft-path", default=Config.DRAFT_MODEL_PATH)
+    parser.add_argument("--runs", type=int, default=3, help="replies sampled per prompt")
+    parser.add_argument("--num-tokens", type=int, default=Config.SPECULATIVE_NUM_TOKENS)
+    parser.add_argument("--schedule", default=Config.SPECULATIVE_SCHEDULE, choices=["heuristic", "constant"])
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    tokenizer = prepare_tokenizer(AutoTokenizer.from_pretrained(args.model_path))
+    chatbot = AutoModelForCausalLM.from_pretrained(args.model_path).eval()
+    draft = AutoModelForCausalLM.from_pretrained(args.draft_path).eval()
+    draft.generation_config.num_assistant_tokens = args.num_tokens
+    draft.generation_config.num_assistant_tokens_schedule = args.schedule
+    prompts = [build_prompt(tokenizer, [], message) for message in MESSAGES]
+
+    run(chatbot, tokenizer, prompts[:1], 1)  # warm-up
+    base_tokens, base_s = run(chatbot, tokenizer, prompts, args.runs)
+    with AcceptanceCounter() as counter:
+        spec_tokens, spec_s = run(chatbot, tokenizer, prompts, args.runs, draft_model=draft)
+
+    n = len(prompts) * args.runs
+    print(f"{'mode':<12} {'tok/s':>8} {'ms/reply':>9} {'tokens':>7}")
+    print(f"{'baseline':<12} {base_tokens / base_s:>8.1f} {1000 * base_s / n:>9.1f} {base_tokens:>7}")
+    print(f"{'speculative':<12} {spec_tokens / spec_s:>8.1f} {1000 * spec_s / n:>9.1f} {spec_tokens:>7}")
+    print(f"speedup (tok/s): {(spec_tokens / spec_s) / (base_tokens / base_s):.2f}x")
+    if counter.proposed:
+        print(f"accepted-token rate: {counter.accepted / counter.proposed:.1%} "
+              f"({counter.accepted}/{counter.proposed} draft tokens), "
+              f"{(counter.accepted + counter.steps) / counter.steps:.2f} tokens per verification pass")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
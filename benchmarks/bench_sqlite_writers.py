@@ -0,0 +1,128 @@
+"""Chat-turn write throughput on SQLite with and without the connection tuning.
+
+Each of ``--processes`` worker processes (like gunicorn workers) runs
+``--threads`` threads, and every thread records ``--turns`` chat turns the
+way ``/api/chat`` does: load the user, insert a ChatLog and commit.
+``stock`` leaves SQLite at its defaults (rollback journal, synchronous=FULL,
+no cache/mmap tuning); ``tuned`` uses the Config defaults (WAL,
+synchronous=NORMAL, busy_timeout, cache_size, mmap_size).
+
+    python benchmarks/bench_sqlite_writers.py [--processes 4] [--threads 4] [--turns 100] [--dir .]
+
+Run it on the disk the database will live on (``--dir``); on tmpfs fsync is
+free and the synchronous setting makes no difference.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROFILES = {
+    "stock": {"SQLITE_JOURNAL_MODE": "", "SQLITE_SYNCHRONOUS": "", "SQLITE_BUSY_TIMEOUT_MS": "",
+              "SQLITE_CACHE_SIZE_KIB": 0, "SQLITE_MMAP_SIZE_MB": 0},
+    "tuned": {},
+}
+
+
+def _app(path, profile):
+    from app import create_app
+
+    return create_app(test_config=dict(
+        PROFILES[profile], TESTING=True, SECRET_KEY="bench", SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}"
+    ))
+
+
+def setup_database(path, profile, users):
+    from app import db
+    from app.models import User
+
+    app = _app(path, profile)
+    with app.app_context():
+        db.session.add_all(User(username=f"u{i}", email=f"u{i}@example.com", password="bench-pass")
+                           for i in range(users))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def worker(path, profile, worker_id, threads, turns, users, barrier, results):
+    from app import db
+    from app.models import User, ChatLog
+
+    app = _app(path, profile)
+    latencies, errors = [], []
+
+    def run(thread_id):
+        with app.app_context():
+            for turn in range(turns):
+                user_id = (worker_id * threads + thread_id + turn) % users + 1
+                started = time.perf_counter()
+                try:
+                    db.session.get(User, user_id)
+                    db.session.add(ChatLog(user_id=user_id, user_input=f"message {turn}",
+                                           bot_response="x" * 200, mood="neutral", mood_score=0.0))
+                    db.session.commit()
+                    latencies.append(time.perf_counter() - started)
+                except Exception as exc:  # "database is locked" under contention
+                    db.session.rollback()
+                    errors.append(type(exc).__name__)
+                finally:
+                    db.session.remove()
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    barrier.wait()  # start writing together, after every process has imported and built its app
+    started = time.time()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((latencies, errors, started, time.time()))
+
+
+def bench(profile, args):
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        path = os.path.join(tmp, f"{profile}.db")
+        setup_database(path, profile, args.users)
+
+        ctx = multiprocessing.get_context("spawn")
+        results, barrier = ctx.Queue(), ctx.Barrier(args.processes)
+        processes = [ctx.Process(target=worker, args=(path, profile, i, args.threads, args.turns, args.users,
+                                                     barrier, results))
+                     for i in range(args.processes)]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    elapsed = max(result[3] for result in collected) - min(result[2] for result in collected)
+    latencies = sorted(latency for result in collected for latency in result[0])
+    errors = sum(len(result[1]) for result in collected)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan")
+    print(f"{profile:<6} {len(latencies) / elapsed:>9.0f} {statistics.median(latencies) * 1e3:>9.1f} "
+          f"{p95 * 1e3:>9.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=100, help="turns per thread")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--dir", help="directory for the databases (default: the system temp dir)")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.threads} threads x {args.turns} turns")
+    print(f"{'config':<6} {'turns/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    for profile in args.profiles:
+        bench(profile, args)
+
+
+if __name__ == "__main__":
+    main()
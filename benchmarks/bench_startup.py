@@ -0,0 +1,84 @@
+"""Cold-start budget for importing the app and building it.
+
+Runs ``python -X importtime`` in fresh interpreters, reports the median
+wall-clock time and the slowest top-level imports, and fails when the
+budget is exceeded or a heavy dependency is imported eagerly.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 800] [--target app|main]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the chat, export and admin features may pull these in, on first use
+DEFERRED_MODULES = [
+    "torch", "transformers", "fpdf", "requests", "psutil",
+    "flask_admin", "alembic", "apscheduler", "bs4",
+]
+
+TARGETS = {
+    # The test/CLI factory
+    "app": "import app; app.create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})",
+    # The production factory, without Flask-Admin and model warm-up
+    "main": "import main; main.create_app()",
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run_once(code):
+    env = dict(os.environ, FLASK_ENV="testing", MODEL_LOADING="lazy", ADMIN_ENABLED="false")
+    probe = code + "; import sys; print(','.join(m for m in %r if m in sys.modules))" % (DEFERRED_MODULES,)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Top-level imports and their direct children (indent 1 and 3)
+        if match and len(match.group(3)) <= 3:
+            cumulative[match.group(4)] = int(match.group(2)) / 1000
+    leaked = [name for name in result.stdout.strip().split(",") if name]
+    return elapsed_ms, cumulative, leaked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0,
+                        help="median wall-clock budget for interpreter start + import + create_app")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="app")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    run_once(TARGETS[args.target])  # warm the OS page cache and .pyc files
+    runs = [run_once(TARGETS[args.target]) for _ in range(args.runs)]
+    wall = statistics.median(elapsed for elapsed, _, _ in runs)
+    _, cumulative, leaked = runs[-1]
+
+    print(f"target: {args.target}  runs: {args.runs}")
+    print(f"median wall-clock: {wall:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print("\nslowest imports, two levels deep (cumulative ms):")
+    for name, ms in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:8.1f}  {name}")
+
+    failed = False
+    if leaked:
+        print(f"\nFAIL: imported at startup: {', '.join(leaked)}")
+        failed = True
+    if wall > args.budget_ms:
+        print(f"\nFAIL: startup {wall:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
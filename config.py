@@ -17,6 +17,18 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI", "sqlite:///chatbot.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Database engine pool (per worker process; size it for GUNICORN_THREADS plus background writers)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 8))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+
+    # SQLite pragmas applied to every connection (ignored for other databases; empty disables one)
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # readers no longer block the writer
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # fsync at checkpoints, not every commit
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_CACHE_SIZE_KIB = int(os.getenv("SQLITE_CACHE_SIZE_KIB", 65536))
+    SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", 256))
+
     # Session
     SESSION_TYPE = "filesystem"  # or "redis" for production
     SESSION_FILE_DIR = os.path.join(os.getcwd(), "flask_session")
@@ -25,15 +37,115 @@ class Config:
     SESSION_KEY_PREFIX = "session:"
     SESSION_FILE_THRESHOLD = 200  # Optional: max number of sessions before cleanup
 
+    # Conversation store (recent chat turns; kept out of the session)
+    CONVERSATION_STORE_PATH = os.getenv("CONVERSATION_STORE_PATH", os.path.join(os.getcwd(), "instance", "conversations.db"))
+    CONVERSATION_WINDOW = int(os.getenv("CONVERSATION_WINDOW", 10))  # messages fed to the model
+    CONVERSATION_TTL_HOURS = int(os.getenv("CONVERSATION_TTL_HOURS", 168))
+    CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", 1024))
+
+    # Write-behind persistence of ChatLog: turns are spooled locally and
+    # committed in batches every LOG_FLUSH_INTERVAL_MS or LOG_FLUSH_MAX_RECORDS turns
+    LOG_WRITE_BEHIND = os.getenv("LOG_WRITE_BEHIND", "false").lower() == "true"
+    LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", 200))
+    LOG_FLUSH_MAX_RECORDS = int(os.getenv("LOG_FLUSH_MAX_RECORDS", 256))
+    LOG_SPOOL_DIR = os.getenv("LOG_SPOOL_DIR", os.path.join(os.getcwd(), "instance", "log_spool"))
+    LOG_READ_WAIT_S = float(os.getenv("LOG_READ_WAIT_S", 5))  # max wait for another worker's flush
+    # fsync spooled turns so they survive a host crash, not only a worker crash
+    # (concurrent turns share one fsync, but each reply still waits for the disk)
+    LOG_SPOOL_FSYNC = os.getenv("LOG_SPOOL_FSYNC", "false").lower() == "true"
+
+    # Therapist directory, written by fetch_therapists/scrape_therapists
+    THERAPISTS_PATH = os.getenv("THERAPISTS_PATH", os.path.join(os.getcwd(), "data", "therapists.json"))
+    THERAPIST_LOCATIONS = [city.strip() for city in os.getenv("THERAPIST_LOCATIONS", "Hyderabad").split(",") if city.strip()]
+    PLACES_API_URL = os.getenv("PLACES_API_URL", "https://maps.googleapis.com/maps/api/place/textsearch/json")
+    PRACTO_URL = os.getenv("PRACTO_URL", "https://www.practo.com/{city}/psychologist")
+    # Upstream fetches: pooled connections, (connect, read) timeouts, retries with exponential backoff
+    THERAPIST_FETCH_CONNECT_TIMEOUT_S = float(os.getenv("THERAPIST_FETCH_CONNECT_TIMEOUT_S", 3.05))
+    THERAPIST_FETCH_READ_TIMEOUT_S = float(os.getenv("THERAPIST_FETCH_READ_TIMEOUT_S", 10))
+    THERAPIST_FETCH_RETRIES = int(os.getenv("THERAPIST_FETCH_RETRIES", 3))
+    THERAPIST_FETCH_BACKOFF_S = float(os.getenv("THERAPIST_FETCH_BACKOFF_S", 0.5))
+    THERAPIST_FETCH_POOL_SIZE = int(os.getenv("THERAPIST_FETCH_POOL_SIZE", 8))
+    THERAPIST_FETCH_WORKERS = int(os.getenv("THERAPIST_FETCH_WORKERS", 4))  # concurrent locations/keywords
+
+    # Periodic jobs, run by one `flask jobs start` process per node (file lock), never in web workers
+    JOBS_LOCK_PATH = os.getenv("JOBS_LOCK_PATH", os.path.join(os.getcwd(), "instance", "jobs.lock"))
+    JOBS_STATUS_PATH = os.getenv("JOBS_STATUS_PATH", os.path.join(os.getcwd(), "instance", "jobs.json"))
+    JOBS_POLL_S = float(os.getenv("JOBS_POLL_S", 30))  # standbys retry the lock this often
+    THERAPIST_REFRESH_DAYS = float(os.getenv("THERAPIST_REFRESH_DAYS", 15))
+    SESSION_CLEANUP_MINUTES = float(os.getenv("SESSION_CLEANUP_MINUTES", 60))
+    ROLLUP_RECONCILE_HOURS = float(os.getenv("ROLLUP_RECONCILE_HOURS", 24))
+    ROLLUP_RECONCILE_WEEKS = int(os.getenv("ROLLUP_RECONCILE_WEEKS", 4))  # finished weeks recounted per run
+
+    # Authenticated-user snapshots (id, username, email) cached per process and per session
+    USER_CACHE_TTL_S = int(os.getenv("USER_CACHE_TTL_S", 60))  # 0 disables the cache
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 4096))
+
+    # Background PDF exports (rendered in a local process pool, cached per user under EXPORT_DIR)
+    EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(os.getcwd(), "instance", "exports"))
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+    EXPORT_JOB_TIMEOUT = int(os.getenv("EXPORT_JOB_TIMEOUT", 600))  # pending jobs older than this are retried
+    EXPORT_SYNC_WAIT = float(os.getenv("EXPORT_SYNC_WAIT", 5))  # seconds /export/*/pdf waits before returning 202
+
     # CSRF (enabled in prod, disabled in test)
     WTF_CSRF_ENABLED = True
 
     # Chatbot Model
     MODEL_PATH = os.getenv("MODEL_PATH", "./chatbot_model_small")
+    EMOTION_MODEL = os.getenv("EMOTION_MODEL", "j-hartmann/emotion-english-distilroberta-base")
+    # When to load the models: eager (at startup, before gunicorn forks),
+    # background (warm-up thread per worker) or lazy (on the first chat request)
+    MODEL_LOADING = os.getenv("MODEL_LOADING", "background")
+    # CPU inference mode for both models: fp32, int8 (dynamic quantization) or bf16
+    INFERENCE_MODE = os.getenv("INFERENCE_MODE", "fp32")
+
+    # Generation micro-batching (requires a threaded worker, e.g. gunicorn --threads)
+    GENERATION_BATCHING = os.getenv("GENERATION_BATCHING", "false").lower() == "true"
+    GENERATION_MAX_BATCH_SIZE = int(os.getenv("GENERATION_MAX_BATCH_SIZE", 8))
+    GENERATION_MAX_WAIT_MS = int(os.getenv("GENERATION_MAX_WAIT_MS", 15))
+
+    # Per-conversation KV-cache reuse (takes precedence over batching when enabled)
+    KV_CACHE_ENABLED = os.getenv("KV_CACHE_ENABLED", "false").lower() == "true"
+    KV_CACHE_MAX_MB = int(os.getenv("KV_CACHE_MAX_MB", 256))
+    KV_CACHE_MIN_REUSE_TOKENS = int(os.getenv("KV_CACHE_MIN_REUSE_TOKENS", 16))
+
+    # Speculative decoding: a distilled draft model (distill_draft_model.py) proposes tokens that
+    # the chatbot verifies in one pass; single sequences only, so it bypasses generation batching
+    SPECULATIVE_DECODING = os.getenv("SPECULATIVE_DECODING", "false").lower() == "true"
+    DRAFT_MODEL_PATH = os.getenv("DRAFT_MODEL_PATH", "./chatbot_draft_model")
+    SPECULATIVE_NUM_TOKENS = int(os.getenv("SPECULATIVE_NUM_TOKENS", 5))  # draft tokens per verification
+    SPECULATIVE_SCHEDULE = os.getenv("SPECULATIVE_SCHEDULE", "heuristic")  # heuristic (adaptive) or constant
+
+    # Shared pool of sampled replies for first turns (no history); keyed on message + model version
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    RESPONSE_CACHE_POOL_SIZE = int(os.getenv("RESPONSE_CACHE_POOL_SIZE", 4))  # replies rotated per message
+    RESPONSE_CACHE_TTL_S = int(os.getenv("RESPONSE_CACHE_TTL_S", 3600))
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1024))
+    RESPONSE_CACHE_MAX_INPUT_CHARS = int(os.getenv("RESPONSE_CACHE_MAX_INPUT_CHARS", 64))
+    RESPONSE_CACHE_MODEL_VERSION = os.getenv("RESPONSE_CACHE_MODEL_VERSION", "")  # default: path + mode + sampling
+
+    # Paraphrases of cached first turns (needs RESPONSE_CACHE_ENABLED and a sentence-embedding
+    # SEMANTIC_CACHE_MODEL, e.g. sentence-transformers/all-MiniLM-L6-v2; stays off without one)
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "")
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))  # cosine similarity
+    SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", 2048))
+    SEMANTIC_CACHE_TTL_S = int(os.getenv("SEMANTIC_CACHE_TTL_S", 3600))
+    SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "")  # .npz snapshot; empty keeps it in memory
+    SEMANTIC_CACHE_AUDIT_PATH = os.getenv("SEMANTIC_CACHE_AUDIT_PATH", os.path.join("logs", "semantic_cache.log"))
+
+    # Emotion classification service
+    MOOD_MAX_BATCH_SIZE = int(os.getenv("MOOD_MAX_BATCH_SIZE", 16))
+    MOOD_MAX_WAIT_MS = int(os.getenv("MOOD_MAX_WAIT_MS", 5))
+    MOOD_CACHE_SIZE = int(os.getenv("MOOD_CACHE_SIZE", 4096))
+    # Tag the user turn with the detected mood when it is known before generation starts
+    CHAT_MOOD_CONDITIONING = os.getenv("CHAT_MOOD_CONDITIONING", "false").lower() == "true"
 
     # Hugging Face Token (if using private models)
     HF_TOKEN = os.getenv("HF_TOKEN", "")
 
+    # Flask-Admin at /admin (its imports are skipped entirely when disabled)
+    ADMIN_ENABLED = os.getenv("ADMIN_ENABLED", "true").lower() == "true"
+
     # Flask behavior
     DEBUG = False
     TESTING = False
@@ -54,6 +166,7 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     SESSION_TYPE = "filesystem"
     SESSION_FILE_DIR = os.path.join(os.getcwd(), "test_sessions")
+    CONVERSATION_STORE_PATH = ":memory:"
 
 
 class ProductionConfig(Config):
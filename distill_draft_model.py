@@ -0,0 +1,137 @@
+"""Distill a small draft model from the fine-tuned chatbot for speculative decoding.
+
+The student is a GPT-2 with fewer layers than the teacher (chatbot_model_small):
+it starts from the teacher's embeddings, final layer norm and evenly spaced
+blocks, and is trained on the same dataset and text format as train_model.py
+to match the teacher's softened next-token distribution (plus the usual
+language-modelling loss). It shares the teacher's tokenizer, which speculative
+decoding requires.
+
+    python distill_draft_model.py [--data mental_health_chatbot.csv] [--layers 2] [--epochs 3]
+"""
+import argparse
+import copy
+import os
+
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from datasets import Dataset
+from sklearn.model_selection import train_test_split
+from transformers import AutoModelForCausalLM, AutoTokenizer, Trainer, TrainingArguments
+
+
+def build_student(teacher, n_layers):
+    """Copy of ``teacher`` keeping ``n_layers`` evenly spaced transformer blocks."""
+    total = teacher.config.n_layer
+    if not 0 < n_layers < total:
+        raise ValueError(f"--layers must be between 1 and {total - 1}")
+    keep = [round(i * (total - 1) / max(n_layers - 1, 1)) for i in range(n_layers)]
+    student = copy.deepcopy(teacher)
+    student.transformer.h = torch.nn.ModuleList(student.transformer.h[i] for i in keep)
+    student.config.n_layer = n_layers
+    print(f"[INFO] Student keeps teacher blocks {keep} of {total}")
+    return student
+
+
+class DistillationTrainer(Trainer):
+    """Trainer whose loss is ``alpha * T² * KL(teacher || student) + (1 - alpha) * CE``."""
+
+    def __init__(self, *args, teacher=None, temperature=2.0, alpha=0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher.eval()
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        outputs = model(**inputs)
+        with torch.no_grad():
+            teacher_logits = self.teacher(input_ids=inputs["input_ids"],
+                                          attention_mask=inputs["attention_mask"]).logits
+
+        # Next-token distributions at every non-padding position
+        mask = inputs["attention_mask"][:, 1:].bool()
+        student_logits = outputs.logits[:, :-1][mask] / self.temperature
+        teacher_logits = teacher_logits[:, :-1][mask] / self.temperature
+        kl = F.kl_div(F.log_softmax(student_logits, dim=-1), F.log_softmax(teacher_logits, dim=-1),
+                      log_target=True, reduction="batchmean") * self.temperature ** 2
+
+        loss = self.alpha * kl + (1 - self.alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teacher", default="./chatbot_model_small")
+    parser.add_argument("--data", default=os.getenv("CHATBOT_DATASET", "mental_health_chatbot.csv"))
+    parser.add_argument("--out", default="./chatbot_draft_model")
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--epochs", type=float, default=3)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.5, help="weight of the distillation loss")
+    parser.add_argument("--max-length", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    args = parser.parse_args()
+
+    # Same samples and formatting as train_model.py
+    df = pd.read_csv(args.data)
+    df["text"] = df.apply(
+        lambda row: f"User: {row['Situation'].strip()}\nBot: {row['empathetic_dialogues'].strip()}",
+        axis=1
+    )
+    train_df, val_df = train_test_split(df[["text"]], test_size=0.2, random_state=42)
+
+    tokenizer = AutoTokenizer.from_pretrained(args.teacher)
+    tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+
+    def tokenize(example):
+        result = tokenizer(example["text"], truncation=True, padding="max_length", max_length=args.max_length)
+        # Padding doesn't count towards the language-modelling loss
+        result["labels"] = [
+            [token if keep else -100 for token, keep in zip(ids, mask)]
+            for ids, mask in zip(result["input_ids"], result["attention_mask"])
+        ]
+        return result
+
+    columns = ["text", "__index_level_0__"]
+    train_dataset = Dataset.from_pandas(train_df).map(tokenize, batched=True, remove_columns=columns)
+    val_dataset = Dataset.from_pandas(val_df).map(tokenize, batched=True, remove_columns=columns)
+
+    teacher = AutoModelForCausalLM.from_pretrained(args.teacher)
+    student = build_student(teacher, args.layers)
+    teacher.to("cuda" if torch.cuda.is_available() else "cpu")
+
+    training_args = TrainingArguments(
+        output_dir=args.out,
+        num_train_epochs=args.epochs,
+        per_device_train_batch_size=args.batch_size,
+        per_device_eval_batch_size=args.batch_size,
+        learning_rate=args.lr,
+        eval_strategy="epoch",
+        save_strategy="epoch",
+        save_total_limit=1,
+        logging_dir="./logs",
+        logging_steps=10,
+        fp16=torch.cuda.is_available(),
+        report_to="none"
+    )
+    trainer = DistillationTrainer(
+        model=student,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=val_dataset,
+        teacher=teacher,
+        temperature=args.temperature,
+        alpha=args.alpha,
+    )
+
+    trainer.train()
+    trainer.save_model(args.out)
+    tokenizer.save_pretrained(args.out)
+    print(f"✅ Draft model ({args.layers} layers) distilled and saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# gunicorn -c gunicorn.conf.py
+#
+# The app (and both models) are loaded once in the master and the workers are
+# forked from it, so N workers share one physical copy of the weights
+# copy-on-write. Set GUNICORN_PRELOAD=false to give every worker its own copy.
+import gc
+import os
+
+wsgi_app = "main:create_app()"
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+# Threads let the generation/mood micro-batchers group concurrent requests
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+if preload_app:
+    # Warm the registry in the master, before fork
+    os.environ.setdefault("MODEL_LOADING", "eager")
+
+
+def when_ready(server):
+    # Move everything allocated during preload out of the collector's reach;
+    # otherwise the first GC in each worker touches (and copies) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Split the cores between workers instead of every worker using all of them
+    threads_per_worker = os.getenv("TORCH_NUM_THREADS")
+    if threads_per_worker:
+        import torch
+        torch.set_num_threads(int(threads_per_worker))
@@ -3,22 +3,25 @@ import logging
 import warnings
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_session import Session
 from flask_cors import CORS
 from flask_login import LoginManager
-from flask_admin import Admin
-from flask_admin.contrib.sqla import ModelView
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from dotenv import load_dotenv
-import torch
 from app.routes import register_routes
-from app.database import db
+from app.database import db, init_database, init_migrations, cli_command
 from app.models import User, ChatLog
 from config import DevelopmentConfig, TestingConfig, ProductionConfig
-from app.scheduler import start_scheduler
-from model_loader import load_models
+from app.scheduler import jobs_cli
+from app.kv_cache import create_kv_cache
+from app.response_cache import create_response_cache
+from app.conversation_store import create_conversation_store
+from app.export_jobs import create_export_jobs
+from app.log_writer import create_log_writer
+from app.user_cache import create_user_cache, load_user
+from app.therapists import create_therapist_directory
+from app.model_registry import create_model_registry
 
 # Ignore FutureWarnings from dependencies
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -43,18 +46,21 @@ def create_app():
     Path(app.config['SESSION_FILE_DIR']).mkdir(parents=True, exist_ok=True)
 
     # Initialize Flask extensions
-    db.init_app(app)
-    Migrate(app, db)
+    init_database(app)
+    init_migrations(app)
     Session(app)
+    app.config['conversation_store'] = create_conversation_store(app)
+    app.config['export_jobs'] = create_export_jobs(app)
+    app.config['log_writer'] = create_log_writer(app)
+    app.config['user_cache'] = create_user_cache(app)
+    app.config['therapist_directory'] = create_therapist_directory(app)
 
     # Login manager setup
     login_manager = LoginManager()
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
-    @login_manager.user_loader
-    def load_user(user_id):
-        return db.session.get(User, int(user_id))
+    login_manager.user_loader(load_user)  # cached UserSnapshot, not a User row
 
     # Enable CORS (restrict in production)
     if env == "production":
@@ -74,6 +80,8 @@ def create_app():
 
     # Register routes (Blueprints)
     register_routes(app)
+    # Periodic jobs run in their own process: ``flask --app main:create_app jobs start``
+    app.cli.add_command(jobs_cli)
 
     # Register error handlers
     @app.errorhandler(404)
@@ -87,24 +95,37 @@ def create_app():
         return jsonify({"error": "Internal Server Error"}), 500
 
     # Setup Flask-Admin
-    admin = Admin(app, name='Admin', template_mode='bootstrap3')
-    admin.add_view(ModelView(User, db.session))
-    admin.add_view(ModelView(ChatLog, db.session))
+    if app.config['ADMIN_ENABLED']:
+        register_admin(app)
+
+    # Models load lazily through the registry; MODEL_LOADING decides whether
+    # to warm them now (gunicorn preload_app), in the background, or on first use
+    registry = create_model_registry(app)
+    app.config['model_registry'] = registry
+    app.config['kv_cache'] = create_kv_cache(app)
+    app.config['response_cache'] = create_response_cache(app)
+    # CLI commands such as ``flask db upgrade`` never touch the models
+    command = cli_command()
+    if command is None or command.endswith(" run"):
+        if app.config['MODEL_LOADING'] == "eager":
+            registry.warm()
+        elif app.config['MODEL_LOADING'] == "background":
+            registry.warm_in_background()
 
-    # Load models into memory and attach to app config
-    chatbot_tokenizer, chatbot_model, emotion_classifier = load_models()
-    app.config['chatbot_tokenizer'] = chatbot_tokenizer
-    app.config['chatbot_model'] = chatbot_model
-    app.config['emotion_classifier'] = emotion_classifier
+    return app
 
-    app.config['device'] = "cuda" if torch.cuda.is_available() else "cpu"
 
-    return app
+def register_admin(app):
+    from flask_admin import Admin
+    from flask_admin.contrib.sqla import ModelView
+
+    admin = Admin(app, name='Admin', template_mode='bootstrap3')
+    admin.add_view(ModelView(User, db.session))
+    admin.add_view(ModelView(ChatLog, db.session))
 
 
 if __name__ == "__main__":
     app = create_app()
-    start_scheduler()
     app.run(
         debug=os.getenv("FLASK_ENV", "development") != "production",
         host="0.0.0.0",
@@ -51,6 +51,14 @@ def get_metadata():
     return target_db.metadata
 
 
+# Tables kept by migrations for auditing only; autogenerate must not drop them
+UNMANAGED_TABLES = {"mood_logs_dedupe_archive"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and reflected and name in UNMANAGED_TABLES)
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -91,6 +99,7 @@ def run_migrations_online():
                 logger.info('No changes in schema detected.')
 
     conf_args = current_app.extensions['migrate'].configure_args
+    conf_args.setdefault("include_object", include_object)
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
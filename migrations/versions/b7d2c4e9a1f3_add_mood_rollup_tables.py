@@ -0,0 +1,88 @@
+"""Add daily/weekly mood rollup tables
+
+Revision ID: b7d2c4e9a1f3
+Revises: 566b79e3eccb
+Create Date: 2026-10-18 10:12:31.504118
+
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2c4e9a1f3'
+down_revision = '566b79e3eccb'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _rollup_columns(period):
+    return [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        period,
+        sa.Column('mood', sa.String(length=50), nullable=False),
+        sa.Column('mood_count', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Float(), nullable=False),
+        sa.Column('score_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    ]
+
+
+def _parse(timestamp):
+    # SQLite hands DateTime columns back as text in a bare connection
+    if isinstance(timestamp, str):
+        return datetime.fromisoformat(timestamp)
+    return timestamp
+
+
+def _backfill(bind, daily, weekly):
+    """Aggregate existing logs with the same day/week keys the ORM listeners use."""
+    days = defaultdict(lambda: [0, 0.0, 0])
+    weeks = defaultdict(lambda: [0, 0.0, 0])
+
+    def add(user_id, timestamp, mood, delta):
+        if timestamp is None:
+            return
+        timestamp = _parse(timestamp)
+        mood = mood or 'unknown'
+        for totals in (days[(user_id, timestamp.date(), mood)], weeks[(user_id, timestamp.strftime('%Y-%W'), mood)]):
+            for i, value in enumerate(delta):
+                totals[i] += value
+
+    for user_id, timestamp, mood in bind.execute(sa.text(
+            "SELECT user_id, timestamp, mood FROM mood_logs")).yield_per(BATCH_SIZE):
+        add(user_id, timestamp, mood, (1, 0.0, 0))
+    for user_id, timestamp, mood, score in bind.execute(sa.text(
+            "SELECT user_id, timestamp, mood, mood_score FROM chat_logs WHERE mood_score IS NOT NULL")).yield_per(BATCH_SIZE):
+        add(user_id, timestamp, mood, (0, score, 1))
+
+    for table, period, totals in ((daily, 'day', days), (weekly, 'week', weeks)):
+        rows = [
+            {'user_id': user_id, period: key, 'mood': mood,
+             'mood_count': count, 'score_sum': score_sum, 'score_count': score_count}
+            for (user_id, key, mood), (count, score_sum, score_count) in totals.items()
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            op.bulk_insert(table, rows[start:start + BATCH_SIZE])
+
+
+def upgrade():
+    daily = op.create_table('mood_daily',
+    *_rollup_columns(sa.Column('day', sa.Date(), nullable=False)),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'mood')
+    )
+    weekly = op.create_table('mood_weekly',
+    *_rollup_columns(sa.Column('week', sa.String(length=7), nullable=False)),
+    sa.PrimaryKeyConstraint('user_id', 'week', 'mood')
+    )
+    _backfill(op.get_bind(), daily, weekly)
+
+
+def downgrade():
+    op.drop_table('mood_weekly')
+    op.drop_table('mood_daily')
@@ -0,0 +1,36 @@
+"""Add per-user composite indexes on chat and mood logs
+
+Revision ID: d41e8a6f2c07
+Revises: b7d2c4e9a1f3
+Create Date: 2026-10-18 11:03:47.218593
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41e8a6f2c07'
+down_revision = 'b7d2c4e9a1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_logs_user_id_timestamp', ['user_id', 'timestamp'], unique=False)
+
+    with op.batch_alter_table('mood_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_mood_logs_user_id_timestamp_mood', ['user_id', 'timestamp', 'id', 'mood'], unique=False)
+
+    # Give the SQLite planner statistics for the new indexes
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(sa.text('ANALYZE'))
+
+
+def downgrade():
+    with op.batch_alter_table('mood_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_mood_logs_user_id_timestamp_mood')
+
+    with op.batch_alter_table('chat_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_logs_user_id_timestamp')
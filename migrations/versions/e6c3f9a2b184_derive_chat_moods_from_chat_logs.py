@@ -0,0 +1,143 @@
+"""Stop copying chat moods to mood_logs; move the existing copies to an archive table
+
+Revision ID: e6c3f9a2b184
+Revises: d41e8a6f2c07
+Create Date: 2026-10-18 12:26:09.730512
+
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6c3f9a2b184'
+down_revision = 'd41e8a6f2c07'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+DELETE_BATCH = 500  # well under SQLite's bound-parameter limit
+
+# The chat route added both rows in one flush, each stamped by its own
+# datetime.utcnow() default, so a copy lands microseconds after its chat turn.
+# A manual entry is a separate form request and cannot land that close; the
+# removed rows are kept in ARCHIVE (with the chat turn they matched) anyway
+DUPLICATE_WINDOW = timedelta(milliseconds=50)
+ARCHIVE = 'mood_logs_dedupe_archive'
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def _parse(timestamp):
+    # SQLite hands DateTime columns back as text in a bare connection
+    if isinstance(timestamp, str):
+        return datetime.fromisoformat(timestamp)
+    return timestamp
+
+
+def _duplicates(bind, user_id):
+    """``(mood_log_id, chat_log_id)`` of ``user_id``'s mood_logs rows that copy one of their chat turns.
+
+    A copy has the turn's mood and is stamped at most DUPLICATE_WINDOW after
+    it; turns and copies are matched one-to-one, in order.
+    """
+    chats = defaultdict(list)
+    for chat_id, timestamp, mood in bind.execute(sa.text(
+            "SELECT id, timestamp, mood FROM chat_logs WHERE user_id = :user_id AND mood IS NOT NULL "
+            "AND timestamp IS NOT NULL ORDER BY timestamp, id"), {'user_id': user_id}):
+        chats[mood].append((_parse(timestamp), chat_id))
+
+    positions = defaultdict(int)
+    duplicates = []
+    for row_id, timestamp, mood in bind.execute(sa.text(
+            "SELECT id, timestamp, mood FROM mood_logs WHERE user_id = :user_id AND timestamp IS NOT NULL "
+            "ORDER BY timestamp, id"), {'user_id': user_id}):
+        timestamp, turns = _parse(timestamp), chats.get(mood, ())
+        i = positions[mood]
+        while i < len(turns) and turns[i][0] < timestamp - DUPLICATE_WINDOW:
+            i += 1
+        if i < len(turns) and turns[i][0] <= timestamp:
+            duplicates.append((row_id, turns[i][1]))
+            i += 1
+        positions[mood] = i
+    return duplicates
+
+
+def _rebuild_rollups(bind):
+    """Recount mood_daily/mood_weekly with the new rule: a chat turn with a mood counts once."""
+    days = defaultdict(lambda: [0, 0.0, 0])
+    weeks = defaultdict(lambda: [0, 0.0, 0])
+
+    def add(user_id, timestamp, mood, delta):
+        if timestamp is None:
+            return
+        timestamp = _parse(timestamp)
+        mood = mood or 'unknown'
+        for totals in (days[(user_id, timestamp.date(), mood)], weeks[(user_id, timestamp.strftime('%Y-%W'), mood)]):
+            for i, value in enumerate(delta):
+                totals[i] += value
+
+    for user_id, timestamp, mood in bind.execute(sa.text(
+            "SELECT user_id, timestamp, mood FROM mood_logs")).yield_per(BATCH_SIZE):
+        add(user_id, timestamp, mood, (1, 0.0, 0))
+    for user_id, timestamp, mood, score in bind.execute(sa.text(
+            "SELECT user_id, timestamp, mood, mood_score FROM chat_logs "
+            "WHERE mood IS NOT NULL OR mood_score IS NOT NULL")).yield_per(BATCH_SIZE):
+        add(user_id, timestamp, mood, (int(mood is not None), score or 0.0, int(score is not None)))
+
+    for name, period, totals in (('mood_daily', 'day', days), ('mood_weekly', 'week', weeks)):
+        table = sa.table(name, sa.column('user_id'), sa.column(period), sa.column('mood'),
+                         sa.column('mood_count'), sa.column('score_sum'), sa.column('score_count'))
+        op.execute(table.delete())
+        rows = [
+            {'user_id': user_id, period: key, 'mood': mood,
+             'mood_count': count, 'score_sum': score_sum, 'score_count': score_count}
+            for (user_id, key, mood), (count, score_sum, score_count) in totals.items()
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            op.bulk_insert(table, rows[start:start + BATCH_SIZE])
+
+
+def upgrade():
+    bind = op.get_bind()
+    archive = op.create_table(
+        ARCHIVE,
+        sa.Column('id', sa.Integer(), primary_key=True),  # the removed mood_logs id
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('mood', sa.String(length=50)),
+        sa.Column('timestamp', sa.DateTime()),
+        sa.Column('chat_log_id', sa.Integer(), nullable=False),  # the chat turn it copied
+    )
+    mood_logs = sa.table('mood_logs', sa.column('id'))
+    user_ids = [row[0] for row in bind.execute(sa.text("SELECT DISTINCT user_id FROM mood_logs"))]
+    removed = 0
+    for user_id in user_ids:
+        duplicates = _duplicates(bind, user_id)
+        for start in range(0, len(duplicates), DELETE_BATCH):
+            batch = dict(duplicates[start:start + DELETE_BATCH])
+            rows = bind.execute(
+                sa.text("SELECT id, user_id, mood, timestamp FROM mood_logs WHERE id IN :ids")
+                .bindparams(sa.bindparam('ids', expanding=True)), {'ids': list(batch)}
+            ).all()
+            op.bulk_insert(archive, [
+                {'id': row_id, 'user_id': owner, 'mood': mood, 'timestamp': _parse(timestamp),
+                 'chat_log_id': batch[row_id]}
+                for row_id, owner, mood, timestamp in rows
+            ])
+            op.execute(mood_logs.delete().where(mood_logs.c.id.in_(list(batch))))
+        removed += len(duplicates)
+    logger.info("Moved %d mood_logs rows copied from chat turns to %s", removed, ARCHIVE)
+    _rebuild_rollups(bind)
+
+
+def downgrade():
+    # Copy every chat mood back; the rollup counts already include them
+    op.execute(sa.text(
+        "INSERT INTO mood_logs (user_id, mood, timestamp) "
+        "SELECT user_id, mood, timestamp FROM chat_logs WHERE mood IS NOT NULL ORDER BY id"
+    ))
+    op.drop_table(ARCHIVE)
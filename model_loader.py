@@ -1,34 +1,15 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-import torch
+from config import Config
+from app.model_registry import load_chatbot, load_emotion_classifier, resolve_device
 
-# Global cache (in RAM)
-chatbot_tokenizer = None
-chatbot_model = None
-emotion_classifier = None
 
-def load_models():
-    global chatbot_tokenizer, chatbot_model, emotion_classifier
-
-    # Load fine-tuned DialoGPT model (chatbot)
-    if chatbot_model is None or chatbot_tokenizer is None:
-        print("[INFO] Loading fine-tuned DialoGPT model into RAM...")
-        model_path = r"C:\Users\Pasul\OneDrive\Documents\Desktop\mental_health_chatbot\chatbot_model_small"
-        chatbot_tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True, force_download=True)
-        chatbot_tokenizer.padding_side = "left"  # ✅ Prevents right-padding warning
-        chatbot_model = AutoModelForCausalLM.from_pretrained(model_path)
-        chatbot_model.eval()
-        print("[INFO] Fine-tuned DialoGPT model loaded.")
-
-    # Load emotion classifier (DistilRoBERTa)
-    if emotion_classifier is None:
-        print("[INFO] Loading emotion classifier into RAM...")
-        emotion_classifier = pipeline(
-            "text-classification",
-            model="j-hartmann/emotion-english-distilroberta-base",
-            return_all_scores=False,
-            top_k=1,
-            truncation=True
-        )
-        print("[INFO] Emotion classifier loaded.")
+def load_models(inference_mode="fp32"):
+    """Load both models once per process; ``inference_mode`` is one of fp32, int8 or bf16.
 
+    Kept for scripts. The web app goes through ``app.model_registry`` and
+    shares the same loaded copies.
+    """
+    chatbot_tokenizer, chatbot_model = load_chatbot(
+        Config.MODEL_PATH, inference_mode, resolve_device(inference_mode)
+    )
+    emotion_classifier = load_emotion_classifier(Config.EMOTION_MODEL, inference_mode)
     return chatbot_tokenizer, chatbot_model, emotion_classifier
@@ -44,6 +44,30 @@ def test_user(db):
     db.session.commit()
     return user
 
+@pytest.fixture(scope='session')
+def tiny_chatbot(tmp_path_factory):
+    """A tiny random GPT-2 + byte-level tokenizer standing in for DialoGPT (no downloads)."""
+    import json
+    import torch
+    from transformers import GPT2Config, GPT2LMHeadModel, GPT2TokenizerFast
+    from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+    model_dir = tmp_path_factory.mktemp("tiny_chatbot")
+    vocab = {char: idx for idx, char in enumerate(bytes_to_unicode().values())}
+    vocab["<|endoftext|>"] = len(vocab)
+    (model_dir / "vocab.json").write_text(json.dumps(vocab))
+    (model_dir / "merges.txt").write_text("#version: 0.2\n")
+    tokenizer = GPT2TokenizerFast(vocab_file=str(model_dir / "vocab.json"),
+                                  merges_file=str(model_dir / "merges.txt"))
+
+    torch.manual_seed(0)
+    eos_id = vocab["<|endoftext|>"]
+    model = GPT2LMHeadModel(GPT2Config(
+        vocab_size=len(vocab), n_positions=1024, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=eos_id, eos_token_id=eos_id
+    )).eval()
+    return model, tokenizer
+
 @pytest.fixture(scope='function')
 def login_user(client):
     def _login(email, password):
@@ -0,0 +1,101 @@
+import threading
+import time
+import pytest
+from app.batching import MicroBatcher, GenerationBatcher
+from app.generation import build_prompt, clean_response, FALLBACK_RESPONSE
+
+
+def _submit_concurrently(batcher, items):
+    results = [None] * len(items)
+
+    def worker(i, item):
+        results[i] = batcher.run(item, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i, item)) for i, item in enumerate(items)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+# ---------- MICRO-BATCHER ----------
+
+def test_concurrent_requests_share_a_batch():
+    seen = []
+
+    def process(batch):
+        seen.append(list(batch))
+        return [item * 2 for item in batch]
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=200)
+    results = _submit_concurrently(batcher, [1, 2, 3, 4])
+
+    assert results == [2, 4, 6, 8]
+    assert len(seen) == 1 and sorted(seen[0]) == [1, 2, 3, 4]
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["requests"] == 4
+    assert stats["mean_occupancy"] == 0.5
+    assert stats["batch_size_histogram"] == {4: 1}
+    batcher.shutdown()
+
+def test_batches_respect_max_batch_size():
+    sizes = []
+
+    def process(batch):
+        sizes.append(len(batch))
+        return batch
+
+    batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=200)
+    assert sorted(_submit_concurrently(batcher, list(range(5)))) == list(range(5))
+    assert max(sizes) <= 2
+    assert sum(sizes) == 5
+    batcher.shutdown()
+
+def test_lone_request_dispatched_after_max_wait():
+    batcher = MicroBatcher(lambda batch: batch, max_batch_size=8, max_wait_ms=20)
+    started = time.monotonic()
+    assert batcher.run("hello", timeout=5) == "hello"
+    assert time.monotonic() - started < 2
+    batcher.shutdown()
+
+def test_batch_errors_propagate_to_every_caller():
+    def process(batch):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=5)
+    with pytest.raises(ValueError):
+        batcher.run("x", timeout=5)
+    batcher.shutdown()
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda batch: batch, max_batch_size=0)
+
+# ---------- GENERATION ----------
+
+def test_generation_batcher_returns_one_continuation_per_prompt(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    batcher = GenerationBatcher(model, tokenizer, max_batch_size=4, max_wait_ms=100)
+    prompts = [
+        build_prompt(tokenizer, [], "hi"),
+        build_prompt(tokenizer, ["I can't sleep", "That sounds hard."], "it keeps happening"),
+    ]
+    results = _submit_concurrently(batcher, prompts)
+
+    assert len(results) == 2
+    assert all(isinstance(r, str) for r in results)
+    assert tokenizer.padding_side == "left"
+    assert batcher.stats()["requests"] == 2
+    batcher.shutdown()
+
+def test_build_prompt_alternates_speakers(tiny_chatbot):
+    _, tokenizer = tiny_chatbot
+    prompt = build_prompt(tokenizer, ["hello", "hi there"], "how are you")
+    eos = tokenizer.eos_token
+    assert prompt == f"User: hello {eos} Bot: hi there {eos} User: how are you {eos}"
+
+def test_clean_response():
+    assert clean_response("I feel I feel fine today", "x") == "I feel fine today"
+    assert clean_response("hello there my friend, welcome", "Hello there") == "my friend, welcome"
+    assert clean_response("ok", "hi") == FALLBACK_RESPONSE
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+from app import create_app, db
+from app.exports import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, decode_cursor, encode_cursor
+from app.models import User, ChatLog
+
+
+@pytest.fixture
+def app():
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username="historian", email="history@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    return client
+
+def _add_chats(user, count, timestamp=None):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        log = ChatLog(user_id=user.id, user_input=f"msg {i}", bot_response=f"reply {i}", mood="joy")
+        log.timestamp = timestamp or start + timedelta(minutes=i)
+        db.session.add(log)
+    db.session.commit()
+
+# ---------- JSON API ----------
+
+def test_pages_walk_the_whole_history_newest_first(client, user):
+    _add_chats(user, 25, timestamp=datetime(2024, 1, 1))  # ties resolved by id
+    _add_chats(user, 30)
+
+    seen, cursor = [], None
+    while True:
+        url = "/chat-history/data?limit=7" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        assert len(page["items"]) <= 7
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 55
+    assert len({item["id"] for item in seen}) == 55
+    logs = {log.id: log for log in ChatLog.query.all()}
+    keys = [(logs[item["id"]].timestamp, item["id"]) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+
+def test_page_size_is_limited(client, user):
+    _add_chats(user, HISTORY_MAX_PAGE_SIZE + 10)
+    assert len(client.get("/chat-history/data").get_json()["items"]) == HISTORY_PAGE_SIZE
+    assert len(client.get("/chat-history/data?limit=100000").get_json()["items"]) == HISTORY_MAX_PAGE_SIZE
+    assert len(client.get("/chat-history/data?limit=0").get_json()["items"]) == 1
+
+def test_only_the_users_rows_are_returned(client, user):
+    other = User(username="other", email="other@example.com", password="testpass123")
+    db.session.add(other)
+    db.session.commit()
+    _add_chats(other, 5)
+    _add_chats(user, 2)
+    page = client.get("/chat-history/data").get_json()
+    assert [item["user_input"] for item in page["items"]] == ["msg 1", "msg 0"]
+    assert page["next_cursor"] is None
+
+def test_bad_parameters_are_rejected(client):
+    assert client.get("/chat-history/data?cursor=not-a-cursor").status_code == 400
+    assert client.get("/chat-history/data?limit=ten").status_code == 400
+
+def test_cursor_round_trip():
+    position = (datetime(2024, 5, 6, 7, 8, 9, 123), 42)
+    assert decode_cursor(encode_cursor(*position)) == position
+
+# ---------- PAGE RENDER ----------
+
+def test_first_render_only_includes_the_newest_page(client, user):
+    _add_chats(user, HISTORY_PAGE_SIZE + 5)
+    response = client.get("/chat-history")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert f"msg {HISTORY_PAGE_SIZE + 4}<" in body
+    assert "msg 4<" not in body
+    assert 'data-next-cursor=""' not in body
+
+def test_empty_history_renders(client):
+    response = client.get("/chat-history")
+    assert response.status_code == 200
+    assert b"No chat history found." in response.data
@@ -141,12 +141,10 @@ def test_contact_therapist_exists(tmp_path, app, authenticated_client):
     test_json = tmp_path / "therapists.json"
     test_json.write_text(json.dumps([{"name": "Dr. Test", "email": "test@clinic.com"}]))
 
-    with patch("app.routes.chat.Path") as mock_path:
-        mock_path.return_value.exists.return_value = True
-        mock_path.return_value.open.return_value.__enter__.return_value = open(test_json)
-        response = authenticated_client.get("/contact_therapist")
-        assert response.status_code == 200
-        assert b"Dr. Test" in response.data
+    app.config["therapist_directory"].path = str(test_json)
+    response = authenticated_client.get("/contact_therapist")
+    assert response.status_code == 200
+    assert b"Dr. Test" in response.data
 
 def test_contact_therapist_missing(authenticated_client):
     response = authenticated_client.get("/contact_therapist")
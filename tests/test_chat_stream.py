@@ -0,0 +1,101 @@
+import json
+import pytest
+from app import create_app, db
+from app.models import User, ChatLog, MoodLog, MoodEntry
+from app.generation import stream_reply
+
+# ---------- Fixtures ----------
+
+@pytest.fixture
+def app(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'WTF_CSRF_ENABLED': False,
+        'SECRET_KEY': 'test-secret'
+    })
+    app.config.update(
+        chatbot_model=model,
+        chatbot_tokenizer=tokenizer,
+        emotion_classifier=lambda text: [{"label": "Joy", "score": 0.97}],
+        device="cpu",
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def authenticated_client(app):
+    client = app.test_client()
+    user = User(username="streamer", email="stream@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    client.user_id = user.id
+    return client
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+# ---------- STREAMING ----------
+
+def test_stream_reply_yields_fragments(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    fragments = list(stream_reply(model, tokenizer, f"User: hi {tokenizer.eos_token}"))
+    assert fragments
+    assert all(isinstance(f, str) and f for f in fragments)
+
+def test_chat_stream_sends_tokens_then_final_message(app, authenticated_client):
+    response = authenticated_client.post("/api/chat/stream", json={"message": "I'm feeling good today!"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    events = _parse_sse(response.get_data(as_text=True))
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "done"
+    assert "token" in kinds
+
+    final = events[-1][1]
+    assert final["mood"] == "joy"
+    assert final["emoji"] == "😊"
+    assert final["response"].endswith("Keep smiling and enjoy the moment!")
+
+    # Persisted once the stream completes
+    log = ChatLog.query.filter_by(user_id=authenticated_client.user_id).one()
+    assert log.bot_response == final["response"]
+    assert MoodEntry.query.filter_by(user_id=authenticated_client.user_id).one().mood == "joy"
+    assert MoodLog.query.count() == 0  # the mood is not stored twice
+
+    store = app.config["conversation_store"]
+    assert store.history(authenticated_client.user_id) == ["I'm feeling good today!", final["response"]]
+
+def test_chat_stream_rejects_empty_message(authenticated_client):
+    response = authenticated_client.post("/api/chat/stream", json={"message": "  "})
+    assert response.status_code == 400
+
+def test_chat_stream_reports_generation_errors(app, authenticated_client):
+    class BrokenModel:
+        def generate(self, **kwargs):
+            raise RuntimeError("out of memory")
+
+    app.config["chatbot_model"] = BrokenModel()
+    response = authenticated_client.post("/api/chat/stream", json={"message": "hello"})
+    events = _parse_sse(response.get_data(as_text=True))
+    assert events[-1][0] == "error"
+    assert ChatLog.query.count() == 0
+
+def test_chat_endpoint_uses_same_post_processing(app, authenticated_client):
+    response = authenticated_client.post("/api/chat", json={"message": "I'm feeling good today!"})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["mood"] == "joy"
+    assert data["response"].endswith("Keep smiling and enjoy the moment!")
@@ -0,0 +1,68 @@
+import pytest
+from app.conversation_store import ConversationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"), window=4, ttl_seconds=3600, compact_every=0)
+    yield store
+    store.close()
+
+def _count_rows(store):
+    return store._connection().execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+# ---------- WINDOW ----------
+
+def test_history_alternates_user_and_bot(store):
+    store.append(1, "hi", "hello")
+    store.append(1, "I can't sleep", "that sounds hard")
+    assert store.history(1) == ["hi", "hello", "I can't sleep", "that sounds hard"]
+    assert store.history(2) == []
+
+def test_window_is_bounded(store):
+    for i in range(5):
+        store.append(1, f"u{i}", f"b{i}")
+    assert store.history(1) == ["u3", "b3", "u4", "b4"]
+
+def test_clear_hides_earlier_turns(store):
+    store.append(1, "old", "turn")
+    store.history(1)  # cached
+    store.clear(1)
+    assert store.history(1) == []
+    store.append(1, "new", "turn")
+    assert store.history(1) == ["new", "turn"]
+
+def test_expired_turns_are_ignored(store):
+    store.append(1, "stale", "turn", now=1000.0)
+    store.append(1, "fresh", "turn", now=5000.0)
+    assert store.history(1, now=5000.0) == ["fresh", "turn"]
+
+# ---------- CACHE COHERENCE ----------
+
+def test_cached_window_sees_appends_from_another_process(store, tmp_path):
+    other = ConversationStore(store.path, window=4)
+    store.append(1, "a", "b")
+    assert store.history(1) == ["a", "b"]
+
+    other.append(1, "c", "d")  # e.g. a different gunicorn worker
+    assert store.history(1) == ["a", "b", "c", "d"]
+    assert store.stats()["cache_hits"] == 1
+
+    other.clear(1)
+    assert store.history(1) == []
+    other.close()
+
+# ---------- COMPACTION ----------
+
+def test_compact_drops_expired_reset_and_out_of_window_rows(store):
+    store.append(1, "expired", "turn", now=1000.0)
+    for i in range(4):
+        store.append(1, f"u{i}", f"b{i}", now=5000.0)
+    store.append(2, "gone", "turn", now=5000.0)
+    store.clear(2, now=5000.0)
+    store.compact(now=5000.0)
+
+    # two turns kept for user 1 (window=4 messages), only the reset marker for user 2
+    assert _count_rows(store) == 3
+    assert store.history(1, now=5000.0) == ["u2", "b2", "u3", "b3"]
+    assert store.history(2, now=5000.0) == []
@@ -0,0 +1,123 @@
+import os
+import threading
+
+import pytest
+from app import create_app, db
+from app.database import _forked_engines, engine_options, sqlite_pragmas
+from app.models import User, ChatLog
+
+
+def _file_app(tmp_path, **config):
+    return create_app(test_config=dict(
+        config, TESTING=True, SECRET_KEY="test-secret", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}"
+    ))
+
+def _pragma(name):
+    return db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+
+# ---------- PRAGMAS ----------
+
+def test_file_database_connections_are_tuned(tmp_path):
+    app = _file_app(tmp_path)
+    with app.app_context():
+        assert _pragma("journal_mode") == "wal"
+        assert _pragma("synchronous") == 1  # NORMAL
+        assert _pragma("busy_timeout") == 5000
+        assert _pragma("cache_size") == -65536
+        assert _pragma("mmap_size") == 256 * 1024 * 1024
+        db.engine.dispose()
+
+def test_empty_settings_leave_sqlite_defaults(tmp_path):
+    app = _file_app(tmp_path, SQLITE_JOURNAL_MODE="", SQLITE_SYNCHRONOUS="", SQLITE_MMAP_SIZE_MB=0)
+    with app.app_context():
+        assert _pragma("journal_mode") == "delete"
+        assert _pragma("synchronous") == 2  # FULL
+        assert _pragma("mmap_size") == 0
+        db.engine.dispose()
+
+def test_pragma_list_skips_disabled_entries():
+    pragmas = dict(sqlite_pragmas({"SQLITE_JOURNAL_MODE": "", "SQLITE_CACHE_SIZE_KIB": 0}))
+    assert "journal_mode" not in pragmas and "cache_size" not in pragmas
+    assert pragmas["synchronous"] == "NORMAL"
+
+# ---------- POOL ----------
+
+def test_pool_options_follow_the_config(tmp_path):
+    app = _file_app(tmp_path, DB_POOL_SIZE=3, DB_MAX_OVERFLOW=1)
+    with app.app_context():
+        assert db.engine.pool.size() == 3
+        assert db.engine.pool._max_overflow == 1
+        db.engine.dispose()
+
+def test_explicit_engine_options_win(tmp_path):
+    app = _file_app(tmp_path, SQLALCHEMY_ENGINE_OPTIONS={"pool_size": 2})
+    with app.app_context():
+        assert db.engine.pool.size() == 2
+        db.engine.dispose()
+
+def test_memory_database_keeps_its_single_connection():
+    assert engine_options({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"}) == {}
+    assert engine_options({"SQLALCHEMY_DATABASE_URI": "sqlite://"}) == {}
+    assert "pool_pre_ping" in engine_options({"SQLALCHEMY_DATABASE_URI": "postgresql://db/app"})
+
+# ---------- CONCURRENCY ----------
+
+def test_concurrent_writer_threads_do_not_lock_out(tmp_path):
+    app = _file_app(tmp_path)
+    with app.app_context():
+        user = User(username="writer", email="writer@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    errors = []
+
+    def write(thread_id):
+        with app.app_context():
+            try:
+                for turn in range(25):
+                    db.session.add(ChatLog(user_id=user_id, user_input=f"{thread_id}-{turn}",
+                                           bot_response="ok", mood="neutral"))
+                    db.session.commit()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        assert ChatLog.query.count() == 200
+        db.engine.dispose()
+
+# ---------- FORK ----------
+
+def test_app_factories_do_not_add_fork_hooks(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "register_at_fork", lambda **hooks: pytest.fail("hook registered per app"))
+    for i in range(2):
+        (tmp_path / str(i)).mkdir()
+    apps = [_file_app(tmp_path / str(i)) for i in range(2)]
+    for app in apps:
+        with app.app_context():
+            assert db.engine in _forked_engines
+            db.engine.dispose()
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_children_do_not_reuse_pooled_connections(tmp_path):
+    app = _file_app(tmp_path)
+    with app.app_context():
+        db.session.execute(db.text("SELECT 1"))
+        db.session.remove()
+        assert db.engine.pool.checkedin() == 1
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if db.engine.pool.checkedin() == 0 else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert db.engine.pool.checkedin() == 1  # the parent keeps its connection
+        db.engine.dispose()
@@ -0,0 +1,184 @@
+import os
+from datetime import datetime
+
+import pytest
+from app import create_app, db
+from app.export_jobs import ExportJobQueue, build_pdf, last_log_id
+from app.models import User, ChatLog, MoodLog
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret',
+        'EXPORT_DIR': str(tmp_path / "exports"),
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        app.config["export_jobs"].shutdown()
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username="exporter", email="export@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    return client
+
+def _add_chat(user, text="hello"):
+    db.session.add(ChatLog(user_id=user.id, user_input=text, bot_response="reply", mood="joy"))
+    db.session.commit()
+
+def _submit(client, kind="chat"):
+    response = client.post("/export/jobs", json={"kind": kind, "format": "pdf"})
+    assert response.status_code in (200, 202)
+    return response.get_json()
+
+def _wait(app, user, job_id):
+    return app.config["export_jobs"].wait(user.id, job_id, timeout=10)
+
+# ---------- JOB LIFECYCLE ----------
+
+def test_submit_renders_and_downloads(app, client, user):
+    _add_chat(user)
+    job = _submit(client)
+    assert job["job_id"].startswith("chat-pdf-")
+    assert _wait(app, user, job["job_id"])["state"] == "done"
+
+    status = client.get(job["status_url"]).get_json()
+    assert status["state"] == "done"
+    response = client.get(status["download_url"])
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert response.data.startswith(b"%PDF")
+
+def test_repeat_request_is_served_from_the_cached_artifact(app, client, user):
+    _add_chat(user)
+    first = _submit(client)
+    _wait(app, user, first["job_id"])
+    path = app.config["export_jobs"].artifact(user.id, first["job_id"])
+    mtime = os.path.getmtime(path)
+
+    response = client.post("/export/jobs", json={"kind": "chat"})
+    assert response.status_code == 200
+    assert response.get_json()["job_id"] == first["job_id"]
+    assert os.path.getmtime(path) == mtime
+
+def test_new_logs_produce_a_new_job_and_prune_the_old_artifact(app, client, user):
+    _add_chat(user)
+    first = _submit(client)
+    _wait(app, user, first["job_id"])
+    old_path = app.config["export_jobs"].artifact(user.id, first["job_id"])
+
+    _add_chat(user, "again")
+    second = _submit(client)
+    assert second["job_id"] != first["job_id"]
+    assert _wait(app, user, second["job_id"])["state"] == "done"
+    assert not os.path.exists(old_path)
+
+def test_unknown_and_foreign_jobs_are_not_found(app, client, user):
+    assert client.get("/export/jobs/chat-pdf-0123456789abcdef").status_code == 404
+    assert client.get("/export/jobs/../../etc/passwd").status_code == 404
+    assert client.get("/export/jobs/chat-pdf-0123456789abcdef/download").status_code == 404
+
+def test_rejects_unsupported_exports(client):
+    assert client.post("/export/jobs", json={"kind": "secrets"}).status_code == 400
+    assert client.post("/export/jobs", json={"kind": "chat", "format": "docx"}).status_code == 400
+
+def test_failed_render_is_reported(app, user, tmp_path):
+    jobs = ExportJobQueue(str(tmp_path / "failing"), "sqlite:////nonexistent/dir/db.sqlite", use_processes=False)
+    jobs._source = lambda: "sqlite:////nonexistent/dir/db.sqlite"
+    job = jobs.submit(user.id, "chat", 1)
+    status = jobs.wait(user.id, job["job_id"], timeout=10)
+    jobs.shutdown()
+    assert status["state"] == "failed"
+    assert status["error"]
+
+def test_last_log_id_tracks_newest_row(user):
+    assert last_log_id("mood", user.id) == (0, 0)
+    db.session.add(MoodLog(user_id=user.id, mood="calm"))
+    db.session.commit()
+    assert last_log_id("mood", user.id) == (0, MoodLog.query.one().id)
+    db.session.add(ChatLog(user_id=user.id, user_input="hi", bot_response="hello", mood="joy"))
+    db.session.commit()
+    assert last_log_id("mood", user.id) == (ChatLog.query.one().id, MoodLog.query.one().id)
+    assert last_log_id("chat", user.id) == ChatLog.query.one().id
+
+# ---------- SYNCHRONOUS ROUTES ----------
+
+def test_pdf_route_still_downloads_small_exports(client, user):
+    db.session.add(MoodLog(user_id=user.id, mood="happy"))
+    db.session.commit()
+    response = client.get("/export/mood/pdf")
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert "mood_logs.pdf" in response.headers["Content-Disposition"]
+
+def test_pdf_route_returns_a_job_when_rendering_is_slow(app, client, user):
+    app.config["EXPORT_SYNC_WAIT"] = 0
+    _add_chat(user)
+    response = client.get("/export/chat/pdf")
+    if response.status_code == 202:
+        assert response.get_json()["state"] == "pending"
+    else:
+        assert response.mimetype == "application/pdf"
+
+# ---------- RENDERING ----------
+
+def test_build_pdf_replaces_characters_outside_latin1():
+    pdf = build_pdf("chat", [(datetime(2024, 1, 1), "I feel 😊", "Glad to hear — really", "joy")])
+    assert pdf.output(dest='S').startswith("%PDF")
+
+def test_process_pool_renders_from_a_database_file(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'jobs.db'}"
+    app = create_app(test_config={'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri, 'SECRET_KEY': 'x',
+                                  'EXPORT_DIR': str(tmp_path / "exports")})
+    jobs = app.config["export_jobs"]
+    assert jobs.use_processes
+    with app.app_context():
+        db.create_all()
+        user = User(username="proc", email="proc@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+        _add_chat(user)
+        job = jobs.submit(user.id, "chat", last_log_id("chat", user.id))
+        try:
+            assert jobs.wait(user.id, job["job_id"], timeout=60)["state"] == "done"
+        finally:
+            jobs.shutdown()
+            db.session.remove()
+            db.engine.dispose()
+
+def test_process_pool_resolves_a_relative_database_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # workers must not resolve the file against their CWD
+    name = f"export_jobs_{os.getpid()}.db"
+    app = create_app(test_config={'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{name}",
+                                  'SECRET_KEY': 'x', 'EXPORT_DIR': str(tmp_path / "exports")})
+    jobs = app.config["export_jobs"]
+    assert jobs.use_processes
+    assert jobs.database == f"sqlite:///{os.path.join(app.instance_path, name)}"
+    with app.app_context():
+        try:
+            db.create_all()
+            user = User(username="relative", email="relative@example.com", password="testpass123")
+            db.session.add(user)
+            db.session.commit()
+            _add_chat(user)
+            job = jobs.submit(user.id, "chat", last_log_id("chat", user.id))
+            assert jobs.wait(user.id, job["job_id"], timeout=60)["state"] == "done"
+        finally:
+            jobs.shutdown()
+            db.session.remove()
+            db.engine.dispose()
+            os.remove(os.path.join(app.instance_path, name))
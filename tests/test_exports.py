@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from app import create_app, db
+from app.exports import csv_chunks, iter_user_rows, json_array_chunks
+from app.models import User, ChatLog, MoodLog
+
+
+@pytest.fixture
+def app():
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username="exporter", email="export@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    return client
+
+def _add_chats(user, count, timestamp=None):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        log = ChatLog(user_id=user.id, user_input=f"msg {i}", bot_response=f"reply {i}", mood="joy")
+        log.timestamp = timestamp or start + timedelta(minutes=i)
+        db.session.add(log)
+    db.session.commit()
+
+# ---------- KEYSET PAGINATION ----------
+
+def test_keyset_pages_cover_every_row_once(user):
+    # identical timestamps force the id tie-breaker across page boundaries
+    _add_chats(user, 7, timestamp=datetime(2024, 1, 1))
+    _add_chats(user, 5)
+    rows = list(iter_user_rows(ChatLog, user.id, (ChatLog.user_input,), page_size=3))
+    assert len(rows) == 12
+    assert len({row.id for row in rows}) == 12
+    assert [(r.timestamp, r.id) for r in rows] == sorted((r.timestamp, r.id) for r in rows)
+
+def test_keyset_only_reads_the_users_rows(user):
+    other = User(username="other", email="other@example.com", password="testpass123")
+    db.session.add(other)
+    db.session.commit()
+    _add_chats(user, 3)
+    _add_chats(other, 4)
+    assert len(list(iter_user_rows(ChatLog, user.id, (), page_size=2))) == 3
+
+# ---------- ENCODERS ----------
+
+def test_csv_chunks_quote_fields():
+    body = "".join(csv_chunks(["a", "b"], [["x,y", 'say "hi"']]))
+    assert list(csv.reader(io.StringIO(body))) == [["a", "b"], ["x,y", 'say "hi"']]
+
+def test_json_array_chunks_handle_empty_and_many():
+    assert json.loads("".join(json_array_chunks(iter(())))) == []
+    records = [{"n": i} for i in range(1200)]
+    assert json.loads("".join(json_array_chunks(iter(records)))) == records
+
+# ---------- ROUTES ----------
+
+def test_chat_csv_is_streamed(client, user):
+    _add_chats(user, 3)
+    response = client.get("/export/chat/csv")
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ["Timestamp", "User Message", "Bot Response"]
+    assert rows[1] == ["2024-01-01 00:00", "msg 0", "reply 0"]
+    assert len(rows) == 4
+
+def test_chat_json_and_ndjson(client, user):
+    _add_chats(user, 2)
+    data = client.get("/export/chat/json").get_json()
+    assert [row["user_message"] for row in data] == ["msg 0", "msg 1"]
+
+    response = client.get("/export/chat/ndjson")
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["bot_response"] for line in lines] == ["reply 0", "reply 1"]
+
+def test_mood_exports(client, user):
+    db.session.add_all([MoodLog(user_id=user.id, mood="joy"), MoodLog(user_id=user.id, mood="fear")])
+    db.session.commit()
+    assert [row["mood"] for row in client.get("/export/mood/json").get_json()] == ["joy", "fear"]
+    rows = list(csv.reader(io.StringIO(client.get("/export/mood/csv").get_data(as_text=True))))
+    assert [row[1] for row in rows] == ["Mood", "joy", "fear"]
+
+def test_json_export_streams_the_chat_logs(client, user):
+    _add_chats(user, 2)
+    db.session.add(MoodLog(user_id=user.id, mood="joy"))
+    db.session.commit()
+    response = client.get("/export/json")
+    assert response.is_streamed
+    assert response.get_json() == [log.to_dict() for log in ChatLog.query.order_by(ChatLog.timestamp, ChatLog.id)]
@@ -0,0 +1,115 @@
+import torch
+from app import create_app, db
+from app.models import User
+from app.generation import build_prompt, generate_reply_cached
+from app.kv_cache import ConversationKVCache, common_prefix_length, cache_length, crop_cache
+
+
+def _encode(tokenizer, text):
+    return tokenizer(text, return_tensors="pt")["input_ids"]
+
+# ---------- HELPERS ----------
+
+def test_common_prefix_length():
+    assert common_prefix_length([1, 2, 3], [1, 2, 4]) == 2
+    assert common_prefix_length([1, 2], [1, 2, 3]) == 2
+    assert common_prefix_length([], [1]) == 0
+
+def test_cropped_cache_matches_full_reencode(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    prefix = _encode(tokenizer, "User: I can't sleep <|endoftext|> Bot: ")
+    full = _encode(tokenizer, "User: I can't sleep <|endoftext|> Bot: that sounds hard")
+
+    with torch.no_grad():
+        past = model(prefix, use_cache=True).past_key_values
+        past = crop_cache(past, prefix.shape[1] - 2)
+        assert cache_length(past) == prefix.shape[1] - 2
+        reused = model(full[:, prefix.shape[1] - 2:], past_key_values=past).logits[0, -1]
+        reference = model(full).logits[0, -1]
+
+    assert torch.allclose(reused, reference, atol=1e-4)
+
+# ---------- STORE ----------
+
+def test_second_turn_reuses_prefix(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    kv_cache = ConversationKVCache(min_reuse_tokens=4)
+
+    first = build_prompt(tokenizer, [], "I can't sleep")
+    reply = generate_reply_cached(model, tokenizer, first, kv_cache, key=1)
+    assert kv_cache.stats()["misses"] == 1
+    assert len(kv_cache) == 1
+
+    second = build_prompt(tokenizer, ["I can't sleep", reply], "it keeps happening")
+    generate_reply_cached(model, tokenizer, second, kv_cache, key=1)
+    stats = kv_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["reused_tokens"] >= len(_encode(tokenizer, first)[0]) - 1
+
+def test_sliding_window_falls_back_to_full_reencode(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    kv_cache = ConversationKVCache(min_reuse_tokens=8)
+    generate_reply_cached(model, tokenizer, build_prompt(tokenizer, ["a", "b"], "first"), kv_cache, key=1)
+    generate_reply_cached(model, tokenizer, build_prompt(tokenizer, ["zzz", "yyy"], "second"), kv_cache, key=1)
+    stats = kv_cache.stats()
+    assert stats["hits"] == 0
+    assert stats["misses"] == 2
+
+def test_lru_eviction_by_memory_budget(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    with torch.no_grad():
+        past = model(_encode(tokenizer, "User: hello there"), use_cache=True).past_key_values
+    ids = _encode(tokenizer, "User: hello there")[0].tolist()
+
+    probe = ConversationKVCache()
+    probe.put("probe", ids, past)
+    entry_bytes = probe.stats()["bytes"]
+
+    kv_cache = ConversationKVCache(max_bytes=entry_bytes * 2)
+    kv_cache.put("a", ids, past)
+    kv_cache.put("b", ids, past)
+    kv_cache.take("a", ids)  # touch + remove "a"
+    kv_cache.put("a", ids, past)
+    kv_cache.put("c", ids, past)  # evicts "b", the least recently used
+
+    assert kv_cache.take("b", ids) is None
+    assert kv_cache.stats()["evictions"] == 1
+    assert kv_cache.stats()["bytes"] <= entry_bytes * 2
+
+def test_oversized_entries_are_not_stored(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    ids = _encode(tokenizer, "User: hello there")
+    with torch.no_grad():
+        past = model(ids, use_cache=True).past_key_values
+    kv_cache = ConversationKVCache(max_bytes=16)
+    kv_cache.put(1, ids[0].tolist(), past)
+    assert len(kv_cache) == 0
+
+# ---------- RESET ----------
+
+def test_reset_chat_invalidates_conversation_cache(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    kv_cache = ConversationKVCache()
+    app.config["kv_cache"] = kv_cache
+    with app.app_context():
+        db.create_all()
+        user = User(username="kvuser", email="kv@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+
+        ids = _encode(tokenizer, "User: hello there")
+        with torch.no_grad():
+            kv_cache.put(user.id, ids[0].tolist(), model(ids, use_cache=True).past_key_values)
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user.id)
+            sess["_fresh"] = True
+        assert client.post("/reset_chat").status_code == 200
+        assert len(kv_cache) == 0
+        db.drop_all()
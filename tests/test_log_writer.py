@@ -0,0 +1,212 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from app import create_app, db
+from app.log_writer import LogWriter
+from app.models import User, ChatLog, MoodLog, MoodEntry, MoodDaily
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret',
+        'LOG_WRITE_BEHIND': True,
+        'LOG_SPOOL_DIR': str(tmp_path / "spool"),
+        'LOG_FLUSH_INTERVAL_MS': 60_000,  # tests flush explicitly unless they lower it
+        'LOG_READ_WAIT_S': 0.2,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        app.config["log_writer"].close()
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def writer(app):
+    return app.config["log_writer"]
+
+@pytest.fixture
+def user(app):
+    user = User(username="buffered", email="buffer@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    return client
+
+def _spooled(writer):
+    return [name for name in os.listdir(writer.spool_dir) if ".jsonl" in name]
+
+# ---------- BUFFERING ----------
+
+def test_disabled_by_default():
+    app = create_app(test_config={'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    assert app.config["log_writer"] is None
+
+def test_turns_are_spooled_then_committed_in_one_batch(writer, user):
+    for i in range(3):
+        writer.record(user.id, f"msg {i}", f"reply {i}", "joy", 0.5)
+    assert ChatLog.query.count() == 0
+    assert len(_spooled(writer)) == 1
+
+    assert writer.flush() == 3
+    assert [log.user_input for log in ChatLog.query.order_by(ChatLog.id)] == ["msg 0", "msg 1", "msg 2"]
+    assert MoodEntry.query.count() == 3 and MoodLog.query.count() == 0
+    assert MoodDaily.query.one().mood_count == 3  # rollups still maintained
+    assert _spooled(writer) == []
+    assert writer.stats()["flushes"] == 1
+
+def test_flushes_when_the_batch_is_full(app, writer, user):
+    writer.max_records = 5
+    for i in range(5):
+        writer.record(user.id, f"msg {i}", "reply", "joy")
+    deadline = time.monotonic() + 5
+    while writer.stats()["flushed_records"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert ChatLog.query.count() == 5
+
+def test_flushes_on_the_interval(app, writer, user):
+    writer.flush_interval = 0.02
+    writer.record(user.id, "hello", "hi", "joy")
+    deadline = time.monotonic() + 5
+    while writer.stats()["flushed_records"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert ChatLog.query.count() == 1
+
+def test_close_flushes_and_removes_the_spool(writer, user):
+    writer.record(user.id, "bye", "see you", "neutral")
+    writer.close()
+    assert ChatLog.query.count() == 1
+    assert _spooled(writer) == []
+
+def test_failed_flush_keeps_turns_for_the_next_attempt(writer, user, monkeypatch):
+    writer.record(user.id, "retry me", "ok", "joy")
+    original = writer._insert
+    monkeypatch.setattr(writer, "_insert", lambda records, dedupe=False: 1 / 0)
+    assert writer.flush() == 0
+    assert writer.stats()["pending"] == 1
+    assert _spooled(writer)
+
+    monkeypatch.setattr(writer, "_insert", original)
+    assert writer.flush() == 1
+    assert ChatLog.query.one().user_input == "retry me"
+    assert _spooled(writer) == []
+
+def test_does_not_fsync_by_default(writer, user, monkeypatch):
+    calls = []
+    monkeypatch.setattr(os, "fsync", calls.append)
+    writer.record(user.id, "fast", "ok", "joy")
+    assert calls == []
+
+def test_concurrent_turns_share_one_fsync(app, user, monkeypatch):
+    writer = LogWriter(app, app.config["LOG_SPOOL_DIR"], flush_interval_ms=60_000, fsync=True)
+    writer.record(user.id, "first", "ok", "joy")  # registers the owner and opens the segment
+    calls, release = [], threading.Event()
+    fsync = os.fsync
+
+    def slow_fsync(fd):
+        calls.append(fd)
+        release.wait(5)
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", slow_fsync)
+    threads = [threading.Thread(target=writer.record, args=(user.id, f"msg {i}", "ok", "joy")) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while writer.stats()["records"] < 9 and time.monotonic() < deadline:
+        time.sleep(0.01)  # every thread appended while the first fsync is still running
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert 1 <= len(calls) <= 2
+    writer.close()
+    assert ChatLog.query.count() == 9
+
+# ---------- READ-YOUR-WRITES ----------
+
+def test_views_see_the_users_buffered_turns(writer, client, user):
+    writer.record(user.id, "just said this", "and I replied", "joy")
+    items = client.get("/chat-history/data").get_json()["items"]
+    assert [item["user_input"] for item in items] == ["just said this"]
+
+def test_waits_for_another_workers_pending_marker(app, writer, user):
+    other = LogWriter(app, writer.spool_dir)  # another live owner (holds its owner lock)
+    other.record(user.id, "elsewhere", "ok", "joy")
+    started = time.monotonic()
+    assert writer.wait_visible(user.id, timeout=0.1) is False
+    assert time.monotonic() - started >= 0.1
+
+    other.close()
+    assert writer.wait_visible(user.id, timeout=0.1) is True
+
+def test_markers_of_dead_workers_are_ignored(writer, user):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    pending = os.path.join(writer.spool_dir, "pending")
+    os.makedirs(pending, exist_ok=True)
+    open(os.path.join(pending, f"{user.id}.{dead}"), "a").close()
+    assert writer.wait_visible(user.id, timeout=0.1) is True
+
+# ---------- CRASH RECOVERY ----------
+
+def test_recovers_segments_of_a_crashed_worker(app, user, tmp_path):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    spool = tmp_path / "spool"
+    spool.mkdir(exist_ok=True)
+    records = [
+        {"user_id": user.id, "user_input": f"lost {i}", "bot_response": "r", "mood": "sadness",
+         "mood_score": -1.0, "timestamp": f"2024-01-01T10:00:0{i}"}
+        for i in range(3)
+    ]
+    # The first turn was committed before the crash; the last line is torn
+    committed = ChatLog(user_id=user.id, user_input="lost 0", bot_response="r", mood="sadness")
+    committed.timestamp = datetime.fromisoformat(records[0]["timestamp"])
+    db.session.add(committed)
+    db.session.commit()
+    (spool / f"{dead}-1.jsonl").write_text("".join(json.dumps(r) + "\n" for r in records) + '{"user_id": 1, "us')
+
+    writer = LogWriter(app, str(spool))
+    os.makedirs(spool / "pending", exist_ok=True)
+    assert writer.recover() == 2
+    assert sorted(log.user_input for log in ChatLog.query) == ["lost 0", "lost 1", "lost 2"]
+    assert not any(".jsonl" in name for name in os.listdir(spool))
+
+def test_reused_pid_does_not_hide_a_dead_owner(app, writer, user):
+    # A crashed worker whose pid now belongs to a live process (here, this one)
+    owner = f"{os.getpid()}_0123456789ab"
+    record = {"user_id": user.id, "user_input": "before the restart", "bot_response": "r", "mood": "joy",
+              "mood_score": 1.0, "timestamp": "2024-01-01T10:00:00"}
+    os.makedirs(os.path.join(writer.spool_dir, "pending"), exist_ok=True)
+    with open(os.path.join(writer.spool_dir, f"{owner}-1.jsonl"), "w") as f:
+        f.write(json.dumps(record) + "\n")
+    open(os.path.join(writer.spool_dir, "pending", f"{user.id}.{owner}"), "a").close()
+
+    assert writer.wait_visible(user.id, timeout=0.1) is True
+    assert writer.recover() == 1
+    assert [log.user_input for log in ChatLog.query] == ["before the restart"]
+    assert os.listdir(os.path.join(writer.spool_dir, "pending")) == []
+
+def test_live_workers_segments_are_left_alone(app, writer, user):
+    writer.record(user.id, "mine", "ok", "joy")
+    # Segments of a running process (here, this one) are never replayed from under it
+    assert LogWriter(app, writer.spool_dir).recover() == 0
+    assert ChatLog.query.count() == 0
+    assert _spooled(writer)
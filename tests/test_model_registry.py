@@ -0,0 +1,129 @@
+import threading
+import time
+import types
+
+import pytest
+from app import create_app, db
+from app.models import User
+from app.model_registry import ModelRegistry, get_model, load_once
+
+# ---------- REGISTRY ----------
+
+def test_concurrent_gets_load_once():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    registry = ModelRegistry()
+    registry.register("model", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_factory_can_provide_several_names():
+    registry = ModelRegistry()
+    registry.register(("tokenizer", "model"), lambda: ("tok", "mdl"))
+    assert registry.peek("model") is None
+    assert registry.get("model") == "mdl"
+    assert registry.peek("tokenizer") == "tok"
+    assert registry.ready
+
+def test_failed_load_is_reported_and_retried():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("weights missing")
+        return "ok"
+
+    registry = ModelRegistry()
+    registry.register("model", flaky)
+    with pytest.raises(OSError):
+        registry.warm()
+    assert registry.status()["model"]["state"] == "failed"
+    assert "weights missing" in registry.status()["model"]["error"]
+    assert not registry.ready
+
+    assert registry.get("model") == "ok"
+    assert registry.status()["model"]["state"] == "ready"
+
+def test_load_once_is_shared_per_key():
+    calls = []
+    key = ("test_load_once", object())
+    first = load_once(key, lambda: calls.append(1) or "weights")
+    second = load_once(key, lambda: calls.append(1) or "other")
+    assert first == second == "weights"
+    assert len(calls) == 1
+
+# ---------- APP INTEGRATION ----------
+
+@pytest.fixture
+def registry_app(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    registry = ModelRegistry()
+    registry.register("device", lambda: "cpu")
+    registry.register(("chatbot_tokenizer", "chatbot_model"), lambda: (tokenizer, model))
+    registry.register("emotion_classifier", lambda: (lambda text: [{"label": "Joy", "score": 0.9}]))
+    registry.register("mood_classifier", lambda: None)
+    app.config["model_registry"] = registry
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+def test_readiness_probe_reports_warm_models(registry_app):
+    client = registry_app.test_client()
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["models"]["chatbot_model"]["state"] == "cold"
+
+    registry_app.config["model_registry"].warm()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.get_json()["ready"] is True
+
+def test_chat_loads_models_on_first_use(registry_app):
+    user = User(username="lazy", email="lazy@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    client = registry_app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+    response = client.post("/api/chat", json={"message": "hello there"})
+    assert response.status_code == 200
+    assert response.get_json()["mood"] == "joy"
+    assert registry_app.config["model_registry"].peek("chatbot_model") is not None
+
+def test_config_entries_take_precedence(registry_app):
+    registry_app.config["device"] = "meta"
+    with registry_app.test_request_context():
+        assert get_model("device") == "meta"
+        assert get_model("missing") is None
+
+def test_chatbot_module_uses_the_registry(registry_app, tiny_chatbot):
+    from app import chatbot
+
+    model, tokenizer = tiny_chatbot
+    registry_app.config["mood_classifier"] = types.SimpleNamespace(
+        classify=lambda text: types.SimpleNamespace(label="joy"))
+    with registry_app.test_request_context():
+        assert chatbot.chatbot_model is model and chatbot.chatbot_tokenizer is tokenizer
+        assert chatbot.detect_mood("what a day") == "joy"
+    assert registry_app.config["model_registry"].peek("chatbot_model") is model
@@ -0,0 +1,160 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+import torch
+from app import create_app, db
+from app.models import User, ChatLog
+from app.mood import MoodClassifier, MoodResult, normalize_text
+
+LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+
+
+class FakeTokenizer:
+    def __call__(self, texts, **kwargs):
+        return {"texts": list(texts)}
+
+
+class FakeEmotionModel:
+    """Puts all probability mass on "sadness" for sad texts, "joy" otherwise."""
+
+    def __init__(self):
+        self.config = SimpleNamespace(id2label={i: label.title() for i, label in enumerate(LABELS)})
+        self.batch_sizes = []
+        self.seen = []
+
+    def __call__(self, texts):
+        self.batch_sizes.append(len(texts))
+        self.seen.extend(texts)
+        logits = torch.full((len(texts), len(LABELS)), -10.0)
+        for row, text in enumerate(texts):
+            logits[row, LABELS.index("sadness" if "sad" in text else "joy")] = 10.0
+        return SimpleNamespace(logits=logits)
+
+
+@pytest.fixture
+def classifier():
+    classifier = MoodClassifier(FakeEmotionModel(), FakeTokenizer(), max_batch_size=8, max_wait_ms=100)
+    yield classifier
+    classifier.shutdown()
+
+# ---------- CLASSIFIER ----------
+
+def test_returns_full_probability_vector(classifier):
+    result = classifier.classify("I feel sad")
+    assert result.label == "sadness"
+    assert set(result.probabilities) == set(LABELS)
+    assert sum(result.probabilities.values()) == pytest.approx(1.0)
+    assert result.mood_score == pytest.approx(-1.0, abs=1e-3)
+
+def test_pipeline_compatible_call(classifier):
+    assert classifier("what a lovely day")[0]["label"] == "joy"
+
+def test_repeated_normalized_inputs_skip_inference(classifier):
+    classifier.classify("i feel sad")
+    classifier.classify("  I   FEEL sad ")
+    assert classifier.model.batch_sizes == [1]
+    stats = classifier.stats()
+    assert stats["cache_hits"] == 1
+    assert stats["cache_misses"] == 1
+
+def test_model_sees_the_raw_input(classifier):
+    classifier.classify("  I'M SO   Sad ")
+    assert classifier.model.seen == ["  I'M SO   Sad "]
+
+def test_concurrent_misses_share_a_forward_pass(classifier):
+    texts = ["sad one", "happy two", "sad three", "happy four"]
+    threads = [threading.Thread(target=classifier.classify, args=(t,)) for t in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert classifier.model.batch_sizes == [4]
+
+def test_cache_is_bounded():
+    classifier = MoodClassifier(FakeEmotionModel(), FakeTokenizer(), max_wait_ms=1, cache_size=2)
+    for text in ["a", "b", "c"]:
+        classifier.classify(text)
+    classifier.classify("a")
+    assert classifier.stats()["cache_entries"] == 2
+    assert classifier.model.batch_sizes == [1, 1, 1, 1]
+    classifier.shutdown()
+
+def test_normalize_text():
+    assert normalize_text("  I Feel\tSAD ") == "i feel sad"
+
+def test_mood_score_is_valence_weighted():
+    result = MoodResult({"joy": 0.5, "sadness": 0.5})
+    assert result.mood_score == pytest.approx(0.0)
+    assert result.to_dict()["probabilities"] == {"joy": 0.5, "sadness": 0.5}
+
+# ---------- CHAT INTEGRATION ----------
+
+class RecordingBatcher:
+    """Stands in for the generation batcher; optionally slow, records prompts."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.prompts = []
+
+    def run(self, prompt):
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        return "I hear you, tell me more about it."
+
+
+@pytest.fixture
+def chat_app(tiny_chatbot, classifier):
+    model, tokenizer = tiny_chatbot
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    app.config.update(chatbot_model=model, chatbot_tokenizer=tokenizer, device="cpu",
+                      emotion_classifier=classifier, mood_classifier=classifier)
+    with app.app_context():
+        db.create_all()
+        user = User(username="mooduser", email="mood@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user.id)
+            sess["_fresh"] = True
+        app.test_client_logged_in = client
+        yield app
+        db.drop_all()
+
+def test_chat_persists_mood_score(chat_app):
+    data = chat_app.test_client_logged_in.post("/api/chat", json={"message": "I feel sad"}).get_json()
+    assert data["mood"] == "sadness"
+    assert ChatLog.query.one().mood_score == pytest.approx(-1.0, abs=1e-3)
+
+def test_mood_detection_overlaps_generation(chat_app, classifier):
+    original_forward = classifier.process_batch
+
+    def slow_forward(texts):
+        time.sleep(0.4)
+        return original_forward(texts)
+
+    classifier.process_batch = slow_forward
+    chat_app.config["generation_batcher"] = RecordingBatcher(delay=0.4)
+
+    started = time.perf_counter()
+    data = chat_app.test_client_logged_in.post("/api/chat", json={"message": "I feel sad"}).get_json()
+    elapsed = time.perf_counter() - started
+
+    assert data["mood"] == "sadness"
+    assert elapsed < 0.75  # sequential would take at least 0.8s
+
+def test_cached_mood_conditions_prompt(chat_app, classifier):
+    batcher = RecordingBatcher()
+    chat_app.config.update(generation_batcher=batcher, CHAT_MOOD_CONDITIONING=True)
+    client = chat_app.test_client_logged_in
+
+    client.post("/api/chat", json={"message": "I feel sad"})
+    assert "[sadness]" not in batcher.prompts[-1]  # not known yet, never waited for
+
+    client.post("/api/chat", json={"message": "i feel  SAD"})
+    assert "User: [sadness] i feel  SAD" in batcher.prompts[-1]
@@ -0,0 +1,136 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from app import create_app, db
+from app.exports import mood_rows
+from app.export_jobs import last_log_id
+from app.models import User, ChatLog, MoodLog, MoodEntry
+
+
+@pytest.fixture
+def app():
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username="moody", email="moody@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def _chat(user, mood, timestamp):
+    log = ChatLog(user_id=user.id, user_input="hi", bot_response="hello", mood=mood, mood_score=0.5)
+    log.timestamp = timestamp
+    db.session.add(log)
+    return log
+
+def _manual(user, mood, timestamp):
+    log = MoodLog(user_id=user.id, mood=mood)
+    log.timestamp = timestamp
+    db.session.add(log)
+    return log
+
+# ---------- VIEW ----------
+
+def test_entries_merge_chat_turns_and_manual_moods(user):
+    start = datetime(2024, 1, 1)
+    _chat(user, "joy", start)
+    _manual(user, "tired", start + timedelta(hours=1))
+    _chat(user, None, start + timedelta(hours=2))  # no mood detected: not an entry
+    _chat(user, "sadness", start + timedelta(hours=3))
+    db.session.commit()
+
+    assert [(entry.mood, entry.source) for entry in user.get_recent_moods()] == [
+        ("sadness", "chat"), ("tired", "manual"), ("joy", "chat"),
+    ]
+    assert user.get_recent_moods()[0].to_dict() == {"timestamp": "2024-01-01T03:00:00", "mood": "sadness"}
+    assert dict(user.get_mood_counts()) == {"joy": 1, "tired": 1, "sadness": 1}
+
+def test_entry_ids_are_unique_across_sources(user):
+    chat = _chat(user, "joy", datetime(2024, 1, 1))
+    manual = _manual(user, "joy", datetime(2024, 1, 1))
+    db.session.commit()
+    assert chat.id == manual.id
+    entries = MoodEntry.query.order_by(MoodEntry.id).all()
+    assert len({entry.id for entry in entries}) == 2
+    assert [(entry.source, entry.source_id) for entry in entries] == [("chat", chat.id), ("manual", manual.id)]
+
+def test_pinned_exports_ignore_later_rows(user):
+    _chat(user, "joy", datetime(2024, 1, 1))
+    _manual(user, "calm", datetime(2024, 1, 2))
+    db.session.commit()
+    pin = last_log_id("mood", user.id)
+
+    _chat(user, "fear", datetime(2024, 1, 3))
+    _manual(user, "tired", datetime(2024, 1, 4))
+    db.session.commit()
+    assert [mood for _, mood in mood_rows(user.id, until_id=pin)] == ["joy", "calm"]
+    assert [mood for _, mood in mood_rows(user.id, page_size=1)] == ["joy", "calm", "fear", "tired"]
+
+# ---------- MIGRATION ----------
+
+def test_migration_drops_copied_chat_moods(tmp_path):
+    from flask_migrate import Migrate, downgrade, upgrade
+
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT, password_hash TEXT);
+        CREATE TABLE chat_logs (id INTEGER PRIMARY KEY, user_id INTEGER, user_input TEXT, bot_response TEXT,
+                                mood TEXT, mood_score FLOAT, timestamp DATETIME);
+        CREATE TABLE mood_logs (id INTEGER PRIMARY KEY, user_id INTEGER, mood TEXT, timestamp DATETIME);
+        CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY);
+        INSERT INTO alembic_version VALUES ('566b79e3eccb');
+        INSERT INTO users VALUES (1, 'a', 'a@example.com', 'x');
+        INSERT INTO chat_logs (user_id, user_input, bot_response, mood, mood_score, timestamp) VALUES
+            (1, 'x', 'y', 'happy', 0.5, '2024-01-01 10:00:00.000000'),
+            (1, 'x', 'y', 'happy', 0.5, '2024-01-01 10:00:01.000000'),
+            (1, 'x', 'y', 'sad', -0.5, '2024-01-02 09:00:00.000000'),
+            (1, 'x', 'y', 'calm', 0.1, '2024-01-03 12:00:00.000000');
+        INSERT INTO mood_logs (user_id, mood, timestamp) VALUES
+            (1, 'happy', '2024-01-01 10:00:00.000120'),
+            (1, 'happy', '2024-01-01 10:00:01.000090'),
+            (1, 'happy', '2024-01-01 18:00:00.000000'),
+            (1, 'sad', '2024-01-02 09:00:00.000200'),
+            (1, 'sad', '2024-01-02 09:00:01.000000'),
+            (1, 'calm', '2024-01-03 12:00:01.500000');
+    """)
+    conn.commit()
+
+    legacy = Flask("legacy")
+    legacy.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(legacy)
+    Migrate(legacy, db)
+    with legacy.app_context():
+        upgrade(directory="migrations", revision="e6c3f9a2b184")
+        db.engine.dispose()
+
+    # One copy per chat turn goes; the evening entry, the second 'sad' and the 'calm'
+    # entry a second after an uncopied chat turn were logged by hand
+    assert conn.execute("SELECT mood, timestamp FROM mood_logs ORDER BY id").fetchall() == [
+        ("happy", "2024-01-01 18:00:00.000000"), ("sad", "2024-01-02 09:00:01.000000"),
+        ("calm", "2024-01-03 12:00:01.500000"),
+    ]
+    assert conn.execute("SELECT id, mood, chat_log_id FROM mood_logs_dedupe_archive ORDER BY id").fetchall() == [
+        (1, "happy", 1), (2, "happy", 2), (4, "sad", 3),
+    ]
+    assert conn.execute("SELECT day, mood, mood_count, score_count FROM mood_daily ORDER BY day, mood").fetchall() == [
+        ("2024-01-01", "happy", 3, 2), ("2024-01-02", "sad", 2, 1), ("2024-01-03", "calm", 2, 1),
+    ]
+
+    with legacy.app_context():
+        downgrade(directory="migrations", revision="d41e8a6f2c07")
+        db.engine.dispose()
+    assert conn.execute("SELECT count(*) FROM mood_logs").fetchone() == (7,)
+    assert not conn.execute("SELECT name FROM sqlite_master WHERE name = 'mood_logs_dedupe_archive'").fetchall()
+    conn.close()
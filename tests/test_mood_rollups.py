@@ -0,0 +1,212 @@
+import sqlite3
+from datetime import datetime, date, timedelta
+
+import pytest
+from flask import Flask
+from app import create_app, db
+from app.models import User, ChatLog, MoodLog, MoodDaily, MoodWeekly, reconcile_rollups
+
+
+@pytest.fixture
+def app():
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username="roller", email="roll@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+        sess["user_id"] = str(user.id)
+    return client
+
+def _mood(user, mood, timestamp):
+    log = MoodLog(user_id=user.id, mood=mood)
+    log.timestamp = timestamp
+    db.session.add(log)
+    return log
+
+def _chat(user, mood, score, timestamp):
+    log = ChatLog(user_id=user.id, user_input="hi", bot_response="hello", mood=mood, mood_score=score)
+    log.timestamp = timestamp
+    db.session.add(log)
+    return log
+
+# ---------- INCREMENTAL MAINTENANCE ----------
+
+def test_inserts_update_daily_and_weekly_rollups(user):
+    monday = datetime(2024, 1, 1, 9)
+    _mood(user, "happy", monday)
+    _mood(user, "happy", monday + timedelta(hours=3))
+    _mood(user, "sad", monday + timedelta(days=1))
+    _chat(user, "happy", 0.5, monday)
+    _chat(user, "happy", 0.25, monday + timedelta(hours=1))
+    _chat(user, "sad", None, monday)
+    db.session.commit()
+
+    # Chat turns count their mood too (it is no longer copied to MoodLog)
+    happy = db.session.get(MoodDaily, (user.id, date(2024, 1, 1), "happy"))
+    assert (happy.mood_count, happy.score_sum, happy.score_count) == (4, 0.75, 2)
+    assert db.session.get(MoodDaily, (user.id, date(2024, 1, 1), "sad")).mood_count == 1
+    assert db.session.get(MoodDaily, (user.id, date(2024, 1, 2), "sad")).mood_count == 1
+
+    week = monday.strftime('%Y-%W')
+    assert db.session.get(MoodWeekly, (user.id, week, "happy")).mood_count == 4
+    assert db.session.get(MoodWeekly, (user.id, week, "sad")).mood_count == 2
+
+def test_rollups_match_a_full_group_by(user):
+    start = datetime(2024, 3, 1)
+    moods = ["happy", "sad", "neutral", "stressed"]
+    for i in range(200):
+        _mood(user, moods[i % 4], start + timedelta(hours=7 * i))
+    db.session.commit()
+
+    expected = {mood: count for mood, count in db.session.query(MoodLog.mood, db.func.count()).group_by(MoodLog.mood)}
+    assert dict(user.get_mood_counts()) == expected
+    daily_total = db.session.query(db.func.sum(MoodDaily.mood_count)).scalar()
+    assert daily_total == 200
+
+def test_deletes_and_rollbacks_keep_rollups_consistent(user):
+    log = _mood(user, "anger", datetime(2024, 5, 5))
+    db.session.commit()
+    db.session.delete(log)
+    db.session.commit()
+    assert db.session.get(MoodDaily, (user.id, date(2024, 5, 5), "anger")).mood_count == 0
+    assert user.get_mood_counts() == []
+
+    _mood(user, "joy", datetime(2024, 5, 6))
+    db.session.flush()
+    db.session.rollback()
+    assert MoodDaily.query.filter_by(mood="joy").count() == 0
+
+def test_deleting_a_user_removes_their_rollups(user):
+    _mood(user, "happy", datetime(2024, 1, 1))
+    db.session.commit()
+    db.session.delete(user)
+    db.session.commit()
+    assert MoodDaily.query.count() == 0
+    assert MoodWeekly.query.count() == 0
+
+# ---------- READ PATHS ----------
+
+def test_mood_trends_data_reads_daily_rollups(client, user):
+    _mood(user, "happy", datetime(2024, 1, 1, 8))
+    _mood(user, "happy", datetime(2024, 1, 1, 20))
+    _mood(user, "sad", datetime(2024, 1, 2))
+    db.session.commit()
+    data = client.get("/mood-trends/data?from=2024-01-01&to=2024-01-31").get_json()
+    assert [(point["date"], point["counts"]) for point in data] == [
+        ("2024-01-01", {"happy": 2}),
+        ("2024-01-02", {"sad": 1}),
+    ]
+
+def test_dashboard_weekly_average_comes_from_rollups(app, client, user):
+    _chat(user, "happy", 1.0, datetime(2024, 1, 1))
+    _chat(user, "sad", -0.5, datetime(2024, 1, 2))
+    db.session.commit()
+
+    captured = {}
+
+    def capture(sender, template, context, **extra):
+        captured.update(context)
+
+    from flask import template_rendered
+    template_rendered.connect(capture, app)
+    try:
+        assert client.get("/dashboard").status_code == 200
+    finally:
+        template_rendered.disconnect(capture, app)
+    assert [(week, pytest.approx(avg)) for week, avg in captured["mood_trend"]] == [("2024-01", 0.25)]
+
+# ---------- MIGRATION BACKFILL ----------
+
+def test_migration_backfills_existing_logs(tmp_path):
+    from flask_migrate import Migrate, upgrade
+
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT, password_hash TEXT);
+        CREATE TABLE chat_logs (id INTEGER PRIMARY KEY, user_id INTEGER, user_input TEXT, bot_response TEXT,
+                                mood TEXT, mood_score FLOAT, timestamp DATETIME);
+        CREATE TABLE mood_logs (id INTEGER PRIMARY KEY, user_id INTEGER, mood TEXT, timestamp DATETIME);
+        CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY);
+        INSERT INTO alembic_version VALUES ('566b79e3eccb');
+        INSERT INTO users VALUES (1, 'a', 'a@example.com', 'x');
+        INSERT INTO mood_logs (user_id, mood, timestamp) VALUES
+            (1, 'happy', '2024-01-01 10:00:00.000000'), (1, 'happy', '2024-01-01 12:00:00.000000'),
+            (1, 'sad', '2024-01-09 12:00:00.000000');
+        INSERT INTO chat_logs (user_id, user_input, bot_response, mood, mood_score, timestamp) VALUES
+            (1, 'x', 'y', 'happy', 0.5, '2024-01-01 10:00:00.000000');
+    """)
+    conn.commit()
+
+    legacy = Flask("legacy")
+    legacy.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(legacy)
+    Migrate(legacy, db)
+    with legacy.app_context():
+        upgrade(directory="migrations", revision="b7d2c4e9a1f3")
+        db.engine.dispose()
+
+    assert conn.execute("SELECT user_id, day, mood, mood_count, score_sum, score_count FROM mood_daily "
+                        "ORDER BY day, mood").fetchall() == [
+        (1, "2024-01-01", "happy", 2, 0.5, 1),
+        (1, "2024-01-09", "sad", 1, 0.0, 0),
+    ]
+    assert conn.execute("SELECT week, mood, mood_count FROM mood_weekly ORDER BY week").fetchall() == [
+        ("2024-01", "happy", 2), ("2024-02", "sad", 1),
+    ]
+    conn.close()
+
+# ---------- RECONCILIATION ----------
+
+def test_reconcile_repairs_finished_weeks_only(user):
+    now = datetime(2024, 1, 17, 12)  # Wednesday; the current week starts Monday the 15th
+    _chat(user, "happy", 0.5, datetime(2024, 1, 2, 9))
+    _mood(user, "sad", datetime(2024, 1, 3, 9))
+    _chat(user, "happy", 0.25, datetime(2024, 1, 16, 9))
+    db.session.commit()
+    # Bulk statements skip the listeners: the rollups drift
+    ChatLog.query.filter(ChatLog.timestamp < datetime(2024, 1, 3)).delete()
+    MoodDaily.query.filter_by(day=date(2024, 1, 16)).update({"mood_count": 7})
+    db.session.add(MoodWeekly(user_id=user.id, week="2023-52", mood="angry", mood_count=2))
+    db.session.commit()
+
+    assert reconcile_rollups(now=now) == {"checked": 2, "fixed": 3}
+    assert {r.day: r.mood_count for r in MoodDaily.query.filter(MoodDaily.day < date(2024, 1, 15))} == {
+        date(2024, 1, 3): 1
+    }
+    assert {(r.week, r.mood) for r in MoodWeekly.query} == {("2024-01", "sad"), ("2024-03", "happy")}
+    assert db.session.get(MoodDaily, (user.id, date(2024, 1, 16), "happy")).mood_count == 7  # current week untouched
+    assert reconcile_rollups(now=now)["fixed"] == 0
+
+def test_reconcile_only_recounts_the_recent_weeks(user):
+    now = datetime(2024, 3, 6, 12)  # current week starts Monday 2024-03-04
+    _chat(user, "happy", 0.5, datetime(2024, 1, 2, 9))   # outside a 2-week window
+    _chat(user, "sad", -1.0, datetime(2024, 2, 26, 9))   # inside it
+    _chat(user, None, 0.25, datetime(2024, 2, 27, 9))    # score without a mood
+    db.session.commit()
+    MoodDaily.query.update({"mood_count": 9})
+    db.session.commit()
+
+    assert reconcile_rollups(now=now, weeks=2) == {"checked": 4, "fixed": 2}
+    assert db.session.get(MoodDaily, (user.id, date(2024, 1, 2), "happy")).mood_count == 9  # left alone
+    assert db.session.get(MoodDaily, (user.id, date(2024, 2, 26), "sad")).mood_count == 1
+    unknown = db.session.get(MoodWeekly, (user.id, "2024-09", "unknown"))
+    assert (unknown.mood_count, unknown.score_sum, unknown.score_count) == (0, 0.25, 1)
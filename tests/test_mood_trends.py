@@ -0,0 +1,136 @@
+import math
+from datetime import date, datetime, timedelta
+
+import pytest
+from app import create_app, db
+from app.models import User, ChatLog
+from app.mood_trends import _week_start, lttb, parse_window
+
+
+@pytest.fixture
+def app():
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username="trender", email="trend@example.com", password="testpass123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    return client
+
+def _log(user, mood, score, timestamp):
+    chat = ChatLog(user_id=user.id, user_input="hi", bot_response="hello", mood=mood, mood_score=score)
+    chat.timestamp = timestamp
+    db.session.add(chat)
+
+# ---------- WINDOWS AND BUCKETS ----------
+
+def test_day_buckets_aggregate_counts_and_scores(client, user):
+    _log(user, "happy", 1.0, datetime(2024, 1, 1, 9))
+    _log(user, "happy", 0.5, datetime(2024, 1, 1, 18))
+    _log(user, "sad", -1.0, datetime(2024, 1, 1, 20))
+    _log(user, "sad", -0.5, datetime(2024, 1, 3))
+    db.session.commit()
+
+    data = client.get("/mood-trends/data?from=2024-01-01&to=2024-01-02&bucket=day").get_json()
+    assert len(data) == 1
+    point = data[0]
+    assert point["date"] == "2024-01-01"
+    assert point["counts"] == {"happy": 2, "sad": 1}
+    assert point["count"] == 3
+    assert point["mood"] == "happy"
+    assert point["average_score"] == pytest.approx(0.5 / 3)
+
+def test_week_buckets_start_on_monday(client, user):
+    _log(user, "calm", 0.0, datetime(2024, 1, 3))   # Wednesday
+    _log(user, "calm", 0.0, datetime(2024, 1, 7))   # Sunday, same week
+    _log(user, "calm", 0.0, datetime(2024, 1, 8))   # next Monday
+    db.session.commit()
+    data = client.get("/mood-trends/data?from=2024-01-01&to=2024-01-31&bucket=week").get_json()
+    assert [(point["date"], point["count"]) for point in data] == [("2024-01-01", 2), ("2024-01-08", 1)]
+
+def test_hour_buckets_read_raw_logs(client, user):
+    _log(user, "anxious", -0.5, datetime(2024, 2, 1, 9, 5))
+    _log(user, "anxious", -0.25, datetime(2024, 2, 1, 9, 55))
+    _log(user, "calm", 0.5, datetime(2024, 2, 1, 10, 1))
+    db.session.commit()
+    data = client.get("/mood-trends/data?from=2024-02-01&to=2024-02-01&bucket=hour").get_json()
+    assert [(point["date"], point["count"]) for point in data] == [("2024-02-01T09:00", 2), ("2024-02-01T10:00", 1)]
+    assert data[0]["average_score"] == pytest.approx(-0.375)
+
+def test_rejects_bad_parameters(client):
+    assert client.get("/mood-trends/data?bucket=minute").status_code == 400
+    assert client.get("/mood-trends/data?from=yesterday").status_code == 400
+    assert client.get("/mood-trends/data?from=2024-02-01&to=2024-01-01").status_code == 400
+    assert client.get("/mood-trends/data?points=many").status_code == 400
+
+def test_open_ended_hourly_window_is_clamped():
+    start, end, bucket, points = parse_window({"bucket": "hour"}, today=date(2024, 3, 10))
+    assert (start, end, bucket) == (date(2024, 3, 3), date(2024, 3, 10), "hour")
+    assert parse_window({}, today=date(2024, 3, 10))[0] is None
+
+def test_week_start_handles_week_zero():
+    assert _week_start("2024-01") == date(2024, 1, 1)
+    assert _week_start("2023-00") == date(2022, 12, 26)
+    assert _week_start("2023-01") == date(2023, 1, 2)
+
+# ---------- BOUNDED PAYLOAD ----------
+
+def test_long_ranges_are_downsampled(client, user):
+    start = datetime(2020, 1, 1)
+    for i in range(900):
+        _log(user, "happy" if i % 2 else "sad", math.sin(i / 20), start + timedelta(days=i))
+    db.session.commit()
+
+    data = client.get("/mood-trends/data?from=2020-01-01&to=2022-12-31&points=100").get_json()
+    assert len(data) == 100
+    assert data[0]["date"] == "2020-01-01"
+    assert data[-1]["date"] == (start + timedelta(days=899)).date().isoformat()
+    assert len(client.get("/mood-trends/data?from=2020-01-01&to=2022-12-31").get_json()) == 500
+
+def test_lttb_keeps_extremes():
+    points = [(i, 0.0) for i in range(100)]
+    points[37] = (37, 10.0)
+    points[71] = (71, -10.0)
+    kept = lttb(points, 10, x=lambda p: p[0], y=lambda p: p[1])
+    assert len(kept) == 10
+    assert kept[0] == points[0] and kept[-1] == points[-1]
+    assert (37, 10.0) in kept and (71, -10.0) in kept
+    assert lttb(points[:5], 10, x=lambda p: p[0], y=lambda p: p[1]) == points[:5]
+
+# ---------- CONDITIONAL REQUESTS ----------
+
+def test_etag_round_trip(client, user):
+    _log(user, "happy", 0.5, datetime(2024, 1, 1))
+    db.session.commit()
+    url = "/mood-trends/data?from=2024-01-01&to=2024-01-31"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert not cached.data
+
+    _log(user, "sad", -0.5, datetime(2024, 1, 2))
+    db.session.commit()
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
@@ -0,0 +1,52 @@
+import copy
+
+import pytest
+import torch
+from app.generation import build_prompt, generate_replies
+from app.quantization import (
+    apply_inference_mode, check_regression, compare_causal_lm, model_nbytes
+)
+
+PROMPTS = ["User: I can't sleep", "User: I feel much better today", "User: hello"]
+
+# ---------- MODES ----------
+
+@pytest.mark.parametrize("mode", ["int8", "bf16"])
+def test_quantized_model_tracks_fp32_logits(tiny_chatbot, mode):
+    model, tokenizer = tiny_chatbot
+    candidate = apply_inference_mode(copy.deepcopy(model), mode)
+
+    metrics = compare_causal_lm(model, candidate, tokenizer, PROMPTS)
+    assert metrics["cosine"] > 0.99
+    assert metrics["top1_agreement"] >= 2 / 3
+
+@pytest.mark.parametrize("mode", ["int8", "bf16"])
+def test_quantized_model_generates(tiny_chatbot, mode):
+    model, tokenizer = tiny_chatbot
+    candidate = apply_inference_mode(copy.deepcopy(model), mode)
+    replies = generate_replies(candidate, tokenizer, [build_prompt(tokenizer, [], "hi")])
+    assert len(replies) == 1
+
+def test_reduced_precision_shrinks_weights(tiny_chatbot):
+    model, _ = tiny_chatbot
+    fp32 = model_nbytes(model)
+    assert model_nbytes(apply_inference_mode(copy.deepcopy(model), "int8")) < fp32
+    assert model_nbytes(apply_inference_mode(copy.deepcopy(model), "bf16")) < fp32
+
+def test_fp32_is_a_no_op(tiny_chatbot):
+    model, _ = tiny_chatbot
+    assert apply_inference_mode(model, "fp32") is model
+    assert next(model.parameters()).dtype == torch.float32
+
+def test_unknown_mode_is_rejected(tiny_chatbot):
+    with pytest.raises(ValueError):
+        apply_inference_mode(tiny_chatbot[0], "fp8")
+
+# ---------- REGRESSION CHECK ----------
+
+def test_check_regression_reports_out_of_range_metrics():
+    thresholds = {"cosine": ("min", 0.99), "kl_divergence": ("max", 0.05)}
+    assert check_regression({"cosine": 0.999, "kl_divergence": 0.01}, thresholds) == []
+    failures = check_regression({"cosine": 0.9, "kl_divergence": 0.2}, thresholds)
+    assert len(failures) == 2
+    assert failures[0].startswith("cosine=0.9000")
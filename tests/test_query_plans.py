@@ -0,0 +1,157 @@
+"""EXPLAIN QUERY PLAN audit: per-user reads must never scan a whole table.
+
+Every SELECT issued while serving the routes below is captured and
+re-explained; a plan step that reads ``SCAN <table>`` (a full table or
+full index scan) fails the test with the offending SQL. Scanning the rows
+of a subquery SQLite has already narrowed (a co-routine or materialized
+view such as ``mood_entries``) is fine.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from app import create_app, db
+from app.export_jobs import last_log_id
+from app.models import User, ChatLog, MoodLog
+
+ROUTES = [
+    "/dashboard",
+    "/chat-history",
+    "/chat-history/data?limit=20",
+    "/mood-trends/data?from=2024-01-01&to=2024-03-01&bucket=day",
+    "/mood-trends/data?from=2024-01-01&to=2024-03-01&bucket=week",
+    "/mood-trends/data?from=2024-01-01&to=2024-01-03&bucket=hour",
+    "/export/chat/json",
+    "/export/chat/ndjson",
+    "/export/chat/csv",
+    "/export/mood/json",
+    "/export/mood/ndjson",
+    "/export/mood/csv",
+    "/export/json",
+]
+
+
+@pytest.fixture
+def app():
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", password="testpass123") for i in range(2)]
+    db.session.add_all(users)
+    db.session.commit()
+    start = datetime(2024, 1, 1)
+    for i in range(300):
+        owner = users[i % 2]
+        chat = ChatLog(user_id=owner.id, user_input=f"msg {i}", bot_response="reply", mood="calm", mood_score=0.1)
+        chat.timestamp = start + timedelta(hours=i)
+        db.session.add(chat)
+        if i % 10 == 0:  # a manually logged mood now and then
+            mood = MoodLog(user_id=owner.id, mood="tired")
+            mood.timestamp = start + timedelta(hours=i, minutes=30)
+            db.session.add(mood)
+    db.session.commit()
+    return users[0]
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+        sess["user_id"] = str(user.id)
+    return client
+
+@pytest.fixture
+def captured(app):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def full_scans(statements):
+    """Return ``(sql, plan step)`` for every captured query whose plan scans a table."""
+    offenders = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            subqueries = {step[-1].split()[-1] for step in plan
+                          if step[-1].startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+            for step in plan:
+                detail = step[-1]
+                if detail.startswith("SCAN ") and not detail.startswith("SCAN CONSTANT ROW") \
+                        and detail.split()[1] not in subqueries:
+                    offenders.append((statement, detail))
+    return offenders
+
+
+@pytest.mark.parametrize("route", ROUTES)
+def test_route_queries_use_indexes(client, captured, route):
+    response = client.get(route)
+    b"".join(response.response)  # drain streamed bodies so their queries run
+    assert captured, f"{route} issued no queries"
+    assert full_scans(captured) == []
+
+def test_deep_history_pages_use_indexes(client, captured):
+    cursor = client.get("/chat-history/data?limit=20").get_json()["next_cursor"]
+    captured.clear()
+    client.get(f"/chat-history/data?limit=20&cursor={cursor}")
+    assert captured
+    assert full_scans(captured) == []
+
+def test_model_helpers_use_indexes(user, captured):
+    user.get_recent_moods()
+    user.get_mood_counts()
+    last_log_id("chat", user.id)
+    last_log_id("mood", user.id)
+    assert full_scans(captured) == []
+
+def test_mood_exports_are_covered_by_the_index(user):
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT timestamp, id, mood FROM mood_logs WHERE user_id = :u ORDER BY timestamp, id"
+    ), {"u": user.id}).all()
+    assert any("COVERING INDEX ix_mood_logs_user_id_timestamp_mood" in step[-1] for step in plan)
+
+def test_migration_creates_the_indexes(tmp_path):
+    from flask_migrate import Migrate, upgrade
+
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT, password_hash TEXT);
+        CREATE TABLE chat_logs (id INTEGER PRIMARY KEY, user_id INTEGER, user_input TEXT, bot_response TEXT,
+                                mood TEXT, mood_score FLOAT, timestamp DATETIME);
+        CREATE TABLE mood_logs (id INTEGER PRIMARY KEY, user_id INTEGER, mood TEXT, timestamp DATETIME);
+        CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY);
+        INSERT INTO alembic_version VALUES ('566b79e3eccb');
+    """)
+    conn.commit()
+
+    legacy = Flask("legacy")
+    legacy.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(legacy)
+    Migrate(legacy, db)
+    with legacy.app_context():
+        upgrade(directory="migrations", revision="d41e8a6f2c07")
+        db.engine.dispose()
+
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_chat_logs_user_id_timestamp", "ix_mood_logs_user_id_timestamp_mood"} <= indexes
+    conn.close()
@@ -0,0 +1,124 @@
+import json
+import time
+
+import pytest
+from app import create_app, db
+from app.models import User, ChatLog
+from app.response_cache import ResponseCache, model_version, normalize_prompt
+
+
+@pytest.fixture
+def app(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'WTF_CSRF_ENABLED': False,
+        'SECRET_KEY': 'test-secret',
+        'RESPONSE_CACHE_ENABLED': True,
+        'RESPONSE_CACHE_POOL_SIZE': 2,
+    })
+    app.config.update(
+        chatbot_model=model,
+        chatbot_tokenizer=tokenizer,
+        emotion_classifier=lambda text: [{"label": "Neutral", "score": 0.9}],
+        device="cpu",
+    )
+    with app.app_context():
+        db.create_all()
+    # Requests get their own app context, so Flask-Login's per-request user does not leak between clients
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def _client(app, name):
+    client = app.test_client()
+    with app.app_context():
+        user = User(username=name, email=f"{name}@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    return client
+
+@pytest.fixture
+def generations(monkeypatch):
+    calls = []
+
+    def fake_generate(model, tokenizer, prompts, device="cpu", draft_model=None):
+        calls.extend(prompts)
+        return [f"reply number {len(calls)} for you"]
+
+    monkeypatch.setattr("app.routes.chat.generate_replies", fake_generate)
+    return calls
+
+# ---------- CACHE ----------
+
+def test_prompts_are_normalized():
+    assert normalize_prompt("  Hi!! ") == normalize_prompt("hi") == "hi"
+    assert normalize_prompt("I can’t   SLEEP.") == "i can't sleep"
+    assert normalize_prompt("?!") == ""
+
+def test_keys_include_model_version_and_mood():
+    cache = ResponseCache("v1", max_input_chars=20)
+    assert cache.key("Hi!") == ("v1", None, "hi")
+    assert cache.key("hi", mood="sadness") != cache.key("hi")
+    assert ResponseCache("v2").key("hi") != cache.key("hi")
+    assert cache.key("...") is None and cache.key("x" * 21) is None
+
+def test_model_version_follows_checkpoint_and_mode():
+    base = {"MODEL_PATH": "./chatbot_model_small", "INFERENCE_MODE": "fp32"}
+    assert model_version(base) != model_version(dict(base, INFERENCE_MODE="int8"))
+    assert model_version(dict(base, RESPONSE_CACHE_MODEL_VERSION="release-7")) == "release-7"
+
+def test_pool_fills_then_rotates():
+    cache = ResponseCache("v1", pool_size=3)
+    key = cache.key("hi")
+    for reply in ("a", "b", "a"):
+        assert cache.get(key) is None
+        cache.add(key, reply)
+    assert [cache.get(key) for _ in range(4)] == ["a", "b", "a", "b"]  # duplicate samples are kept once
+    assert cache.stats()["hits"] == 4 and cache.stats()["misses"] == 3
+
+def test_size_and_ttl_bounds():
+    cache = ResponseCache("v1", pool_size=1, ttl_seconds=0.05, max_entries=2)
+    for text in ("hi", "hello", "hey"):
+        cache.add(cache.key(text), text)
+    assert cache.get(cache.key("hi")) is None and cache.stats()["evictions"] == 1
+    assert cache.get(cache.key("hey")) == "hey"
+    time.sleep(0.06)
+    assert cache.get(cache.key("hey")) is None and cache.stats()["expirations"] == 1
+
+# ---------- CHAT ----------
+
+def test_first_turns_are_served_from_the_pool(app, generations):
+    replies = []
+    for i in range(4):
+        response = _client(app, f"user{i}").post("/api/chat", json={"message": "Hi!" if i % 2 else "hi"})
+        replies.append(response.get_json()["response"])
+    assert len(generations) == 2
+    assert replies[2:] == replies[:2]
+    with app.app_context():
+        assert ChatLog.query.count() == 4
+    stats = _client(app, "metrics").get("/api/chat/metrics").get_json()["response_cache"]
+    assert stats["hits"] == 2 and stats["fills"] == 2
+
+def test_turns_with_history_always_generate(app, generations):
+    client = _client(app, "talker")
+    for _ in range(3):
+        client.post("/api/chat", json={"message": "hi"})
+    assert len(generations) == 3
+
+def test_stream_uses_the_pool(app, generations):
+    app.config["response_cache"].add(app.config["response_cache"].key("i feel anxious"), "cached calm reply here")
+    app.config["response_cache"].add(app.config["response_cache"].key("i feel anxious"), "cached calm reply here")
+    body = _client(app, "streamer").post("/api/chat/stream", json={"message": "I feel anxious"}).get_data(as_text=True)
+    events = [json.loads(block.split("data: ", 1)[1]) for block in body.strip().split("\n\n")]
+    assert events[0] == {"token": "cached calm reply here"}
+    assert events[-1]["response"].startswith("cached calm reply here")
+
+def test_disabled_by_default(tiny_chatbot):
+    app = create_app(test_config={'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    assert app.config["response_cache"] is None
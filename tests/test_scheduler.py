@@ -0,0 +1,146 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from cachelib import FileSystemCache
+from app import create_app, db
+from app.scheduler import JobRegistry, JobRunner, LeaderLock, create_job_registry, remove_expired_sessions
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "jobs.lock"), str(tmp_path / "jobs.json")
+
+@pytest.fixture
+def app(tmp_path, paths):
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret',
+        'SESSION_FILE_DIR': str(tmp_path / "sessions"),
+        'JOBS_LOCK_PATH': paths[0],
+        'JOBS_STATUS_PATH': paths[1],
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def _registry(calls, **intervals):
+    registry = JobRegistry()
+    for name, interval in intervals.items():
+        registry.register(name, lambda name=name: calls.append(name) or {"ok": name}, interval)
+    return registry
+
+# ---------- LEADER LOCK ----------
+
+def test_only_one_holder_at_a_time(paths):
+    first, second = LeaderLock(paths[0]), LeaderLock(paths[0])
+    assert first.acquire() and not second.acquire()
+    assert first.holder() == os.getpid()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+def test_a_dead_leader_releases_the_lock(paths):
+    code = (f"from app.scheduler import LeaderLock; import sys, time; "
+            f"lock = LeaderLock({paths[0]!r}); lock.acquire(); print('held', flush=True); time.sleep(60)")
+    leader = subprocess.Popen([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(__file__)),
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        assert leader.stdout.readline().strip() == "held"
+        standby = LeaderLock(paths[0])
+        assert not standby.acquire()
+        leader.kill()
+        leader.wait()
+        assert standby.acquire()
+        standby.release()
+    finally:
+        leader.kill()
+        leader.stdout.close()
+
+# ---------- REGISTRY ----------
+
+def test_runs_are_timed_and_failures_counted(app):
+    registry = JobRegistry()
+    registry.register("slow", lambda: time.sleep(0.05) or {"rows": 3}, 60)
+    registry.register("broken", lambda: 1 / 0, 60)
+    with pytest.raises(ValueError):
+        registry.register("slow", lambda: None, 60)
+
+    assert registry.run("slow", app) and not registry.run("broken", app)
+    stats = registry.stats()
+    assert stats["slow"]["runs"] == 1 and stats["slow"]["last_duration_s"] >= 0.05
+    assert stats["slow"]["last_result"] == {"rows": 3}
+    assert stats["broken"]["failures"] == 1 and stats["broken"]["last_error"].startswith("ZeroDivisionError")
+    assert stats["broken"]["next_run_at"] == pytest.approx(stats["broken"]["last_started_at"] + 60)
+
+def test_default_jobs(app):
+    registry = create_job_registry(app)
+    assert registry.names() == ["therapists", "session_cleanup", "mood_rollups"]
+    assert registry.run("mood_rollups", app) and registry.run("session_cleanup", app)
+
+# ---------- RUNNER ----------
+
+def test_due_jobs_run_once_per_interval_and_survive_restarts(app, paths):
+    calls = []
+    runner = JobRunner(app, _registry(calls, hourly=3600, daily=86400), *paths)
+    assert runner.lock.acquire()
+    assert runner.run_pending() == ["hourly", "daily"]
+    assert runner.run_pending() == []
+    runner.lock.release()
+
+    restarted = JobRunner(app, _registry(calls, hourly=3600, daily=86400), *paths)
+    assert restarted.lock.acquire()
+    assert restarted.run_pending() == []  # schedule restored from the status file
+    restarted.lock.release()
+    assert calls == ["hourly", "daily"]
+    assert json.load(open(paths[1]))["jobs"]["hourly"]["runs"] == 1
+
+def test_only_the_leader_runs_jobs(app, paths):
+    calls = []
+    runners = [JobRunner(app, _registry(calls, refresh=3600), *paths, poll_s=0.01) for _ in range(3)]
+    stop = threading.Event()
+    threads = [threading.Thread(target=runner.serve, args=(stop,)) for runner in runners]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert calls == ["refresh"]
+
+def test_run_now_refuses_while_a_leader_runs(app, paths):
+    runner = JobRunner(app, _registry([], refresh=3600), *paths)
+    leader = LeaderLock(paths[0])
+    leader.acquire()
+    with pytest.raises(RuntimeError):
+        runner.run_now("refresh")
+    leader.release()
+    assert runner.run_now("refresh")
+
+# ---------- JOBS ----------
+
+def test_expired_sessions_are_removed(tmp_path):
+    directory = str(tmp_path / "sessions")
+    cache = FileSystemCache(directory)
+    cache.set("session:live", {"user_id": 1}, timeout=3600)
+    cache.set("session:stale", {"user_id": 2}, timeout=1)
+    assert remove_expired_sessions(directory, now=time.time() + 60) == 1
+    assert cache.get("session:live") == {"user_id": 1} and cache.get("session:stale") is None
+
+def test_cli_run_once_and_status(app):
+    cli = app.test_cli_runner()
+    result = cli.invoke(args=["jobs", "run-once", "mood_rollups"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["runs"] == 1
+
+    status = json.loads(cli.invoke(args=["jobs", "status"]).output)
+    assert status["running_leader_pid"] is None
+    assert status["jobs"]["mood_rollups"]["last_result"] == {"checked": 0, "fixed": 0}
+    assert cli.invoke(args=["jobs", "run-once", "nope"]).exit_code != 0
@@ -0,0 +1,222 @@
+import json
+import logging
+import time
+
+import numpy as np
+import pytest
+from app import create_app, db
+from app.models import User
+from app.response_cache import ResponseCache
+from app.semantic_cache import PromptEncoder, SemanticCache, SemanticIndex, create_semantic_cache
+
+WORDS = ["i", "feel", "so", "very", "anxious", "sad", "can't", "sleep", "hi", "hello"]
+
+
+class BagOfWords:
+    """Deterministic stand-in encoder: one dimension per known word."""
+    name = "bag-of-words"
+    dim = len(WORDS)
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                if word in WORDS:
+                    vectors[row, WORDS.index(word)] = 1.0
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def _key(text, mood=None, version="v1"):
+    return version, mood, text
+
+def _cache(**kwargs):
+    kwargs.setdefault("threshold", 0.8)
+    kwargs.setdefault("pool_size", 2)
+    return SemanticCache(BagOfWords(), "v1", **kwargs)
+
+def _fill(cache, text, *replies):
+    for reply in replies:
+        cache.add(_key(text), reply)
+
+# ---------- INDEX ----------
+
+def test_index_finds_near_duplicates_among_many():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((1000, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = SemanticIndex(64, 1000, candidates=32)
+    for slot, vector in enumerate(vectors):
+        index.set(slot, vector)
+
+    found = 0
+    for slot in range(0, 1000, 10):
+        query = vectors[slot] + 0.05 * rng.standard_normal(64).astype(np.float32)
+        found += index.search(query / np.linalg.norm(query), k=1)[0][0] == slot
+    assert found >= 95  # approximate: codes preselect 32 of 1000 rows
+
+def test_removed_slots_are_not_returned():
+    index = SemanticIndex(2, 4)
+    index.set(0, np.array([1, 0], np.float32))
+    index.set(1, np.array([0, 1], np.float32))
+    index.remove(0)
+    assert [slot for slot, _ in index.search(np.array([1, 0], np.float32))] == [1]
+
+# ---------- LOOKUPS ----------
+
+def test_paraphrases_share_a_full_pool(caplog, monkeypatch):
+    # Alembic's fileConfig (migration tests) disables loggers that already exist
+    monkeypatch.setattr(logging.getLogger("app.semantic_cache.audit"), "disabled", False)
+    cache = _cache()
+    _fill(cache, "i feel anxious", "breathe with me", "tell me more")
+    with caplog.at_level(logging.INFO, logger="app.semantic_cache.audit"):
+        replies = [cache.lookup(_key("i feel so anxious"), user_id=7) for _ in range(3)]
+    assert replies == ["breathe with me", "tell me more", "breathe with me"]
+
+    message = caplog.records[0].getMessage()
+    assert "anxious" not in message  # the text itself never reaches the log file
+    audit = json.loads(message)
+    assert audit["user_id"] == 7
+    assert audit["query"] == cache.digest("i feel so anxious") and audit["matched"] == cache.digest("i feel anxious")
+    assert audit["similarity"] >= 0.8 and audit["threshold"] == 0.8
+    assert cache.stats()["hits"] == 3 and cache.stats()["avg_hit_similarity"] > 0.8
+
+def test_pools_fill_from_paraphrases_before_serving():
+    cache = _cache()
+    _fill(cache, "i feel anxious", "breathe with me")
+    assert cache.lookup(_key("i feel so anxious")) is None
+    cache.add(_key("i feel so anxious"), "tell me more")  # joins the existing entry
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup(_key("i feel very anxious")) == "breathe with me"
+
+def test_threshold_mood_and_model_version_separate_entries():
+    cache = _cache(threshold=0.95)
+    _fill(cache, "i feel anxious", "a", "b")
+    assert cache.lookup(_key("i feel so anxious")) is None  # similarity ~0.87
+    assert cache.stats()["below_threshold"] == 1
+    cache.threshold = 0.8
+    assert cache.lookup(_key("i feel so anxious", mood="fear")) is None
+    assert cache.lookup(_key("i feel so anxious", version="v2")) is None
+    assert cache.lookup(_key("i feel so anxious")) == "a"
+
+def test_other_moods_do_not_crowd_out_a_match():
+    cache = _cache()
+    for mood in ["fear", "sadness", "anger", "joy", "disgust"]:
+        for reply in ("x", "y"):
+            cache.add(_key("i feel anxious", mood=mood), reply)  # exact text, other moods
+    _fill(cache, "i feel so anxious", "breathe with me", "tell me more")
+    assert cache.lookup(_key("i feel anxious")) == "breathe with me"
+
+def test_prompts_are_embedded_once_per_miss_and_add():
+    cache = _cache()
+    cache.lookup(_key("hi"))
+    cache.add(_key("hi"), "hello there")
+    assert cache.encoder.calls == 1
+
+# ---------- BOUNDS ----------
+
+def test_least_recently_used_prompts_are_evicted():
+    cache = _cache(max_entries=2, pool_size=1)
+    _fill(cache, "hi", "hello")
+    _fill(cache, "i feel sad", "i'm here")
+    assert cache.lookup(_key("hi")) == "hello"
+    _fill(cache, "i can't sleep", "let's wind down")
+    assert cache.lookup(_key("i feel sad")) is None and cache.lookup(_key("hi")) == "hello"
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire():
+    cache = _cache(ttl_seconds=0.05, pool_size=1)
+    _fill(cache, "hi", "hello")
+    time.sleep(0.06)
+    assert cache.lookup(_key("hi")) is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+# ---------- PERSISTENCE ----------
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "semantic.npz")
+    cache = _cache(path=path)
+    _fill(cache, "i feel anxious", "a", "b")
+    _fill(cache, "hi", "hello")
+    cache.save()
+
+    reloaded = _cache(path=path)
+    assert reloaded.stats()["entries"] == 2
+    assert reloaded.lookup(_key("i feel so anxious")) == "a"
+    assert SemanticCache(BagOfWords(), "v2", path=path).stats()["entries"] == 0  # other model version
+
+    other = BagOfWords()
+    other.name = "another-encoder"
+    assert SemanticCache(other, "v1", path=path).stats()["entries"] == 0
+
+def test_missing_or_corrupt_snapshots_start_empty(tmp_path):
+    path = tmp_path / "semantic.npz"
+    assert _cache(path=str(path)).stats()["entries"] == 0
+    path.write_bytes(b"not an npz")
+    assert _cache(path=str(path)).stats()["entries"] == 0
+
+# ---------- ENCODER ----------
+
+def test_prompt_encoder_returns_unit_vectors(tiny_chatbot):
+    model, tokenizer = tiny_chatbot
+    tokenizer.pad_token = tokenizer.eos_token
+    encoder = PromptEncoder(model, tokenizer)
+    vectors = encoder.encode(["i feel anxious", "hi"])
+    assert vectors.shape == (2, encoder.dim)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+
+def test_needs_a_sentence_embedding_model(tiny_chatbot, monkeypatch):
+    app = create_app(test_config={'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                                  'SEMANTIC_CACHE_ENABLED': True, 'SEMANTIC_CACHE_AUDIT_PATH': ""})
+    app.config["response_cache"] = ResponseCache("v1")
+    # Never falls back to the emotion classifier's encoder
+    app.config["emotion_classifier"] = lambda text: pytest.fail("emotion encoder used")
+    assert create_semantic_cache(app) is None
+
+    loaded = []
+    monkeypatch.setattr("app.model_registry.load_prompt_encoder",
+                        lambda name: loaded.append(name) or tiny_chatbot)
+    app.config["SEMANTIC_CACHE_MODEL"] = "sentence-transformers/all-MiniLM-L6-v2"
+    assert isinstance(create_semantic_cache(app), SemanticCache)
+    assert loaded == ["sentence-transformers/all-MiniLM-L6-v2"]
+
+# ---------- CHAT ----------
+
+def test_chat_serves_paraphrases_without_generating(tiny_chatbot, monkeypatch):
+    model, tokenizer = tiny_chatbot
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret',
+        'RESPONSE_CACHE_ENABLED': True,
+        'RESPONSE_CACHE_POOL_SIZE': 1,
+    })
+    app.config.update(chatbot_model=model, chatbot_tokenizer=tokenizer, device="cpu",
+                      emotion_classifier=lambda text: [{"label": "Fear", "score": 0.9}],
+                      semantic_cache=_cache(pool_size=1))
+    generations = []
+    monkeypatch.setattr("app.routes.chat.generate_replies",
+                        lambda *args, **kwargs: generations.append(1) or ["a calming reply for you"])
+    with app.app_context():
+        db.create_all()
+        ids = []
+        for name in ("first", "second"):
+            user = User(username=name, email=f"{name}@example.com", password="testpass123")
+            db.session.add(user)
+            db.session.commit()
+            ids.append(user.id)
+
+    replies = []
+    for user_id, message in zip(ids, ["I feel anxious", "i feel SO anxious!"]):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user_id)
+            sess["_fresh"] = True
+        replies.append(client.post("/api/chat", json={"message": message}).get_json()["response"])
+    assert len(generations) == 1 and replies[0] == replies[1]
+    assert app.config["semantic_cache"].stats()["hits"] == 1
+    with app.app_context():
+        db.drop_all()
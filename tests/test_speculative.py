@@ -0,0 +1,153 @@
+import types
+
+import pytest
+import torch
+import transformers.generation.utils as generation_utils
+from transformers import GPT2Config, GPT2LMHeadModel
+
+import app.generation as generation
+from app import create_app, db
+from app.generation import _generate, build_prompt, generate_replies, stream_reply
+from app.model_registry import create_model_registry
+from app.models import User
+from config import Config
+
+
+class _Counter:
+    """Count speculative sampling steps and accepted draft tokens."""
+
+    def __init__(self, monkeypatch):
+        self.steps = self.proposed = self.accepted = 0
+        original = generation_utils._speculative_sampling
+
+        def counted(candidate_input_ids, candidate_logits, candidate_length, *args, **kwargs):
+            valid_tokens, n_matches = original(candidate_input_ids, candidate_logits, candidate_length,
+                                               *args, **kwargs)
+            self.steps += 1
+            self.proposed += int(candidate_length)
+            self.accepted += int(n_matches)
+            return valid_tokens, n_matches
+
+        monkeypatch.setattr(generation_utils, "_speculative_sampling", counted)
+
+
+def _gpt2(vocab_size, n_layer, seed, **kwargs):
+    torch.manual_seed(seed)
+    return GPT2LMHeadModel(GPT2Config(vocab_size=vocab_size, n_positions=1024, n_embd=32, n_layer=n_layer,
+                                      n_head=2, **kwargs)).eval()
+
+
+@pytest.fixture(scope="module")
+def draft_model(tiny_chatbot):
+    model, _ = tiny_chatbot
+    return _gpt2(model.config.vocab_size, 1, seed=1, bos_token_id=model.config.eos_token_id,
+                 eos_token_id=model.config.eos_token_id)
+
+# ---------- GENERATION ----------
+
+def test_single_prompt_is_verified_against_the_draft(tiny_chatbot, draft_model, monkeypatch):
+    model, tokenizer = tiny_chatbot
+    counter = _Counter(monkeypatch)
+    replies = generate_replies(model, tokenizer, [build_prompt(tokenizer, [], "I can't sleep")],
+                               draft_model=draft_model)
+    assert len(replies) == 1 and isinstance(replies[0], str)
+    assert counter.steps > 0
+
+def test_stream_reply_with_draft(tiny_chatbot, draft_model, monkeypatch):
+    model, tokenizer = tiny_chatbot
+    counter = _Counter(monkeypatch)
+    fragments = list(stream_reply(model, tokenizer, build_prompt(tokenizer, [], "hello"), draft_model=draft_model))
+    assert all(isinstance(fragment, str) for fragment in fragments)
+    assert counter.steps > 0
+
+def test_batches_generate_without_the_draft(tiny_chatbot, draft_model, monkeypatch):
+    model, tokenizer = tiny_chatbot
+    calls = []
+    original = model.generate
+    monkeypatch.setattr(model, "generate", lambda **kwargs: calls.append(kwargs) or original(**kwargs))
+
+    generate_replies(model, tokenizer, ["User: a <|endoftext|>", "User: bb <|endoftext|>"], draft_model=draft_model)
+    generate_replies(model, tokenizer, ["User: a <|endoftext|>"], draft_model=draft_model)
+    assert "assistant_model" not in calls[0]
+    assert calls[1]["assistant_model"] is draft_model
+
+def test_sampling_distribution_is_preserved(monkeypatch):
+    """The first sampled token follows the target's processed distribution, not the draft's."""
+    vocab_size = 8
+    target = _gpt2(vocab_size, 2, seed=0, initializer_range=0.5)
+    draft = _gpt2(vocab_size, 1, seed=3, initializer_range=0.5)
+    tokenizer = types.SimpleNamespace(eos_token_id=vocab_size - 1)
+    input_ids = torch.tensor([[1, 2, 3, 1, 2]])
+    attention_mask = torch.ones_like(input_ids)
+
+    def first_token_probs(model):
+        monkeypatch.setattr(generation, "MAX_NEW_TOKENS", 1)
+        with torch.no_grad():
+            output = _generate(model, tokenizer, input_ids, attention_mask,
+                               return_dict_in_generate=True, output_scores=True)
+        return torch.softmax(output.scores[0][0], dim=-1)
+
+    expected = first_token_probs(target)
+    assert 0.5 * (expected - first_token_probs(draft)).abs().sum() > 0.2  # the draft really disagrees
+
+    monkeypatch.setattr(generation, "MAX_NEW_TOKENS", 3)
+    counter = _Counter(monkeypatch)
+    torch.manual_seed(0)
+    samples = 600
+    counts = torch.zeros(vocab_size)
+    with torch.no_grad():
+        for _ in range(samples):
+            output = _generate(target, tokenizer, input_ids, attention_mask, draft_model=draft)
+            counts[output[0, input_ids.shape[1]]] += 1
+
+    assert counter.accepted < counter.proposed  # rejections (and resampling) happened
+    assert 0.5 * (counts / samples - expected).abs().sum() < 0.08
+
+# ---------- ROUTES ----------
+
+@pytest.fixture
+def chat_app(tiny_chatbot, draft_model):
+    model, tokenizer = tiny_chatbot
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    app.config.update(
+        chatbot_model=model,
+        chatbot_tokenizer=tokenizer,
+        emotion_classifier=lambda text: [{"label": "Sadness", "score": 0.9}],
+        device="cpu",
+        draft_model=draft_model,
+        generation_batcher=types.SimpleNamespace(run=lambda prompt: pytest.fail("batcher used")),
+    )
+    with app.app_context():
+        db.create_all()
+        user = User(username="drafter", email="draft@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    yield app, client
+    with app.app_context():
+        db.drop_all()
+
+def test_chat_uses_the_draft_instead_of_the_batcher(chat_app, monkeypatch):
+    app, client = chat_app
+    counter = _Counter(monkeypatch)
+    response = client.post("/api/chat", json={"message": "I feel a bit low today"})
+    assert response.status_code == 200
+    assert response.get_json()["response"]
+    assert counter.steps > 0
+
+def test_draft_model_is_off_by_default(tiny_chatbot):
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    assert Config.SPECULATIVE_DECODING is False
+    assert create_model_registry(app).get("draft_model") is None
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ["torch", "transformers", "fpdf", "bs4", "requests", "psutil", "flask_admin", "alembic", "apscheduler"]
+
+
+def _imported_after(code):
+    env = dict(os.environ, FLASK_ENV="testing", MODEL_LOADING="lazy", ADMIN_ENABLED="false")
+    probe = f"{code}; import sys; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.strip().split(",") if name]
+
+@pytest.mark.parametrize("code", [
+    "import app; app.create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})",
+    "import main",
+    "import app.chatbot, app.scheduler, app.utils, model_loader",
+])
+def test_heavy_dependencies_are_deferred(code):
+    assert _imported_after(code) == []
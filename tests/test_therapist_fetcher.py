@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from app.routes import views
+from app.therapist_fetcher import TherapistFetcher, refresh
+from config import Config
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    """Stub source: ``/<name>`` serves ``routes[name]`` with an ETag and Last-Modified."""
+    routes = {}
+    failures = {}   # name -> status codes to answer before serving the body
+    delays = {}     # name -> seconds to sleep before answering
+    hits = []
+    active = peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        name = self.path.split("?")[0].strip("/")
+        cls = type(self)
+        with cls.lock:
+            cls.hits.append((name, self.headers.get("If-None-Match")))
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(cls.delays.get(name, 0))
+            pending = cls.failures.get(name)
+            if pending:
+                self._reply(pending.pop(0), b"", {"Retry-After": "0"})
+                return
+            body = cls.routes[name].encode()
+            etag = f'"{hash(body) & 0xffffffff:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._reply(304, b"", {"ETag": etag})
+                return
+            self._reply(200, body, {"ETag": etag, "Last-Modified": formatdate(0, usegmt=True)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def _reply(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    _Upstream.routes, _Upstream.failures, _Upstream.delays, _Upstream.hits = {}, {}, {}, []
+    _Upstream.active = _Upstream.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "therapists.json")
+
+def _fetcher(path, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    kwargs.setdefault("timeout", (1, 2))
+    return TherapistFetcher(f"{path}.http.json", **kwargs)
+
+def _parse(key, body):
+    return json.loads(body)
+
+def _requests(upstream, *names):
+    return [(name, f"{upstream}/{name}", None) for name in names]
+
+def _serve(name, *links):
+    _Upstream.routes[name] = json.dumps([{"name": link.title(), "link": link} for link in links])
+
+# ---------- CONDITIONAL REQUESTS ----------
+
+def test_unchanged_sources_are_not_refetched_or_rewritten(upstream, path):
+    _serve("hyderabad", "a", "b")
+    with _fetcher(path) as fetcher:
+        assert refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)["written"]
+    with _fetcher(path) as fetcher:  # validators and values survive in the state file
+        summary = refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+    assert summary == {"fetched": 0, "not_modified": 1, "failed": [], "written": False}
+    assert _Upstream.hits[-1][1] is not None
+    assert [t["link"] for t in json.load(open(path))] == ["a", "b"]
+
+def test_changed_sources_rewrite_the_file(upstream, path):
+    _serve("hyderabad", "a")
+    with _fetcher(path) as fetcher:
+        refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+        _serve("hyderabad", "a", "c")
+        summary = refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+    assert summary["fetched"] == 1 and summary["written"]
+    assert [t["link"] for t in json.load(open(path))] == ["a", "c"]
+
+def test_unparseable_bodies_are_refetched_unconditionally(upstream, path):
+    _serve("hyderabad", "a")
+    with _fetcher(path) as fetcher:
+        refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+        _Upstream.routes["hyderabad"] = "<html>maintenance</html>"
+        summary = refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+        assert summary["failed"] == ["hyderabad"] and not summary["written"]  # last good records kept
+        refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+    assert _Upstream.hits[-1][1] is None
+
+# ---------- RETRIES AND TIMEOUTS ----------
+
+def test_transient_errors_are_retried(upstream, path):
+    _serve("hyderabad", "a")
+    _Upstream.failures["hyderabad"] = [503, 429]
+    with _fetcher(path, retries=3) as fetcher:
+        summary = refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+    assert summary["fetched"] == 1
+    assert len(_Upstream.hits) == 3
+
+def test_slow_sources_time_out(upstream, path):
+    _serve("hyderabad", "a")
+    _Upstream.delays["hyderabad"] = 1
+    with _fetcher(path, retries=0, timeout=(1, 0.2)) as fetcher:
+        result = fetcher.fetch("hyderabad", f"{upstream}/hyderabad")
+    assert not result.ok
+
+def test_failed_sources_fall_back_to_their_last_records(upstream, path):
+    _serve("hyderabad", "a")
+    _serve("bengaluru", "b")
+    with _fetcher(path, retries=0) as fetcher:
+        refresh(fetcher, _requests(upstream, "hyderabad", "bengaluru"), _parse, path)
+        _Upstream.failures["bengaluru"] = [500]
+        summary = refresh(fetcher, _requests(upstream, "hyderabad", "bengaluru"), _parse, path)
+    assert summary["failed"] == ["bengaluru"] and not summary["written"]
+    assert [t["link"] for t in json.load(open(path))] == ["a", "b"]
+
+def test_all_sources_failing_raises(upstream, path):
+    _Upstream.failures["hyderabad"] = [500]
+    with _fetcher(path, retries=0) as fetcher:
+        with pytest.raises(Exception):
+            refresh(fetcher, _requests(upstream, "hyderabad"), _parse, path)
+
+# ---------- CONCURRENCY ----------
+
+def test_sources_are_fetched_concurrently_and_deduplicated(upstream, path):
+    names = ["hyderabad", "bengaluru", "chennai", "pune"]
+    for name in names:
+        _serve(name, name, "shared")
+        _Upstream.delays[name] = 0.2
+    with _fetcher(path, max_workers=4) as fetcher:
+        started = time.monotonic()
+        results = fetcher.fetch_many(_requests(upstream, *names))
+        elapsed = time.monotonic() - started
+        assert [result.key for result in results] == names
+        refresh(fetcher, _requests(upstream, *names), _parse, path)
+    assert _Upstream.peak > 1 and elapsed < 0.6
+    assert [t["link"] for t in json.load(open(path))] == [*names[:1], "shared", *names[1:]]
+
+# ---------- GOOGLE PLACES ----------
+
+def test_fetch_therapists_queries_every_location(upstream, path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_PLACES_API_KEY", "test-key")
+    monkeypatch.setattr(Config, "PLACES_API_URL", f"{upstream}/places")
+    monkeypatch.setattr(Config, "THERAPIST_FETCH_BACKOFF_S", 0)
+    _Upstream.routes["places"] = json.dumps({"results": [
+        {"name": "Dr. Rao", "formatted_address": "Banjara Hills, Hyderabad", "rating": 4.8, "place_id": "p1"}
+    ]})
+    summary = views.fetch_therapists(location=["Hyderabad", "Pune"], filename=path)
+    assert summary["fetched"] == 2
+    therapists = json.load(open(path))
+    assert len(therapists) == 1 and therapists[0]["link"].endswith("place_id:p1")
+    assert views.fetch_therapists(location=["Hyderabad", "Pune"], filename=path)["not_modified"] == 2
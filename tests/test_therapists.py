@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+
+import pytest
+from app import create_app, db
+from app.models import User
+from app.therapists import TherapistDirectory, location_of, search_args, write_therapists
+
+THERAPISTS = [
+    {"name": "Dr. Rao", "address": "12 Road No. 1, Banjara Hills, Hyderabad, Telangana 500034, India",
+     "rating": 4.8, "user_ratings_total": 12},
+    {"name": "Calm Minds", "address": "3 MG Road, Bengaluru, Karnataka 560001, India",
+     "rating": 4.2, "user_ratings_total": 230},
+    {"name": "Dr. Iyer", "location": "Hyderabad", "rating": 3.9, "user_ratings_total": 40},
+    {"name": "Unrated Clinic", "location": "Hyderabad"},
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "data" / "therapists.json"
+    write_therapists(str(path), THERAPISTS)
+    return str(path)
+
+@pytest.fixture
+def directory(path):
+    return TherapistDirectory(path)
+
+def _names(therapists):
+    return [therapist["name"] for therapist in therapists]
+
+def _touch_later(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+# ---------- LOADING ----------
+
+def test_loads_once_until_the_file_changes(directory, path):
+    for _ in range(5):
+        assert len(directory.all()) == 4
+    assert directory.stats()["loads"] == 1
+
+    write_therapists(path, THERAPISTS[:1])
+    assert _names(directory.all()) == ["Dr. Rao"]
+    assert directory.stats()["loads"] == 2
+
+def test_in_place_edits_are_picked_up_by_mtime(directory, path):
+    directory.all()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(THERAPISTS[1:2], f)
+    _touch_later(path)
+    assert _names(directory.all()) == ["Calm Minds"]
+
+def test_a_broken_file_keeps_the_last_good_list(directory, path):
+    directory.all()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('[{"name": "half')
+    _touch_later(path)
+    assert len(directory.all()) == 4
+    directory.all()
+    assert directory.stats()["load_errors"] == 1  # not retried until the file changes again
+
+def test_missing_file_is_an_empty_directory(tmp_path):
+    directory = TherapistDirectory(str(tmp_path / "nothing.json"))
+    assert directory.all() == [] and directory.locations() == []
+
+def test_concurrent_readers_see_whole_lists(directory, path):
+    seen, stop = set(), threading.Event()
+
+    def read():
+        while not stop.is_set():
+            seen.add(len(directory.all()))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(20):
+        write_therapists(path, THERAPISTS if i % 2 else THERAPISTS[:2])
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert seen <= {2, 4}
+
+# ---------- ATOMIC WRITES ----------
+
+def test_writes_leave_no_temp_files(path):
+    write_therapists(path, THERAPISTS)
+    assert os.listdir(os.path.dirname(path)) == ["therapists.json"]
+
+def test_failed_write_keeps_the_old_file(path):
+    with pytest.raises(TypeError):
+        write_therapists(path, [{"name": object()}])
+    assert len(json.load(open(path))) == 4
+    assert os.listdir(os.path.dirname(path)) == ["therapists.json"]
+
+# ---------- INDEXES ----------
+
+def test_location_comes_from_the_field_or_the_address():
+    assert location_of(THERAPISTS[0]) == "hyderabad"
+    assert location_of(THERAPISTS[1]) == "bengaluru"
+    assert location_of({"name": "Nowhere"}) == ""
+
+def test_search_by_location_and_rating(directory):
+    assert directory.locations() == ["Bengaluru", "Hyderabad"]
+    assert _names(directory.search()) == ["Dr. Rao", "Calm Minds", "Dr. Iyer", "Unrated Clinic"]
+    assert _names(directory.search(location="HYDERABAD")) == ["Dr. Rao", "Dr. Iyer", "Unrated Clinic"]
+    assert _names(directory.search(location="hyderabad", min_rating=4)) == ["Dr. Rao"]
+    assert _names(directory.search(min_rating=4.2)) == ["Dr. Rao", "Calm Minds"]
+    assert directory.search(location="Chennai") == []
+
+def test_search_sorts(directory):
+    assert _names(directory.search(sort="reviews", limit=2)) == ["Calm Minds", "Dr. Iyer"]
+    assert _names(directory.search(sort="name")) == ["Calm Minds", "Dr. Iyer", "Dr. Rao", "Unrated Clinic"]
+    with pytest.raises(ValueError):
+        directory.search(sort="distance")
+
+def test_search_args_ignore_bad_values():
+    assert search_args({"min_rating": "four", "sort": "distance"}) == {
+        "location": None, "min_rating": None, "sort": "rating"
+    }
+    assert search_args({"location": "Hyderabad", "min_rating": "4.5", "sort": "name"}) == {
+        "location": "Hyderabad", "min_rating": 4.5, "sort": "name"
+    }
+
+# ---------- PAGE ----------
+
+def test_contact_page_filters_from_memory(path):
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret',
+        'THERAPISTS_PATH': path,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(username="seeker", email="seeker@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user.id)
+            sess["_fresh"] = True
+
+        body = client.get("/contact_therapist?location=Hyderabad&min_rating=4").get_data(as_text=True)
+        assert "Dr. Rao" in body and "Dr. Iyer" not in body and "Calm Minds" not in body
+        assert 'value="Bengaluru"' in body
+        client.get("/contact_therapist")
+        assert app.config["therapist_directory"].stats()["loads"] == 1
+        db.drop_all()
@@ -0,0 +1,134 @@
+import pytest
+from flask_login import current_user
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User
+from app.user_cache import SESSION_KEY, UserCache, UserSnapshot
+
+
+@pytest.fixture
+def app():
+    app = create_app(test_config={
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'test-secret'
+    })
+    with app.app_context():
+        db.create_all()
+    # Requests get their own app context (and ``g``), so Flask-Login's per-request memo does not leak
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    with app.app_context():
+        user = User(username="cached", email="cached@example.com", password="testpass123")
+        db.session.add(user)
+        db.session.commit()
+        return UserSnapshot.from_user(user)
+
+def _update_user(app, user_id, **fields):
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        if not fields:
+            db.session.delete(user)
+        for name, value in fields.items():
+            setattr(user, name, value)
+        db.session.commit()
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    return client
+
+@pytest.fixture
+def user_selects(app):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+# ---------- SNAPSHOT ----------
+
+def test_snapshot_is_immutable_and_slotted():
+    snapshot = UserSnapshot(1, "cached", "cached@example.com")
+    assert not hasattr(snapshot, "__dict__")
+    with pytest.raises(AttributeError):
+        snapshot.username = "changed"
+    with pytest.raises(AttributeError):
+        del snapshot.email
+    assert snapshot.get_id() == "1"
+    assert snapshot.is_authenticated and not snapshot.is_anonymous
+    assert snapshot == UserSnapshot(1, "cached", "cached@example.com")
+
+# ---------- REQUESTS ----------
+
+def test_requests_reuse_the_cached_user(app, client, user, user_selects):
+    for _ in range(5):
+        assert client.get("/chat-history/data").status_code == 200
+    assert len(user_selects) == 1
+    assert app.config["user_cache"].stats()["hits"] == 4
+
+def test_current_user_is_a_snapshot(app, client, user):
+    with client:
+        client.get("/chat-history/data")
+        assert isinstance(current_user._get_current_object(), UserSnapshot)
+        assert (current_user.id, current_user.username) == (user.id, "cached")
+
+def test_session_copy_serves_a_cold_process_cache(app, client, user, user_selects):
+    client.get("/chat-history/data")
+    app.config["user_cache"].clear()  # as if the next request hit another worker
+    client.get("/chat-history/data")
+    assert len(user_selects) == 1
+    assert app.config["user_cache"].stats()["session_hits"] == 1
+
+def test_expired_entries_are_reloaded(app, client, user, user_selects):
+    client.get("/chat-history/data")
+    cache = app.config["user_cache"]
+    cache.clear()
+    with client.session_transaction() as sess:
+        sess[SESSION_KEY][3] -= cache.ttl_seconds  # the session copy is a TTL old
+    client.get("/chat-history/data")
+    assert len(user_selects) == 2
+
+def test_zero_ttl_disables_the_cache(app, client, user, user_selects):
+    app.config["user_cache"] = UserCache(ttl_seconds=0)
+    client.get("/chat-history/data")
+    client.get("/chat-history/data")
+    assert len(user_selects) == 2
+
+# ---------- INVALIDATION ----------
+
+def test_updating_the_user_invalidates_the_snapshot(app, client, user):
+    with client:
+        client.get("/chat-history/data")
+        assert current_user.username == "cached"
+
+    _update_user(app, user.id, username="renamed")
+    with client:
+        client.get("/chat-history/data")
+        assert current_user.username == "renamed"
+
+def test_deleted_users_are_logged_out(app, client, user):
+    client.get("/chat-history/data")
+    _update_user(app, user.id)
+    assert client.get("/chat-history/data").status_code == 401
+
+def test_logout_drops_the_session_copy(client, user):
+    client.get("/chat-history/data")
+    with client.session_transaction() as sess:
+        assert sess[SESSION_KEY][:3] == [user.id, "cached", "cached@example.com"]
+    client.get("/auth/logout")
+    with client.session_transaction() as sess:
+        assert SESSION_KEY not in sess
@@ -1,7 +1,10 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
 from flask import Response, json
 from datetime import datetime
+from app.therapist_fetcher import FetchResult
 from app.utils import export_logs_as_json, export_logs_as_csv, export_logs_as_pdf, scrape_therapists
 from app import create_app
 from app.models import db, User, ChatLog
@@ -104,6 +107,27 @@ class UtilsTestCase(unittest.TestCase):
             response = export_logs_as_csv(logs)
             self.assertEqual(response.status_code, 200)
 
+    def test_export_logs_as_csv_pages_through_a_query(self):
+        from app import exports
+        pages = []
+
+        def small_pages(*args, **kwargs):
+            for row in exports.iter_user_rows(*args, page_size=2, **kwargs):
+                pages.append(row)
+                yield row
+
+        with self.app.test_request_context():
+            for i in range(5):
+                db.session.add(ChatLog(user_id=self.user_id, user_input=f"msg {i}", bot_response="ok", mood="joy"))
+            db.session.add(ChatLog(user_id=self.user_id + 1, user_input="someone else", bot_response="ok", mood="joy"))
+            db.session.commit()
+            with patch("app.utils.iter_user_rows", small_pages):
+                response = export_logs_as_csv(ChatLog.query.filter_by(user_id=self.user_id))
+                body = response.get_data(as_text=True)
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(body.count("msg "), 5)
+        self.assertNotIn("someone else", body)
+
     def test_export_logs_as_pdf_empty(self):
         with self.app.test_request_context():
             response = export_logs_as_pdf([], title="Test PDF")
@@ -126,11 +150,11 @@ class UtilsTestCase(unittest.TestCase):
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.mimetype, "application/pdf")
 
-    @patch("app.utils.requests.get")
-    @patch("app.utils.open", new_callable=mock_open)
-    @patch("app.utils.BeautifulSoup")
-    def test_scrape_therapists(self, mock_bs, mock_open_file, mock_requests_get):
-        mock_requests_get.return_value.text = "<html></html>"
+    @patch("app.therapist_fetcher.TherapistFetcher.fetch")
+    @patch("app.therapists.write_therapists")
+    @patch("bs4.BeautifulSoup")
+    def test_scrape_therapists(self, mock_bs, mock_write, mock_fetch):
+        mock_fetch.side_effect = lambda key, url, params=None: FetchResult(key, 200, body="<html></html>")
 
         mock_doctor = MagicMock()
         mock_doctor.select_one.side_effect = lambda selector: {
@@ -144,14 +168,18 @@ class UtilsTestCase(unittest.TestCase):
         mock_soup.select.return_value = [mock_doctor]
         mock_bs.return_value = mock_soup
 
-        scrape_therapists()
-        mock_open_file.assert_called_once()
-        self.assertTrue(mock_requests_get.called)
-
-    @patch("app.utils.requests.get", side_effect=Exception("Network error"))
-    def test_scrape_therapists_network_error(self, mock_get):
-        with self.assertRaises(Exception):
-            scrape_therapists()
+        with tempfile.TemporaryDirectory() as tmp:
+            scrape_therapists(filename=os.path.join(tmp, "therapists.json"), cities=["Hyderabad"])
+        mock_write.assert_called_once()
+        self.assertEqual(mock_write.call_args[0][1][0]["name"], "Dr. X")
+        self.assertTrue(mock_fetch.called)
+
+    @patch("app.therapist_fetcher.TherapistFetcher.fetch")
+    def test_scrape_therapists_network_error(self, mock_fetch):
+        mock_fetch.side_effect = lambda key, url, params=None: FetchResult(key, error=Exception("Network error"))
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(Exception):
+                scrape_therapists(filename=os.path.join(tmp, "therapists.json"))
 
 if __name__ == '__main__':
     unittest.main()